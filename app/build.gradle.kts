@@ -65,6 +65,14 @@ chaquopy {
         getByName("py38") { version = "3.8" }
     }
 
+    sourceSets {
+        getByName("main") {
+            // written next to the sources by local ingestion runs or by older
+            // artifact builds (see build_artifacts.py): never packaged
+            exclude("dataset_store/**", "build_cache/**")
+        }
+    }
+
     defaultConfig {
         buildPython("C:\\Users\\Daniel\\AppData\\Local\\Programs\\Python\\Python38-32\\python.exe")
 
@@ -50,7 +50,11 @@ import androidx.compose.ui.platform.LocalContext
 import androidx.compose.ui.res.painterResource
 import androidx.compose.ui.tooling.preview.Preview
 import androidx.compose.ui.unit.dp
+import com.chaquo.python.Python
+import com.chaquo.python.android.AndroidPlatform
+import kotlinx.coroutines.Dispatchers
 import kotlinx.coroutines.delay
+import kotlinx.coroutines.withContext
 import java.lang.Math.toDegrees
 import kotlin.math.atan2
 
@@ -73,6 +77,22 @@ fun LoadUpScreen() {
     // media player for the f1 sound
     val mediaPlayer: MediaPlayer? = remember { MediaPlayer.create(context, R.raw.f1_sound) }
 
+    // Start loading the prediction models in the background while the intro plays
+    LaunchedEffect(Unit) {
+        withContext(Dispatchers.IO) {
+            try {
+                if (!Python.isStarted()) {
+                    Python.start(AndroidPlatform(context))
+                }
+                // returns immediately, the loading runs on a Python thread
+                Python.getInstance().getModule("warmup").callAttr("warmup")
+            } catch (e: Exception) {
+                // predictions still load on first use
+                e.printStackTrace()
+            }
+        }
+    }
+
     // Play the formula 1 sound
     LaunchedEffect(Unit) {
         delay(250)
@@ -0,0 +1,596 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+import forest_engine
+import history_cube
+import qualifying
+import snapshot
+import strategy
+from concurrency import atomic_write
+
+# Offline build of everything shipped in saved_models/, as a cached pipeline.
+#
+#     python build_artifacts.py [--jobs N] [--force] [--only STAGE ...] [--plan]
+#
+# The app still trains whatever is missing on first use; this builds it all
+# ahead of time, one stage per independent piece of work:
+#
+#   hist_frame, curr_frame   workbook -> preprocess_data
+#   strategy_frame           StrategyData.xlsx
+#   sector_model             walk-forward scores, scaler and base_rf
+#   telemetry_models         extra_models (fits its own, identical, scaler)
+#   strategy_dry/_wet        one strategy pipeline per condition, with its search
+#   qualifying_artifacts     the qualifying joblib files and their compiled copies
+#   strategy_artifacts       f1_strategy_model.joblib and its compiled copy
+#   history_cube             the historical aggregate cube
+#
+# Stages whose dependencies are done run side by side on a process pool
+# (serially with --jobs 1 or where no pool can be started). Each stage writes
+# into <cache dir>/<stage>/<key>/, where the key hashes the input files, the
+# code the stage runs, the library versions, its options and the keys of its
+# dependencies, so a rerun only rebuilds what changed: a new StrategyData.xlsx
+# rebuilds the strategy stages, a new CurrentData.xlsx the qualifying ones and
+# the cube. Finally the outputs are hard-linked (or copied, keeping mtimes,
+# which keeps the compiled manifests' source records valid) into saved_models/.
+# Everything the app writes there later replaces files atomically, so the cache
+# entries are never modified through those links.
+#
+# The cache lives in app/build/artifact_cache/ by default (--cache-dir to move
+# it), outside the Python source set: Chaquopy packages everything under
+# app/src/main/python/ into the APK. The models are trained on the workbooks,
+# never on the ingested dataset store, so a build writes nothing else there
+# but saved_models/.
+
+log = logging.getLogger(__name__)
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.normpath(os.path.join(HERE, "..", "..", "..", "build", "artifact_cache"))
+BUILD_INFO_FILE = os.path.join(qualifying.MODEL_DIR, "build_info.json")
+STRATEGY_XLSX = os.path.join(HERE, "StrategyData.xlsx")
+
+# bump when a stage's outputs change in a way its code hashes don't capture
+PIPELINE_VERSION = "1"
+# cache entries kept per stage (the current one included)
+CACHE_KEEP = 2
+
+STAGE_FILE = "stage.json"
+FRAME_FILE = "frame.npz"
+
+# artifact paths the stages redirect into their own output directory,
+# relative to saved_models/ (captured before any redirection)
+_ARTIFACT_PATHS = {
+    qualifying: ("SCALER_FILE", "BASE_RF_FILE", "EXTRA_FILE", "METRICS_FILE",
+                 "COMPILED_SCALER_FILE", "COMPILED_BASE_RF_FILE", "COMPILED_EXTRA_FILE"),
+    strategy: ("MODEL_FILE", "COMPILED_MODEL_FILE", "SEARCH_CACHE_FILE"),
+}
+_RELATIVE_PATHS = {module: {name: os.path.relpath(getattr(module, name), qualifying.MODEL_DIR)
+                            for name in names}
+                   for module, names in _ARTIFACT_PATHS.items()}
+
+
+@contextmanager
+def _model_dir(root: str):
+    """Point the modules' artifact paths at ``root`` instead of saved_models/."""
+    saved = {module: {name: getattr(module, name) for name in paths}
+             for module, paths in _RELATIVE_PATHS.items()}
+    try:
+        for module, paths in _RELATIVE_PATHS.items():
+            for name, rel in paths.items():
+                setattr(module, name, os.path.join(root, rel))
+        yield
+    finally:
+        for module, values in saved.items():
+            for name, path in values.items():
+                setattr(module, name, path)
+
+
+# =============================
+# STAGES
+# =============================
+
+class Stage:
+    """
+    One step of the pipeline: ``run(out_dir, dep_dirs, options)`` writes its
+    outputs into ``out_dir`` and may return a small JSON-able summary.
+    ``sources`` (input files), ``code`` (module files) and ``options`` (keys
+    of the build options) go into the cache key with the dependencies' keys.
+    """
+
+    def __init__(self, name: str, run: Callable[[str, Dict[str, str], Dict[str, Any]], Optional[dict]],
+                 deps: Sequence[str] = (), sources: Sequence[str] = (), code: Sequence[str] = (),
+                 options: Sequence[str] = (), salt: str = ""):
+        self.name = name
+        self.run = run
+        self.deps = tuple(deps)
+        self.sources = tuple(sources)
+        self.code = tuple(code)
+        self.options = tuple(options)
+        self.salt = salt
+
+
+def _save_frame(path: str, df: pd.DataFrame) -> None:
+    columns = np.array([str(c) for c in df.columns])
+    np.savez(path, columns=columns, **snapshot.frame_to_arrays(df))
+
+
+def _load_frame(stage_dir: str) -> pd.DataFrame:
+    with np.load(os.path.join(stage_dir, FRAME_FILE), allow_pickle=False) as npz:
+        return snapshot.arrays_to_frame(npz, [str(c) for c in npz["columns"]])
+
+
+def _all_data(deps: Dict[str, str]) -> pd.DataFrame:
+    return pd.concat([_load_frame(deps["hist_frame"]), _load_frame(deps["curr_frame"])], ignore_index=True)
+
+
+def _workbook_frame(source: str, preprocess: bool):
+    def run(out, deps, options):
+        df = pd.read_excel(source)
+        if preprocess:
+            df = qualifying.preprocess_data(df)
+        _save_frame(os.path.join(out, FRAME_FILE), df)
+        return {"rows": len(df)}
+    return run
+
+
+def _run_sector_model(out, deps, options):
+    import joblib
+
+    scaler, base_rf, scores = qualifying.fit_sector_model(
+        _all_data(deps), options["max_folds"], options["fold_jobs"], options["engine"])
+    joblib.dump(scaler, os.path.join(out, "scaler.joblib"))
+    joblib.dump(base_rf, os.path.join(out, "base_rf.joblib"))
+    with open(os.path.join(out, "walk_forward_metrics.json"), "w") as fh:
+        json.dump(scores, fh, indent=2)
+    return {"mean_mae": scores["mean_mae"]}
+
+
+def _run_telemetry_models(out, deps, options):
+    import joblib
+
+    extra_models = qualifying.fit_extra_models(
+        _all_data(deps), telemetry_layout=options["telemetry_layout"], engine=options["engine"])
+    joblib.dump(extra_models, os.path.join(out, "extra_models.joblib"))
+    return {"models": len(extra_models)}
+
+
+def _strategy_condition(condition: str):
+    def run(out, deps, options):
+        import joblib
+
+        frames, encoders = strategy.prepare_training_data(_load_frame(deps["strategy_frame"]))
+        # no search cache from saved_models/: it is not part of the stage key, and
+        # this stage's own cache entry already skips the search while its key holds
+        model, searched = strategy.train_condition(condition, frames[condition], options["strategy_profile"], {})
+        joblib.dump({"model": model, "encoders": encoders}, os.path.join(out, "model.joblib"))
+        with open(os.path.join(out, "search_cache.json"), "w") as fh:
+            json.dump(dict([searched]) if searched else {}, fh, indent=1)
+        return {"samples": len(frames[condition]), "searched": searched is not None}
+    return run
+
+
+def _link(src: str, dst: str) -> None:
+    """Make ``dst`` the same file as ``src``: a hard link where possible, else a copy with its mtime."""
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        return
+    tmp = dst + ".tmp-link"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copy2(src, tmp)
+    os.replace(tmp, dst)
+
+
+def _run_qualifying_artifacts(out, deps, options):
+    import joblib
+
+    for name in ("scaler.joblib", "base_rf.joblib", "walk_forward_metrics.json"):
+        _link(os.path.join(deps["sector_model"], name), os.path.join(out, name))
+    _link(os.path.join(deps["telemetry_models"], "extra_models.joblib"), os.path.join(out, "extra_models.joblib"))
+    with _model_dir(out):
+        models = [joblib.load(p) for p in (qualifying.SCALER_FILE, qualifying.BASE_RF_FILE, qualifying.EXTRA_FILE)]
+        qualifying.export_compiled_models(*models)
+    return {"engine": getattr(models[1], "engine", "forest")}
+
+
+def _run_strategy_artifacts(out, deps, options):
+    import joblib
+
+    models, encoders = {}, None
+    for condition in strategy.CONDITION_NAMES:
+        saved = joblib.load(os.path.join(deps["strategy_" + condition], "model.joblib"))
+        models[condition] = saved["model"]
+        encoders = encoders or saved["encoders"]  # fitted on the same frame in both stages
+    predictor = strategy.F1StrategyPredictor()
+    predictor.model_data = strategy.assemble_model_data(models, encoders)
+    with _model_dir(out):
+        predictor.save_model()
+    return None
+
+
+def _run_history_cube(out, deps, options):
+    cube = history_cube.build_cube([_load_frame(deps["hist_frame"]), _load_frame(deps["curr_frame"])])
+    cube.save(os.path.join(out, "history_cube.npz"))
+    return {"cells": len(cube), "rows": cube.meta["rows"]}
+
+
+_QUALIFYING_CODE = ("qualifying.py", "walk_forward.py", "model_engines.py", "telemetry_models.py", "dimensions.py")
+
+STAGES: Dict[str, Stage] = {stage.name: stage for stage in (
+    Stage("hist_frame", _workbook_frame(qualifying.HIST_XLSX, True), sources=[qualifying.HIST_XLSX],
+          code=["dimensions.py"], salt=qualifying.PREPROCESS_VERSION),
+    Stage("curr_frame", _workbook_frame(qualifying.CURR_XLSX, True), sources=[qualifying.CURR_XLSX],
+          code=["dimensions.py"], salt=qualifying.PREPROCESS_VERSION),
+    Stage("strategy_frame", _workbook_frame(STRATEGY_XLSX, False), sources=[STRATEGY_XLSX]),
+    Stage("sector_model", _run_sector_model, deps=["hist_frame", "curr_frame"], code=_QUALIFYING_CODE,
+          options=["engine", "max_folds"]),
+    Stage("telemetry_models", _run_telemetry_models, deps=["hist_frame", "curr_frame"], code=_QUALIFYING_CODE,
+          options=["engine", "telemetry_layout"]),
+    Stage("strategy_dry", _strategy_condition("dry"), deps=["strategy_frame"], code=["strategy.py"],
+          options=["strategy_profile"]),
+    Stage("strategy_wet", _strategy_condition("wet"), deps=["strategy_frame"], code=["strategy.py"],
+          options=["strategy_profile"]),
+    Stage("qualifying_artifacts", _run_qualifying_artifacts, deps=["sector_model", "telemetry_models"],
+          sources=[qualifying.HIST_XLSX, qualifying.CURR_XLSX], code=["qualifying.py", "forest_engine.py"]),
+    Stage("strategy_artifacts", _run_strategy_artifacts, deps=["strategy_dry", "strategy_wet"],
+          sources=[STRATEGY_XLSX], code=["strategy.py", "forest_engine.py"]),
+    Stage("history_cube", _run_history_cube, deps=["hist_frame", "curr_frame"],
+          sources=[qualifying.HIST_XLSX, qualifying.CURR_XLSX], code=["history_cube.py"]),
+)}
+
+# what the bundle step installs from each stage, relative to both its output and
+# saved_models/
+BUNDLE = {
+    "qualifying_artifacts": ["scaler.joblib", "base_rf.joblib", "extra_models.joblib", "walk_forward_metrics.json",
+                             "compiled/scaler.bin", "compiled/base_rf.bin", "compiled/extra_models.bin"],
+    "strategy_artifacts": ["f1_strategy_model.joblib", "compiled/f1_strategy_model.bin"],
+    "history_cube": ["history_cube.npz"],
+}
+# files earlier builds installed that nothing reads any more; bundle removes them
+# so they don't go into the APK
+RETIRED = ["compiled/strategy_table_dry.npy", "compiled/strategy_table_dry_classes.npy",
+           "compiled/strategy_table_wet.npy", "compiled/strategy_table_wet_classes.npy",
+           "compiled/strategy_table.json"]
+
+DEFAULT_OPTIONS = {
+    "engine": qualifying.MODEL_ENGINE,
+    "max_folds": qualifying.WALK_FORWARD_MAX_FOLDS,
+    "telemetry_layout": qualifying.TELEMETRY_LAYOUT,
+    "strategy_profile": "full",
+    # walk-forward worker processes inside the sector_model stage (not part of its key)
+    "fold_jobs": 1,
+}
+
+
+# =============================
+# CACHE KEYS
+# =============================
+
+def _library_versions(options: Dict[str, Any]) -> Dict[str, str]:
+    import sklearn
+
+    versions = dict(forest_engine.library_versions(), pandas=pd.__version__, sklearn=sklearn.__version__)
+    if options["engine"] == "xgboost":
+        import xgboost
+        versions["xgboost"] = xgboost.__version__
+    return versions
+
+
+def with_dependencies(names: Sequence[str]) -> List[str]:
+    """``names`` and everything they depend on, in pipeline order."""
+    unknown = sorted(set(names) - set(STAGES))
+    if unknown:
+        raise ValueError(f"Unknown stages {unknown}; expected some of {list(STAGES)}.")
+    wanted = set()
+    pending = list(names)
+    while pending:
+        name = pending.pop()
+        if name not in wanted:
+            wanted.add(name)
+            pending.extend(STAGES[name].deps)
+    return [name for name in STAGES if name in wanted]
+
+
+def stage_keys(names: Sequence[str], options: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Cache key and the inputs it hashes for each stage (``names`` in pipeline order)."""
+    hashes: Dict[str, str] = {}
+
+    def digest(path):
+        if path not in hashes:
+            hashes[path] = snapshot.file_hash(path)
+        return hashes[path]
+
+    libraries = _library_versions(options)
+    keys: Dict[str, Dict[str, Any]] = {}
+    for name in names:
+        stage = STAGES[name]
+        inputs = {
+            "stage": name, "pipeline": PIPELINE_VERSION, "salt": stage.salt,
+            "sources": {os.path.basename(p): digest(p) for p in stage.sources},
+            "code": {m: digest(os.path.join(HERE, m)) for m in stage.code},
+            "libraries": libraries,
+            "options": {o: options[o] for o in stage.options},
+            "deps": {d: keys[d]["key"] for d in stage.deps},
+        }
+        key = hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+        keys[name] = {"key": key, "inputs": inputs}
+    return keys
+
+
+def _stage_dir(cache_dir: str, name: str, key: str) -> str:
+    return os.path.join(cache_dir, name, key[:16])
+
+
+def _cached_record(out_dir: str, key: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(out_dir, STAGE_FILE)) as fh:
+            record = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    return record if record.get("key") == key else None
+
+
+def _prune(cache_dir: str, name: str, keep_dir: str) -> None:
+    """Drop all but the CACHE_KEEP most recent entries of a stage (never ``keep_dir``)."""
+    root = os.path.join(cache_dir, name)
+    entries = [os.path.join(root, d) for d in os.listdir(root)]
+    entries = sorted((e for e in entries if e != keep_dir), key=os.path.getmtime, reverse=True)
+    for stale in entries[CACHE_KEEP - 1:]:
+        shutil.rmtree(stale, ignore_errors=True)
+
+
+# =============================
+# RUNNING
+# =============================
+
+def _run_stage(name: str, key: str, inputs: Dict[str, Any], out_dir: str,
+               dep_dirs: Dict[str, str], options: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one stage into a scratch directory and move it into place (in a worker process)."""
+    qualifying.USE_DATASET_STORE = False
+    tmp = f"{out_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    start = time.perf_counter()
+    info = STAGES[name].run(tmp, dep_dirs, options)
+    record = {"stage": name, "key": key, "inputs": inputs, "info": info,
+              "seconds": round(time.perf_counter() - start, 3),
+              "built": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    with open(os.path.join(tmp, STAGE_FILE), "w") as fh:
+        json.dump(record, fh, indent=1)
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.replace(tmp, out_dir)
+    return record
+
+
+def _make_pool(jobs: int) -> Optional[ProcessPoolExecutor]:
+    if jobs <= 1:
+        return None
+    try:
+        return ProcessPoolExecutor(max_workers=jobs)
+    except (OSError, ImportError, NotImplementedError, RuntimeError) as e:
+        log.warning("process pool unavailable -> %r", e)
+        return None
+
+
+def _execute(pending: List[str], keys: Dict[str, Dict[str, Any]], dirs: Dict[str, str],
+             options: Dict[str, Any], jobs: int, records: Dict[str, Dict[str, Any]]) -> Dict[str, str]:
+    """
+    Run ``pending`` (in pipeline order), each as soon as its dependencies are
+    done. Returns {stage: error} for stages that failed or were skipped because
+    a dependency failed.
+    """
+    failed: Dict[str, str] = {}
+
+    def submit_args(name):
+        stage = STAGES[name]
+        return (name, keys[name]["key"], keys[name]["inputs"], dirs[name],
+                {d: dirs[d] for d in stage.deps}, options)
+
+    def blocked(name):
+        return [d for d in STAGES[name].deps if d in failed]
+
+    def finish(name, record=None, error=None):
+        if error is None:
+            records[name] = dict(record, cached=False)
+            log.info("%s done in %.1fs", name, record['seconds'])
+        else:
+            failed[name] = error
+            log.error("%s FAILED -> %s", name, error)
+
+    pool = _make_pool(jobs)
+    if pool is None:
+        for name in pending:
+            if blocked(name):
+                failed[name] = f"skipped: {', '.join(blocked(name))} failed"
+                continue
+            log.info("%s…", name)
+            try:
+                finish(name, _run_stage(*submit_args(name)))
+            except Exception as e:
+                finish(name, error=repr(e))
+        return failed
+
+    waiting = list(pending)
+    running = {}
+    with pool:
+        while waiting or running:
+            for name in list(waiting):
+                if blocked(name):
+                    waiting.remove(name)
+                    failed[name] = f"skipped: {', '.join(blocked(name))} failed"
+                elif all(d in records for d in STAGES[name].deps):
+                    waiting.remove(name)
+                    log.info("%s…", name)
+                    running[pool.submit(_run_stage, *submit_args(name))] = name
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    finish(name, future.result())
+                except Exception as e:
+                    finish(name, error=repr(e))
+    return failed
+
+
+def bundle(dirs: Dict[str, str], model_dir: str = qualifying.MODEL_DIR,
+           compiled_only: bool = False) -> List[str]:
+    """
+    Install the built artifacts of the stages in ``dirs`` into ``model_dir``,
+    merging their compiled-model manifest entries and search results into the
+    existing ones, and remove RETIRED files. With ``compiled_only`` the joblib
+    files are left out (and stale ones removed): the app then serves the
+    compiled models alone.
+    """
+    installed = []
+    for rel in RETIRED:
+        if os.path.exists(os.path.join(model_dir, rel)):
+            os.remove(os.path.join(model_dir, rel))
+    manifest_dir = os.path.join(model_dir, "compiled")
+    manifest = forest_engine.read_manifest(manifest_dir)
+    for name, files in BUNDLE.items():
+        if name not in dirs:
+            continue
+        for rel in files:
+            target = os.path.join(model_dir, rel)
+            if compiled_only and rel.endswith(".joblib"):
+                if os.path.exists(target):
+                    os.remove(target)
+                continue
+            _link(os.path.join(dirs[name], rel), target)
+            installed.append(rel)
+        built = forest_engine.read_manifest(os.path.join(dirs[name], "compiled"))
+        manifest["artifacts"].update(built["artifacts"])
+    if installed:
+        os.makedirs(manifest_dir, exist_ok=True)
+        with atomic_write(os.path.join(manifest_dir, forest_engine.MANIFEST_NAME), "w") as fh:
+            json.dump(manifest, fh, indent=1)
+
+    searches = {}
+    for condition in strategy.CONDITION_NAMES:
+        stage_dir = dirs.get("strategy_" + condition)
+        if stage_dir is not None:
+            with open(os.path.join(stage_dir, "search_cache.json")) as fh:
+                searches.update(json.load(fh))
+    if searches:
+        search_file = os.path.join(model_dir, os.path.basename(strategy.SEARCH_CACHE_FILE))
+        try:
+            with open(search_file) as fh:
+                searches = dict(json.load(fh), **searches)
+        except (OSError, ValueError):
+            pass
+        with atomic_write(search_file, "w") as fh:
+            json.dump(searches, fh, indent=1)
+    return installed
+
+
+def build(stages: Optional[Sequence[str]] = None, jobs: Optional[int] = None, force: bool = False,
+          options: Optional[Dict[str, Any]] = None, cache_dir: str = CACHE_DIR,
+          model_dir: Optional[str] = qualifying.MODEL_DIR, compiled_only: bool = False) -> Dict[str, Any]:
+    """
+    Bring ``stages`` (default: all) and their dependencies up to date in the
+    cache, running what changed on up to ``jobs`` processes (default: one per
+    CPU), then install the outputs into ``model_dir`` (skipped if None).
+    Returns the build report, also written to build_info.json next to the
+    models. Raises RuntimeError if a stage failed; nothing is installed then.
+    """
+    start = time.perf_counter()
+    options = dict(DEFAULT_OPTIONS, **(options or {}))
+    names = with_dependencies(stages or list(STAGES))
+    keys = stage_keys(names, options)
+    dirs = {name: _stage_dir(cache_dir, name, keys[name]["key"]) for name in names}
+
+    records: Dict[str, Dict[str, Any]] = {}
+    pending = []
+    for name in names:
+        record = None if force else _cached_record(dirs[name], keys[name]["key"])
+        if record is None:
+            pending.append(name)
+        else:
+            records[name] = dict(record, cached=True)
+    log.info("%d of %d stages cached; running %s", len(names) - len(pending), len(names), pending or "none")
+
+    use_store = qualifying.USE_DATASET_STORE
+    try:
+        failed = _execute(pending, keys, dirs, options, jobs or os.cpu_count() or 1, records)
+    finally:
+        qualifying.USE_DATASET_STORE = use_store
+    if failed:
+        raise RuntimeError(f"{len(failed)} stage(s) failed: {failed}")
+
+    for name in names:
+        _prune(cache_dir, name, dirs[name])
+    report = {
+        "built": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "pipeline": PIPELINE_VERSION,
+        "options": options,
+        "stages": {name: {"key": records[name]["key"], "cached": records[name]["cached"],
+                          "seconds": records[name]["seconds"], "info": records[name]["info"]}
+                   for name in names},
+    }
+    if model_dir is not None:
+        report["installed"] = bundle(dirs, model_dir, compiled_only)
+        with atomic_write(os.path.join(model_dir, os.path.basename(BUILD_INFO_FILE)), "w") as fh:
+            json.dump(report, fh, indent=2)
+    report["seconds"] = round(time.perf_counter() - start, 3)
+    return report
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Build the shipped model artifacts through a cached stage pipeline.")
+    parser.add_argument("--only", nargs="*", choices=list(STAGES), help="these stages and their dependencies")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--force", action="store_true", help="rebuild every selected stage")
+    parser.add_argument("--plan", action="store_true", help="only show which stages would run")
+    parser.add_argument("--engine", default=DEFAULT_OPTIONS["engine"], help="qualifying model engine")
+    parser.add_argument("--strategy-profile", choices=strategy.TRAINING_PROFILES,
+                        default=DEFAULT_OPTIONS["strategy_profile"])
+    parser.add_argument("--fold-jobs", type=int, default=DEFAULT_OPTIONS["fold_jobs"],
+                        help="walk-forward worker processes inside the sector_model stage")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--compiled-only", action="store_true",
+                        help="install only the compiled models, removing the joblib files")
+    parser.add_argument("--no-install", action="store_true", help="build into the cache only")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="[%(name)s] %(message)s")
+
+    options = {"engine": args.engine, "strategy_profile": args.strategy_profile, "fold_jobs": args.fold_jobs}
+    if args.plan:
+        names = with_dependencies(args.only or list(STAGES))
+        keys = stage_keys(names, dict(DEFAULT_OPTIONS, **options))
+        for name in names:
+            key = keys[name]["key"]
+            cached = _cached_record(_stage_dir(args.cache_dir, name, key), key) is not None
+            print(f"{name:<22} {key[:16]}  {'cached' if cached else 'build'}")
+        return 0
+
+    try:
+        report = build(args.only, args.jobs, args.force, options, args.cache_dir,
+                       None if args.no_install else qualifying.MODEL_DIR, args.compiled_only)
+    except RuntimeError as e:
+        print("[BUILD]", e)
+        return 1
+    for name, stage in report["stages"].items():
+        took = "cached" if stage["cached"] else f"{stage['seconds']:.1f}s"
+        print(f"{name:<22} {took}")
+    print(f"[BUILD] done in {report['seconds']:.1f}s; installed {len(report.get('installed', []))} files")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import IO, Any, Callable, Dict, Hashable, Iterator
+
+import metrics
+
+# Guards for the entry points the app calls from coroutines (qualifying.main,
+# strategy.main, ...), which can overlap:
+#
+#     SINGLE_FLIGHT.do(key, fn, *args)
+#         concurrent calls with the same key share one run of fn: the first
+#         caller runs it, the others wait and get its result (or its exception)
+#     with training_lock("qualifying"):   (also usable as a decorator)
+#         model (re)training, one at a time per process
+#     with atomic_write(path) as fh:
+#         written to a unique temp file next to ``path`` and renamed over it
+#         only once complete, so readers never see a half-written artifact and
+#         two writers never share a temp file
+
+_training = threading.RLock()
+
+
+class _Call:
+    __slots__ = ("done", "owner", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.owner = threading.get_ident()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into one execution."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.leaders = 0
+        self.shared = 0
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            elif call.owner != threading.get_ident():
+                self.shared += 1
+        name = key[0] if isinstance(key, tuple) else key
+
+        if not leader:
+            if call.owner == threading.get_ident():
+                # re-entrant call from the thread already running it
+                return fn(*args, **kwargs)
+            metrics.count(f"singleflight.shared.{name}")
+            with metrics.span(f"singleflight.wait.{name}"):
+                call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"leaders": self.leaders, "shared": self.shared, "in_flight": len(self._calls)}
+
+
+SINGLE_FLIGHT = SingleFlight()
+
+
+@contextmanager
+def training_lock(name: str) -> Iterator[None]:
+    """Hold the process-wide training lock (re-entrant); waits are counted per ``name``."""
+    if not _training.acquire(blocking=False):
+        metrics.count(f"training_lock.waits.{name}")
+        with metrics.span(f"training_lock.wait.{name}"):
+            _training.acquire()
+    try:
+        yield
+    finally:
+        _training.release()
+
+
+@contextmanager
+def atomic_write(path: str, mode: str = "wb") -> Iterator[IO]:
+    """Open a temp file for writing that replaces ``path`` when the block exits cleanly."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, mode) as fh:
+            os.chmod(tmp, 0o644)  # mkstemp creates 0600; artifacts are read like any other file
+            yield fh
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
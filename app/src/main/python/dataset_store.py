@@ -0,0 +1,283 @@
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+import snapshot
+from concurrency import atomic_write
+
+# Append-only store of qualifying session rows, for ingesting new race weekends
+# without rebuilding everything from the workbooks.
+#
+#   dataset_store/
+#     manifest.json          version, schema, running statistics, history
+#     hist_000.npz ...       raw rows, one segment per ingestion, per partition
+#     curr_000.npz ...
+#
+# The partitions mirror the two workbooks ("hist" and "curr"), each with the
+# statistics preprocess_data derives from it: per (Year, Team) row counts and
+# sector sums/counts for TeamAvg_S*, and Delta_S* sums/counts for its NaN fill.
+# Appending rows updates those sums from the new rows only; frame() then maps
+# them back onto the rows, giving the same columns preprocess_data would.
+#
+# The store is seeded from the workbooks and remembers their SHA-1. If a
+# workbook changes (e.g. an app update ships new data), rebase() re-seeds it
+# from the new workbooks and re-appends every ingested segment on top, minus
+# the rows the new workbooks already hold (same SESSION_KEYS). The segments it
+# replaces are deleted. A rebase bumps the store's generation, which prefixes
+# the new segment files, so no file a reader may still be using is rewritten.
+
+HERE = os.path.dirname(__file__)
+STORE_DIR = os.path.join(HERE, "dataset_store")
+MANIFEST_NAME = "manifest.json"
+MANIFEST_FILE = os.path.join(STORE_DIR, MANIFEST_NAME)
+
+PARTITIONS = ("hist", "curr")
+SECTOR_TIME_COLS = ['Sector1Time', 'Sector2Time', 'Sector3Time']
+DERIVED_COLS = (['Baseline_S1', 'Baseline_S2', 'Baseline_S3',
+                 'Delta_S1', 'Delta_S2', 'Delta_S3',
+                 'TeamAvg_S1', 'TeamAvg_S2', 'TeamAvg_S3'])
+GROUP_KEYS = ['Year', 'Team']
+# one row per driver per session
+SESSION_KEYS = ['Year', 'RaceNo', 'Driver']
+_STAT_COLS = ['rows', 'n1', 's1', 'n2', 's2', 'n3', 's3']
+HISTORY_LIMIT = 50
+
+
+def _group_sums(raw: pd.DataFrame) -> pd.DataFrame:
+    """Per (Year, Team): row count and non-NaN count / sum of every sector time."""
+    times = raw[SECTOR_TIME_COLS].to_numpy(dtype=float)
+    valid = ~np.isnan(times)
+    parts = {'rows': np.ones(len(raw))}
+    for k in range(3):
+        parts[f'n{k + 1}'] = valid[:, k].astype(float)
+        parts[f's{k + 1}'] = np.where(valid[:, k], times[:, k], 0.0)
+    contrib = pd.DataFrame(parts)
+    for key in GROUP_KEYS:
+        contrib[key] = raw[key].to_numpy()
+    return contrib.groupby(GROUP_KEYS)[_STAT_COLS].sum()
+
+
+def _delta_sums(raw: pd.DataFrame, baselines: np.ndarray) -> np.ndarray:
+    """[[count, sum]] of the non-NaN Delta_S* values of ``raw``: shape (3, 2)."""
+    deltas = raw[SECTOR_TIME_COLS].to_numpy(dtype=float) - baselines[raw['Track'].to_numpy()]
+    valid = ~np.isnan(deltas)
+    return np.stack([valid.sum(axis=0), np.where(valid, deltas, 0.0).sum(axis=0)], axis=1)
+
+
+def derive_columns(raw: pd.DataFrame, team_stats: pd.DataFrame, delta_sums: np.ndarray,
+                   baselines: np.ndarray) -> pd.DataFrame:
+    """
+    ``raw`` plus the columns preprocess_data adds, taken from the running
+    statistics instead of a groupby over every row.
+    """
+    df = raw.reset_index(drop=True)
+    base = baselines[df['Track'].to_numpy()]
+    deltas = df[SECTOR_TIME_COLS].to_numpy(dtype=float) - base
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sums = team_stats[['s1', 's2', 's3']].to_numpy() / team_stats[['n1', 'n2', 'n3']].to_numpy()
+    sums[team_stats[['n1', 'n2', 'n3']].to_numpy() == 0] = np.nan
+    idx = team_stats.index.get_indexer(pd.MultiIndex.from_frame(df[GROUP_KEYS]))
+    team_avg = sums[idx]
+
+    for k in range(3):
+        df[f'Baseline_S{k + 1}'] = base[:, k]
+    for k in range(3):
+        n, s = delta_sums[k]
+        df[f'Delta_S{k + 1}'] = np.where(np.isnan(deltas[:, k]), s / n if n else np.nan, deltas[:, k])
+    rows = team_stats['rows'].to_numpy()
+    for k in range(3):
+        # preprocess_data fills with the row mean of TeamAvg, i.e. group means weighted by rows
+        defined = ~np.isnan(sums[:, k])
+        weight = rows[defined].sum()
+        fill = (rows[defined] * sums[defined, k]).sum() / weight if weight else np.nan
+        col = team_avg[:, k]
+        df[f'TeamAvg_S{k + 1}'] = np.where(np.isnan(col), fill, col)
+    return df
+
+
+class DatasetStore:
+    """The on-disk store: a manifest plus raw-row segments per partition."""
+
+    def __init__(self, root: str, manifest: Dict[str, Any]):
+        self.root = root
+        self.manifest = manifest
+
+    # ---- opening / creating -------------------------------------------------
+
+    @classmethod
+    def open(cls, root: str = STORE_DIR) -> Optional["DatasetStore"]:
+        path = os.path.join(root, MANIFEST_NAME)
+        if not os.path.exists(path):
+            return None
+        with open(path) as fh:
+            return cls(root, json.load(fh))
+
+    @classmethod
+    def create(cls, frames: Dict[str, pd.DataFrame], sources: Dict[str, str],
+               baselines: np.ndarray, root: str = STORE_DIR) -> "DatasetStore":
+        """Seed a new store from the (raw or preprocessed) workbook frames."""
+        os.makedirs(root, exist_ok=True)
+        columns = [c for c in frames[PARTITIONS[0]].columns if c not in DERIVED_COLS]
+        store = cls(root, {
+            "version": 0,
+            "columns": columns,
+            "partitions": {p: {"segments": [], "team_stats": [], "delta_sums": [[0, 0.0]] * 3}
+                           for p in PARTITIONS},
+            "sources": {p: snapshot.source_record(path) for p, path in sources.items()},
+            "history": [],
+        })
+        for p in PARTITIONS:
+            store._add_segment(p, frames[p][columns], baselines)
+        store.manifest["version"] = 0
+        store._write_manifest()
+        return store
+
+    # ---- state --------------------------------------------------------------
+
+    @property
+    def version(self) -> int:
+        return self.manifest["version"]
+
+    @property
+    def tag(self) -> str:
+        """Dataset version tag: ingestion count plus a digest of every segment."""
+        digest = hashlib.sha1()
+        for p in PARTITIONS:
+            for seg in self.manifest["partitions"][p]["segments"]:
+                digest.update(seg["sha1"].encode())
+        return f"{self.version}-{digest.hexdigest()[:8]}"
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self.manifest["columns"])
+
+    def sources_changed(self, sources: Dict[str, str]) -> bool:
+        """True if any workbook differs from the one the store was seeded from."""
+        return snapshot.sources_changed(self.manifest["sources"], sources)
+
+    def team_stats(self, partition: str) -> pd.DataFrame:
+        rows = self.manifest["partitions"][partition]["team_stats"]
+        table = pd.DataFrame(rows, columns=GROUP_KEYS + _STAT_COLS)
+        return table.set_index(GROUP_KEYS).astype(float)
+
+    # ---- reading ------------------------------------------------------------
+
+    def raw_frame(self, partition: str) -> pd.DataFrame:
+        parts = []
+        for seg in self.manifest["partitions"][partition]["segments"]:
+            parts.append(self._read_segment(seg))
+        return pd.concat(parts, ignore_index=True)
+
+    def _read_segment(self, segment: Dict[str, Any]) -> pd.DataFrame:
+        with np.load(os.path.join(self.root, segment["file"]), allow_pickle=False) as npz:
+            return snapshot.arrays_to_frame(npz, self.columns)
+
+    def frame(self, partition: str, baselines: np.ndarray) -> pd.DataFrame:
+        """The partition as preprocess_data would return it."""
+        delta_sums = np.asarray(self.manifest["partitions"][partition]["delta_sums"], dtype=float)
+        return derive_columns(self.raw_frame(partition), self.team_stats(partition), delta_sums, baselines)
+
+    # ---- writing ------------------------------------------------------------
+
+    def append(self, partition: str, raw: pd.DataFrame, baselines: np.ndarray,
+               note: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Add ``raw`` rows (store columns) to ``partition`` as a new segment, update
+        its running statistics and bump the version. Returns what changed.
+        """
+        if partition not in PARTITIONS:
+            raise ValueError(f"Unknown partition {partition!r}; expected one of {PARTITIONS}.")
+        missing = [c for c in self.columns if c not in raw.columns]
+        if missing:
+            raise ValueError(f"New rows are missing columns: {missing}")
+        raw = raw[self.columns].reset_index(drop=True)
+        groups = sorted({(int(y), int(t)) for y, t in raw[GROUP_KEYS].itertuples(index=False)})
+        self._add_segment(partition, raw, baselines)
+        self.manifest["version"] += 1
+        entry = dict(note or {}, version=self.version, partition=partition, rows=len(raw),
+                     groups=[list(g) for g in groups], timestamp=time.strftime("%Y-%m-%dT%H:%M:%S"))
+        self.manifest["history"] = (self.manifest["history"] + [entry])[-HISTORY_LIMIT:]
+        self._write_manifest()
+        return entry
+
+    def rebase(self, frames: Dict[str, pd.DataFrame], sources: Dict[str, str],
+               baselines: np.ndarray) -> Dict[str, Any]:
+        """
+        Re-seed the store from changed workbooks (``frames`` and ``sources`` as
+        for create()) and re-append the ingested segments on top, dropping rows
+        the workbooks now hold. Raises ValueError if the workbooks lack any of
+        the store's columns (the store is then left as it is). Returns the
+        history entry.
+        """
+        missing = sorted({c for p in PARTITIONS for c in self.columns if c not in frames[p].columns})
+        if missing:
+            raise ValueError(f"The new workbooks lack the dataset store's columns {missing}; "
+                             f"cannot carry the ingested sessions over.")
+        ingested = {p: [self._read_segment(seg) for seg in self.manifest["partitions"][p]["segments"][1:]]
+                    for p in PARTITIONS}
+        self.manifest.update(
+            generation=self.manifest.get("generation", 0) + 1,
+            partitions={p: {"segments": [], "team_stats": [], "delta_sums": [[0, 0.0]] * 3} for p in PARTITIONS},
+            sources={p: snapshot.source_record(path) for p, path in sources.items()},
+        )
+        kept = dropped = 0
+        for p in PARTITIONS:
+            base = frames[p][self.columns]
+            self._add_segment(p, base, baselines)
+            shipped = pd.MultiIndex.from_frame(base[SESSION_KEYS].astype(float))
+            for raw in ingested[p]:
+                new = raw[~pd.MultiIndex.from_frame(raw[SESSION_KEYS].astype(float)).isin(shipped)]
+                dropped += len(raw) - len(new)
+                if len(new):
+                    self._add_segment(p, new, baselines)
+                    kept += len(new)
+        self.manifest["version"] += 1
+        entry = {"version": self.version, "rebased": True, "rows_kept": kept, "rows_dropped": dropped,
+                 "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")}
+        self.manifest["history"] = (self.manifest["history"] + [entry])[-HISTORY_LIMIT:]
+        self._write_manifest()
+        self._remove_superseded()
+        return entry
+
+    def annotate_last(self, **fields) -> None:
+        """Attach e.g. retraining results to the latest history entry."""
+        if self.manifest["history"]:
+            self.manifest["history"][-1].update(fields)
+            self._write_manifest()
+
+    def _add_segment(self, partition: str, raw: pd.DataFrame, baselines: np.ndarray) -> None:
+        part = self.manifest["partitions"][partition]
+        generation = self.manifest.get("generation", 0)
+        name = f"{partition}_{len(part['segments']):03d}.npz"
+        if generation:
+            name = f"{partition}_g{generation}_{len(part['segments']):03d}.npz"
+        path = os.path.join(self.root, name)
+        with atomic_write(path) as fh:
+            np.savez(fh, **snapshot.frame_to_arrays(raw))
+        part["segments"].append({"file": name, "rows": len(raw), "sha1": snapshot.file_hash(path)})
+
+        stats = self.team_stats(partition).add(_group_sums(raw), fill_value=0)
+        part["team_stats"] = [[int(y), int(t)] + [float(v) for v in row]
+                              for (y, t), row in zip(stats.index, stats.to_numpy())]
+        part["delta_sums"] = (np.asarray(part["delta_sums"], dtype=float)
+                              + _delta_sums(raw, baselines)).tolist()
+
+    def _write_manifest(self) -> None:
+        with atomic_write(os.path.join(self.root, MANIFEST_NAME), "w") as fh:
+            json.dump(self.manifest, fh, indent=1)
+
+    def _remove_superseded(self) -> None:
+        """Delete the segment files the manifest no longer lists."""
+        listed = {seg["file"] for p in PARTITIONS for seg in self.manifest["partitions"][p]["segments"]}
+        for name in os.listdir(self.root):
+            if name.endswith(".npz") and name not in listed:
+                try:
+                    os.remove(os.path.join(self.root, name))
+                except OSError:
+                    pass
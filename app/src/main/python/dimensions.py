@@ -0,0 +1,195 @@
+from typing import Dict, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Dimension tables shared by qualifying.py and strategy.py.
+#
+# The static dimensions (tracks, drivers, teams) are defined once here and
+# turned into arrays indexed by id, so a hot path looks a column up for many
+# ids with one fancy index instead of a dict lookup per id:
+#
+#     TRACKS.baseline[track_ids]        (n, 3) pole sector times
+#     TRACKS.stint_length[track_ids]    race characteristics for strategy.py
+#
+# Row 0 of every track array holds the defaults (there is no track 0), and
+# TrackTable.index() sends unknown ids there, so DEFAULT_TRACK_INFO /
+# DEFAULT_MAX_PITSTOPS apply without a branch.
+#
+# The per-driver table depends on the data (latest team, TeamAvg_S* and
+# telemetry of each driver's most recent session), so qualifying.py builds a
+# DriverTable from the current frame and rebuilds it when the data changes.
+
+
+# =============================
+# STATIC DIMENSIONS
+# =============================
+
+# Map track number to track names
+track_mapping = {
+    1: 'Abu Dhabi', 2: 'Australia', 3: 'Austria', 4: 'Azerbaijan', 5: 'Bahrain',
+    6: 'Belgium', 7: 'Brazil', 8: 'Canada', 9: 'China', 10: 'Great Britain',
+    11: 'Hungary', 12: 'Imola', 13: 'Italy', 14: 'Japan', 15: 'Las Vegas',
+    16: 'Mexico', 17: 'Miami', 18: 'Monaco', 19: 'Netherlands', 20: 'Qatar',
+    21: 'Saudi Arabia', 22: 'Singapore', 23: 'Spain', 24: 'United States'
+}
+# Map driver ID to short code
+driver_mapping = {
+    1: 'ALB', 2: 'ALO', 3: 'ANT', 4: 'BOR', 5: 'DOO', 6: 'GAS', 7: 'HAD', 8: 'HAM',
+    9: 'HUL', 10: 'LAW', 11: 'LEC', 12: 'NOR', 13: 'OCO', 14: 'PIA', 15: 'RUS',
+    16: 'SAI', 17: 'STR', 18: 'TSU', 19: 'VER', 20: 'BEA', 21: 'BOT', 22: 'LAT',
+    23: 'MAG', 24: 'MSC', 25: 'PER', 26: 'RIC', 27: 'ZHO', 28: 'DEV', 29: 'SAR',
+    30: 'VET', 31: 'COL'
+}
+# Map team ID to team names
+team_mapping = {
+    1: 'WILLIAMS', 2: 'ASTON MARTIN', 3: 'MERCEDES', 4: 'KICK', 5: 'ALPINE',
+    6: 'RACING BULL', 7: 'FERRARI', 8: 'MCLAREN', 9: 'HAAS', 10: 'RED BULL'
+}
+
+# Baseline pole times for each track (e.g. last year’s best Q3 lap)
+track_sector_baselines  = {
+    1: (16.958, 35.776, 29.861),  # Abu Dhabi
+    2: (25.961, 16.997, 32.128),  # Australia
+    3: (16.254,	28.791,	19.269),  # Austria
+    4: (35.702,	40.813,	24.850),  # Azerbaijan
+    5: (28.784,	38.574,	22.483),  # Bahrain
+    6: (31.998,	50.837,	30.324),  # Belgium
+    7: (17.825,	34.909,	16.165),  # Brazil
+    8: (20.057,	22.714,	28.971),  # Canada
+    9: (23.996,	27.227,	39.418),  # China
+    10: (28.016, 34.508, 23.295),  # Great Britain
+    11: (27.606, 26.382, 21.239),  # Hungary
+    12: (23.408, 25.922, 25.416),  # Imola
+    13: (26.492, 26.579, 26.256),  # Italy
+    14: (30.387,	39.355,	17.241),  # Japan
+    15: (25.736,	30.916,	35.660),  # Las Vegas
+    16: (27.037,	29.296,	19.613),  # Mexico
+    17: (28.867,	33.499,	24.875),  # Miami
+    18: (18.386,	33.174,	18.710),  # Monaco
+    19: (23.824,	24.819,	21.030),  # Netherlands
+    20: (29.598,	27.353,	23.569),  # Qatar
+    21: (31.507,	27.756,	28.031),  # Saudi Arabia
+    22: (26.599,	37.630,	25.296),  # Singapore
+    23: (21.383,	28.402,	21.598),  # Spain
+    24: (24.992,	36.887,	30.451),  # United States
+}
+
+# Per-track race characteristics:
+# (avg stint length, track speed, track type, overtaking difficulty, number of laps)
+TRACK_INFO = {
+    1: (21.90, 274.53, 'high_speed', 'medium', 57),
+    2: (20.52, 259.99, 'high_speed', 'medium', 58),
+    3: (20.52, 259.99, 'high_speed', 'medium', 71),
+    4: (22.37, 259.07, 'high_speed', 'medium', 51),
+    5: (15.08, 263.30, 'high_speed', 'low', 66),
+    6: (20.52, 259.99, 'high_speed', 'medium', 44),
+    7: (20.52, 259.99, 'high_speed', 'medium', 71),
+    8: (20.52, 259.99, 'high_speed', 'medium', 70),
+    9: (20.52, 259.99, 'high_speed', 'medium', 56),
+    10: (20.52, 259.99, 'high_speed', 'medium', 52),
+    11: (20.52, 259.99, 'high_speed', 'medium', 70),
+    12: (20.52, 259.99, 'high_speed', 'medium', 63),
+    13: (20.52, 259.99, 'high_speed', 'medium', 53),
+    14: (20.52, 259.99, 'high_speed', 'medium', 53),
+    15: (18.55, 239.07, 'high_speed', 'medium', 50),
+    16: (22.10, 280.69, 'high_speed', 'medium', 71),
+    17: (23.49, 235.59, 'high_speed', 'medium', 57),
+    18: (26.58, 219.80, 'medium_speed', 'high', 78),
+    19: (20.52, 259.99, 'high_speed', 'medium', 72),
+    20: (11.79, 261.35, 'high_speed', 'low', 57),
+    21: (22.16, 280.60, 'high_speed', 'medium', 50),
+    22: (27.37, 271.43, 'high_speed', 'high', 61),
+    23: (20.52, 259.99, 'high_speed', 'medium', 66),
+    24: (17.71, 213.35, 'medium_speed', 'low', 56)
+}
+DEFAULT_TRACK_INFO = (20, 250, 'medium_speed', 'medium', 60)
+
+# Maximum sensible number of pit stops per track
+TRACK_MAX_PITSTOPS = {
+    1: 2, 2: 2, 3: 2, 4: 1, 5: 2, 6: 2, 7: 2, 8: 3, 9: 3, 10: 3,
+    11: 2, 12: 1, 13: 2, 14: 3, 15: 2, 16: 2, 17: 2, 18: 1, 19: 2,
+    20: 2, 21: 1, 22: 1, 23: 2, 24: 1
+}
+DEFAULT_MAX_PITSTOPS = 2
+
+
+# =============================
+# ARRAY-BACKED TABLES
+# =============================
+
+def _by_id(mapping: Dict[int, object], default, dtype=object) -> np.ndarray:
+    """Array indexed by id (0 .. max id) with ``default`` in every unused slot."""
+    out = np.full(max(mapping) + 1, default, dtype=dtype)
+    for key, value in mapping.items():
+        out[key] = value
+    return out
+
+
+class TrackTable:
+    """Per-track columns indexed by track id; row 0 holds the defaults."""
+
+    def __init__(self):
+        ids = sorted(set(track_mapping) | set(track_sector_baselines) | set(TRACK_INFO))
+        size = max(ids) + 1
+        self.known = np.zeros(size, dtype=bool)
+        self.known[list(track_mapping)] = True
+        self.name = _by_id(track_mapping, None)
+        self.baseline = np.full((size, 3), np.nan)
+        for t, b in track_sector_baselines.items():
+            self.baseline[t] = b
+        info = {t: TRACK_INFO.get(t, DEFAULT_TRACK_INFO) for t in range(size)}
+        stint, speed, track_type, overtaking, laps = (np.asarray(col) for col in zip(*info.values()))
+        self.stint_length = stint.astype(float)
+        self.speed = speed.astype(float)
+        self.track_type = track_type.astype(object)
+        self.overtaking = overtaking.astype(object)
+        self.laps = laps.astype(int)
+        self.max_pitstops = np.array([TRACK_MAX_PITSTOPS.get(t, DEFAULT_MAX_PITSTOPS) for t in range(size)])
+
+    def index(self, track_ids) -> np.ndarray:
+        """Row of every id: itself if known, else the defaults row 0."""
+        ids = np.asarray(track_ids, dtype=int)
+        inside = (ids >= 0) & (ids < len(self.known))
+        return np.where(inside & self.known[np.where(inside, ids, 0)], ids, 0)
+
+
+TRACKS = TrackTable()
+DRIVER_CODES = _by_id(driver_mapping, None)
+TEAM_NAMES = _by_id(team_mapping, None)
+
+
+def _lookup(table: np.ndarray, ids: np.ndarray) -> np.ndarray:
+    """table[ids], with None for ids outside the table."""
+    ids = np.asarray(ids, dtype=int)
+    inside = (ids >= 0) & (ids < len(table))
+    return np.where(inside, table[np.where(inside, ids, 0)], None)
+
+
+class DriverTable:
+    """
+    Each current driver's most recent session, as arrays in grid order (the
+    order of those sessions in the frame), plus a driver id -> row index.
+    """
+
+    def __init__(self, latest: pd.DataFrame, columns: Sequence[str]):
+        self.driver = latest['Driver'].to_numpy()
+        self.team = latest['Team'].to_numpy()
+        self.code = _lookup(DRIVER_CODES, self.driver)
+        self.team_name = _lookup(TEAM_NAMES, self.team)
+        # one array per column, keeping each column's dtype
+        self.values = {c: latest[c].to_numpy() for c in columns}
+        self.row = np.full(max(self.driver.max(initial=0), max(driver_mapping)) + 1, -1)
+        self.row[self.driver] = np.arange(len(self.driver))
+
+    @classmethod
+    def from_frame(cls, curr: pd.DataFrame, columns: Sequence[str]) -> "DriverTable":
+        return cls(curr.drop_duplicates('Driver', keep='last').reset_index(drop=True), columns)
+
+    def __len__(self) -> int:
+        return len(self.driver)
+
+    def column(self, name: str, driver_ids=None) -> np.ndarray:
+        """``name`` for every current driver, or for the given driver ids."""
+        values = self.values[name]
+        return values if driver_ids is None else values[self.row[np.asarray(driver_ids)]]
@@ -0,0 +1,679 @@
+import hashlib
+import json
+import logging
+import mmap
+import os
+import platform
+import struct
+import sys
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from concurrency import atomic_write
+
+# NumPy-only inference for the fitted scikit-learn models.
+#
+# compile_estimator() flattens a fitted StandardScaler / RandomForest* /
+# Pipeline / LabelEncoder (or any dict/list of them) into plain arrays, and
+# save()/load() store those arrays in a single artifact file. The compiled
+# objects expose the same predict / predict_proba / transform / classes_
+# surface the app code already calls, so the prediction path runs without
+# importing or unpickling scikit-learn.
+#
+# Every tree of a forest is concatenated into one node table (feature,
+# threshold, left, right, value). Leaves point to themselves, so all trees are
+# walked for all rows at once with ``max_depth`` vectorised steps.
+#
+# The node table is stored compactly: int16 feature ids where they fit and
+# float32 leaf values. Thresholds are float32 too, rounded *down*: sklearn
+# compares float32 features against float64 thresholds, and for a float32 x,
+# x <= t exactly when x <= (largest float32 <= t), so splits are unchanged.
+#
+# Gradient-boosted models (model_engines.BoostedRegressor over
+# HistGradientBoostingRegressor or XGBRegressor boosters) use the same node
+# table: every booster's trees are concatenated, each leaf holding its value in
+# its own output's column, and the prediction is baseline + sum over trees.
+# XGBoost splits on float32 x < t, i.e. x <= (largest float32 below t), which
+# is exact too. HistGradientBoosting compares float64 inputs against midpoints
+# between training values; a float32 input only lands on the other side if it
+# is within float32 rounding of such a midpoint.
+
+log = logging.getLogger(__name__)
+
+
+class CompiledScaler:
+    """StandardScaler.transform."""
+    _fields = ("mean", "scale")
+
+    def __init__(self, mean, scale):
+        self.mean = np.asarray(mean, dtype=float)
+        self.scale = np.asarray(scale, dtype=float)
+
+    def transform(self, X) -> np.ndarray:
+        return (np.asarray(X, dtype=float) - self.mean) / self.scale
+
+
+class CompiledForest:
+    """RandomForestRegressor.predict / RandomForestClassifier.predict_proba."""
+    _fields = ("feature", "threshold", "left", "right", "value", "roots",
+               "max_depth", "is_classifier", "classes_", "n_outputs")
+
+    def __init__(self, feature, threshold, left, right, value, roots,
+                 max_depth, is_classifier, classes_, n_outputs):
+        self.feature = np.asarray(feature)
+        self.threshold = np.asarray(threshold)
+        self.left = np.asarray(left)
+        self.right = np.asarray(right)
+        self.value = np.asarray(value)
+        self.roots = np.asarray(roots)
+        self.max_depth = int(max_depth)
+        self.is_classifier = bool(is_classifier)
+        self.classes_ = None if classes_ is None else np.asarray(classes_)
+        self.n_outputs = int(n_outputs)
+
+    @property
+    def n_estimators(self) -> int:
+        return len(self.roots)
+
+    def apply(self, X) -> np.ndarray:
+        """Leaf index reached by every (tree, row): shape (n_trees, n_rows)."""
+        # float32 features against float32 thresholds (see the module comment)
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(X.shape[0])
+        node = np.repeat(self.roots[:, None], X.shape[0], axis=1)
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[node]] <= self.threshold[node]
+            node = np.where(go_left, self.left[node], self.right[node])
+        return node
+
+    def predict_per_tree(self, X) -> np.ndarray:
+        """Leaf values for every tree: shape (n_trees, n_rows, n_outputs or n_classes)."""
+        return self.value[self.apply(X)]
+
+    def predict(self, X) -> np.ndarray:
+        if self.is_classifier:
+            return self.classes_[self.predict_proba(X).argmax(axis=1)]
+        out = self.predict_per_tree(X).mean(axis=0, dtype=np.float64)
+        return out[:, 0] if self.n_outputs == 1 else out
+
+    def predict_proba(self, X) -> np.ndarray:
+        if not self.is_classifier:
+            raise AttributeError("predict_proba is only available for classifiers")
+        return self.predict_per_tree(X).mean(axis=0, dtype=np.float64)
+
+
+class CompiledBoosting:
+    """model_engines.BoostedRegressor: one boosted ensemble per output, summed per tree."""
+    _fields = ("forest", "baseline", "single_output")
+
+    def __init__(self, forest, baseline, single_output):
+        self.forest = forest
+        self.baseline = np.asarray(baseline, dtype=np.float64)
+        self.single_output = bool(single_output)
+
+    def predict(self, X) -> np.ndarray:
+        out = self.baseline + self.forest.predict_per_tree(X).sum(axis=0, dtype=np.float64)
+        return out[:, 0] if self.single_output else out
+
+
+class CompiledPipeline:
+    """Pipeline of transforms followed by a final estimator."""
+    _fields = ("steps",)
+
+    def __init__(self, steps):
+        self.steps = list(steps)
+
+    def _transform(self, X):
+        for step in self.steps[:-1]:
+            X = step.transform(X)
+        return X
+
+    @property
+    def classes_(self):
+        return self.steps[-1].classes_
+
+    def predict(self, X):
+        return self.steps[-1].predict(self._transform(X))
+
+    def predict_proba(self, X):
+        return self.steps[-1].predict_proba(self._transform(X))
+
+
+class CompiledLabelEncoder:
+    """LabelEncoder.transform / inverse_transform over its sorted classes_."""
+    _fields = ("classes_",)
+
+    def __init__(self, classes_):
+        self.classes_ = np.asarray(classes_)
+
+    def transform(self, y) -> np.ndarray:
+        y = np.asarray(y)
+        if self.classes_.dtype.kind == "U":
+            y = y.astype(str)
+        idx = np.searchsorted(self.classes_, y)
+        idx = np.minimum(idx, len(self.classes_) - 1)
+        unknown = self.classes_[idx] != y
+        if unknown.any():
+            raise ValueError(f"y contains previously unseen labels: {list(y[unknown])}")
+        return idx
+
+    def inverse_transform(self, y) -> np.ndarray:
+        return self.classes_[np.asarray(y, dtype=int)]
+
+
+class CompiledBlock:
+    """telemetry_models.TelemetryBlockModel: multi-output forest on standardised targets."""
+    _fields = ("columns", "model", "y_mean", "y_std")
+
+    def __init__(self, columns, model, y_mean, y_std):
+        self.columns = list(columns)
+        self.model = model
+        self.y_mean = np.asarray(y_mean)
+        self.y_std = np.asarray(y_std)
+
+    def predict(self, X) -> np.ndarray:
+        z = np.asarray(self.model.predict(X)).reshape(len(X), -1)
+        return z * self.y_std + self.y_mean
+
+
+_TYPES = {cls.__name__: cls for cls in
+          (CompiledScaler, CompiledForest, CompiledBoosting, CompiledPipeline, CompiledLabelEncoder,
+           CompiledBlock)}
+
+
+# =============================
+# EXPORT (duck-typed, no sklearn import needed)
+# =============================
+
+def _round_down_f32(threshold: np.ndarray) -> np.ndarray:
+    """Largest float32 <= each threshold: the same split for every float32 input."""
+    t32 = np.asarray(threshold).astype(np.float32)
+    over = t32.astype(np.float64) > threshold
+    t32[over] = np.nextafter(t32[over], np.float32(-np.inf))
+    return t32
+
+
+def _index_array(a: np.ndarray) -> np.ndarray:
+    return a.astype(np.int16 if a.max(initial=0) < np.iinfo(np.int16).max else np.int32)
+
+
+def compact(obj) -> Any:
+    """Bring compiled objects from an older artifact format to the current dtypes."""
+    if isinstance(obj, dict):
+        return {k: compact(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [compact(v) for v in obj]
+    if isinstance(obj, CompiledForest):
+        if obj.threshold.dtype != np.float32:
+            obj.threshold = _round_down_f32(obj.threshold)
+        obj.feature = _index_array(obj.feature)
+        obj.value = obj.value.astype(VALUE_DTYPE)
+    elif isinstance(obj, CompiledBoosting):
+        obj.forest = compact(obj.forest)
+    elif isinstance(obj, CompiledPipeline):
+        obj.steps = compact(obj.steps)
+    elif isinstance(obj, CompiledBlock):
+        obj.model = compact(obj.model)
+    return obj
+
+
+def _compile_forest(forest) -> CompiledForest:
+    is_classifier = hasattr(forest, "classes_")
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset, max_depth = 0, 0
+    for est in forest.estimators_:
+        tree = est.tree_
+        n = tree.node_count
+        leaf = tree.children_left == -1
+        own = np.arange(offset, offset + n)
+        features.append(np.where(leaf, 0, tree.feature))
+        thresholds.append(np.where(leaf, 0.0, tree.threshold))
+        lefts.append(np.where(leaf, own, tree.children_left + offset))
+        rights.append(np.where(leaf, own, tree.children_right + offset))
+        if is_classifier:
+            v = tree.value[:, 0, :]
+            values.append(v / v.sum(axis=1, keepdims=True))
+        else:
+            values.append(tree.value[:, :, 0])
+        roots.append(offset)
+        offset += n
+        max_depth = max(max_depth, tree.max_depth)
+
+    return CompiledForest(
+        feature=_index_array(np.concatenate(features)),
+        threshold=_round_down_f32(np.concatenate(thresholds)),
+        left=np.concatenate(lefts).astype(np.int32),
+        right=np.concatenate(rights).astype(np.int32),
+        value=np.concatenate(values).astype(VALUE_DTYPE),
+        roots=np.asarray(roots, dtype=np.int32),
+        max_depth=max_depth,
+        is_classifier=is_classifier,
+        classes_=forest.classes_ if is_classifier else None,
+        n_outputs=forest.n_outputs_,
+    )
+
+
+def _hist_gb_trees(booster) -> Tuple[List[Dict[str, np.ndarray]], float]:
+    """Node arrays of a fitted HistGradientBoostingRegressor (leaf values include the learning rate)."""
+    trees = []
+    for (predictor,) in booster._predictors:
+        nodes = predictor.nodes
+        trees.append({"leaf": nodes["is_leaf"].astype(bool), "feature": nodes["feature_idx"],
+                      "threshold": _round_down_f32(nodes["num_threshold"]),
+                      "left": nodes["left"], "right": nodes["right"], "value": nodes["value"]})
+    return trees, float(np.ravel(booster._baseline_prediction)[0])
+
+
+def _xgboost_trees(booster) -> Tuple[List[Dict[str, np.ndarray]], float]:
+    """Node arrays of a fitted XGBRegressor, from its JSON model dump."""
+    model = json.loads(bytes(booster.get_booster().save_raw("json")))["learner"]
+    trees = []
+    for tree in model["gradient_booster"]["model"]["trees"]:
+        left = np.asarray(tree["left_children"], dtype=np.int64)
+        cond = np.asarray(tree["split_conditions"], dtype=np.float32)
+        leaf = left == -1
+        # x < t on float32 inputs is x <= the next float32 below t
+        threshold = np.nextafter(cond, np.float32(-np.inf))
+        trees.append({"leaf": leaf, "feature": np.asarray(tree["split_indices"]), "threshold": threshold,
+                      "left": left, "right": np.asarray(tree["right_children"]),
+                      "value": np.where(leaf, cond, 0.0)})
+    # "5E-1" in older releases, "[5E-1]" (one per target) in newer ones
+    base_score = float(model["learner_model_param"]["base_score"].strip("[]").split(",")[0])
+    return trees, base_score
+
+
+def _tree_depth(left: np.ndarray, right: np.ndarray, leaf: np.ndarray) -> int:
+    depth, frontier = 0, np.array([0])
+    while True:
+        inner = frontier[~leaf[frontier]]
+        if not len(inner):
+            return depth
+        frontier = np.concatenate([left[inner], right[inner]])
+        depth += 1
+
+
+def _compile_boosting(obj) -> CompiledBoosting:
+    n_outputs = obj.n_outputs_
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    baseline = np.zeros(n_outputs)
+    offset, max_depth = 0, 0
+    for k, booster in enumerate(obj.boosters_):
+        name = type(booster).__name__
+        if name == "HistGradientBoostingRegressor":
+            trees, baseline[k] = _hist_gb_trees(booster)
+        elif name == "XGBRegressor":
+            trees, baseline[k] = _xgboost_trees(booster)
+        else:
+            raise TypeError(f"Don't know how to compile {name}")
+        for t in trees:
+            n = len(t["leaf"])
+            own = np.arange(offset, offset + n)
+            features.append(np.where(t["leaf"], 0, t["feature"]))
+            thresholds.append(np.where(t["leaf"], np.float32(0), t["threshold"]).astype(np.float32))
+            lefts.append(np.where(t["leaf"], own, np.asarray(t["left"]) + offset))
+            rights.append(np.where(t["leaf"], own, np.asarray(t["right"]) + offset))
+            value = np.zeros((n, n_outputs))
+            value[:, k] = np.where(t["leaf"], t["value"], 0.0)
+            values.append(value)
+            roots.append(offset)
+            offset += n
+            max_depth = max(max_depth, _tree_depth(np.asarray(t["left"]), np.asarray(t["right"]), t["leaf"]))
+
+    forest = CompiledForest(
+        feature=_index_array(np.concatenate(features)),
+        threshold=np.concatenate(thresholds),
+        left=np.concatenate(lefts).astype(np.int32),
+        right=np.concatenate(rights).astype(np.int32),
+        value=np.concatenate(values).astype(VALUE_DTYPE),
+        roots=np.asarray(roots, dtype=np.int32),
+        max_depth=max_depth,
+        is_classifier=False,
+        classes_=None,
+        n_outputs=n_outputs,
+    )
+    return CompiledBoosting(forest, baseline, obj.single_output_)
+
+
+def compile_estimator(obj) -> Any:
+    """Convert a fitted estimator (or a dict/list of them) to its compiled form."""
+    name = type(obj).__name__
+    if isinstance(obj, dict):
+        return {k: compile_estimator(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [compile_estimator(v) for v in obj]
+    if name in _TYPES or obj is None or isinstance(obj, (str, int, float, bool, np.ndarray)):
+        return obj
+    if name == "StandardScaler":
+        n = obj.n_features_in_
+        mean = obj.mean_ if obj.mean_ is not None else np.zeros(n)
+        scale = obj.scale_ if obj.scale_ is not None else np.ones(n)
+        return CompiledScaler(mean, scale)
+    if name == "Pipeline":
+        return CompiledPipeline([compile_estimator(step) for _, step in obj.steps])
+    if name == "LabelEncoder":
+        return CompiledLabelEncoder(obj.classes_)
+    if name == "TelemetryBlockModel":
+        return CompiledBlock(obj.columns, compile_estimator(obj.model), obj.y_mean, obj.y_std)
+    if name == "BoostedRegressor":
+        return _compile_boosting(obj)
+    if hasattr(obj, "estimators_") and hasattr(obj.estimators_[0], "tree_"):
+        return _compile_forest(obj)
+    raise TypeError(f"Don't know how to compile {name}")
+
+
+# =============================
+# STORAGE (single-file artifacts + manifest, no pickle)
+# =============================
+
+# Artifact layout, read with one read() or memory-mapped:
+#
+#   MAGIC | header length (uint64) | JSON header | arrays, each 64-byte aligned
+#
+# The header holds the object spec and, per array, its dtype, shape, offset,
+# stored size and codec ("raw", or "zlib" when saved with compress=True). Raw
+# arrays are views into the file; zlib ones are inflated on load.
+#
+# export() compresses by default (COMPRESS_ARTIFACTS), since the artifacts ship
+# in the APK: per benchmarks/artifact_report.py the qualifying and strategy
+# artifacts go from 53 MB to 16 MB, for about 0.5 s more load time in total,
+# paid once per process (model_registry keeps them resident).
+#
+# Every export also records the artifact in MANIFEST_NAME next to it: format
+# version, library versions, SHA-256 and size, the source it was compiled from
+# (size/mtime/SHA-1) and whatever the caller adds (feature lists, data hash).
+# is_fresh() trusts that record over file times, so an artifact stays usable
+# when its sklearn source is missing or can no longer be unpickled.
+
+FORMAT_VERSION = 2
+MAGIC = b"SLPSTRM\x00"
+ALIGN = 64
+VALUE_DTYPE = np.float32
+COMPRESS_ARTIFACTS = True
+MANIFEST_NAME = "manifest.json"
+# artifacts written by FORMAT_VERSION 1 (np.savez); converted on first load
+LEGACY_SUFFIX = ".npz"
+
+
+def _encode(obj, arrays: Dict[str, np.ndarray]) -> Any:
+    if isinstance(obj, np.ndarray):
+        key = f"a{len(arrays)}"
+        # string labels arrive as object arrays; store them without pickle
+        arrays[key] = obj.astype(str) if obj.dtype == object else obj
+        return {"__array__": key}
+    if type(obj).__name__ in _TYPES:
+        return {"__type__": type(obj).__name__,
+                "fields": {f: _encode(getattr(obj, f), arrays) for f in obj._fields}}
+    if isinstance(obj, dict):
+        return {"__dict__": [[k, _encode(v, arrays)] for k, v in obj.items()]}
+    if isinstance(obj, (list, tuple)):
+        return {"__list__": [_encode(v, arrays) for v in obj]}
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return obj
+
+
+def _decode(spec, arrays) -> Any:
+    if isinstance(spec, dict):
+        if "__array__" in spec:
+            return arrays[spec["__array__"]]
+        if "__type__" in spec:
+            fields = {f: _decode(v, arrays) for f, v in spec["fields"].items()}
+            return _TYPES[spec["__type__"]](**fields)
+        if "__dict__" in spec:
+            return {k: _decode(v, arrays) for k, v in spec["__dict__"]}
+        if "__list__" in spec:
+            return [_decode(v, arrays) for v in spec["__list__"]]
+    return spec
+
+
+def _padding(n: int) -> int:
+    return -n % ALIGN
+
+
+def save(path: str, obj: Any, compress: bool = False) -> None:
+    """Write a compiled object tree to ``path`` (written atomically)."""
+    arrays: Dict[str, np.ndarray] = {}
+    spec = _encode(obj, arrays)
+    blobs, table, offset = [], {}, 0
+    for key, a in arrays.items():
+        data = np.ascontiguousarray(a).tobytes()
+        codec = "raw"
+        if compress:
+            packed = zlib.compress(data, 6)
+            if len(packed) < len(data):
+                data, codec = packed, "zlib"
+        table[key] = [a.dtype.str, list(a.shape), offset, len(data), codec]
+        blobs.append(data)
+        offset += len(data) + _padding(len(data))
+
+    header = json.dumps({"format": FORMAT_VERSION, "spec": spec, "arrays": table}).encode()
+    start = len(MAGIC) + 8 + len(header)
+    header += b" " * _padding(start)
+    with atomic_write(path) as fh:
+        fh.write(MAGIC + struct.pack("<Q", len(header)) + header)
+        for data in blobs:
+            fh.write(data + b"\0" * _padding(len(data)))
+
+
+def _load_legacy(path: str) -> Any:
+    with np.load(path, allow_pickle=False) as npz:
+        return compact(_decode(json.loads(str(npz["__spec__"])), npz))
+
+
+def load(path: str, use_mmap: bool = True) -> Any:
+    """
+    Read an artifact. Raw arrays are views into a read-only memory map (or into
+    one read() of the file with ``use_mmap=False``); format-1 .npz files load too.
+    """
+    with open(path, "rb") as fh:
+        if fh.read(len(MAGIC)) != MAGIC:
+            return _load_legacy(path)
+        (header_len,) = struct.unpack("<Q", fh.read(8))
+        header = json.loads(fh.read(header_len))
+        base = len(MAGIC) + 8 + header_len
+        if use_mmap and os.fstat(fh.fileno()).st_size > base:
+            buf = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            fh.seek(0)
+            buf = fh.read()
+    if header["format"] > FORMAT_VERSION:
+        raise ValueError(f"{path} has artifact format {header['format']}; "
+                         f"this build reads up to {FORMAT_VERSION}.")
+
+    arrays = {}
+    for key, (dtype, shape, offset, size, codec) in header["arrays"].items():
+        dtype = np.dtype(dtype)
+        count = int(np.prod(shape))
+        if codec == "zlib":
+            a = np.frombuffer(zlib.decompress(buf[base + offset:base + offset + size]), dtype=dtype)
+        else:
+            a = np.frombuffer(buf, dtype=dtype, count=count, offset=base + offset)
+        arrays[key] = a.reshape(shape)
+    return _decode(header["spec"], arrays)
+
+
+# =============================
+# MANIFEST
+# =============================
+
+def _sha(path: str, algorithm: str = "sha256") -> str:
+    digest = hashlib.new(algorithm)
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _signature(path: str) -> Dict[str, Any]:
+    st = os.stat(path)
+    return {"file": os.path.basename(path), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def library_versions() -> Dict[str, str]:
+    """Versions the artifacts are written with (sklearn only if already imported)."""
+    versions = {"python": platform.python_version(), "numpy": np.__version__}
+    sklearn = sys.modules.get("sklearn")
+    if sklearn is not None:
+        versions["sklearn"] = sklearn.__version__
+    return versions
+
+
+def _manifest_path(artifact_path: str) -> str:
+    return os.path.join(os.path.dirname(artifact_path), MANIFEST_NAME)
+
+
+def read_manifest(directory: str) -> Dict[str, Any]:
+    path = os.path.join(directory, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {"artifacts": {}}
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def manifest_entry(artifact_path: str) -> Optional[Dict[str, Any]]:
+    return read_manifest(os.path.dirname(artifact_path))["artifacts"].get(os.path.basename(artifact_path))
+
+
+_manifest_lock = threading.Lock()
+
+
+def _record(artifact_path: str, source_path: Optional[str], meta: Optional[Dict[str, Any]]) -> None:
+    entry = dict(meta or {})
+    entry.update(format=FORMAT_VERSION, libraries=library_versions(),
+                 size=os.path.getsize(artifact_path), sha256=_sha(artifact_path),
+                 created=time.strftime("%Y-%m-%dT%H:%M:%S"))
+    if source_path is not None and os.path.exists(source_path):
+        entry["source"] = dict(_signature(source_path), sha1=_sha(source_path, "sha1"))
+    # read-modify-write: artifacts exported from different threads share the manifest
+    with _manifest_lock:
+        manifest = read_manifest(os.path.dirname(artifact_path))
+        manifest["artifacts"][os.path.basename(artifact_path)] = entry
+        with atomic_write(_manifest_path(artifact_path), "w") as fh:
+            json.dump(manifest, fh, indent=1)
+        _fresh_cache.clear()
+
+
+def _rerecord_source(artifact_path: str, source_path: str) -> None:
+    """Store the source's new size and mtime once its content was found unchanged."""
+    with _manifest_lock:
+        try:
+            manifest = read_manifest(os.path.dirname(artifact_path))
+            recorded = manifest["artifacts"].get(os.path.basename(artifact_path), {}).get("source")
+            if recorded is None:
+                return
+            recorded.update(_signature(source_path))
+            with atomic_write(_manifest_path(artifact_path), "w") as fh:
+                json.dump(manifest, fh, indent=1)
+        except OSError as e:
+            # read-only install dir: is_fresh's in-process cache still hashes only once
+            log.warning("could not update %s -> %r", _manifest_path(artifact_path), e)
+
+
+def verify(artifact_path: str) -> bool:
+    """True if the artifact's SHA-256 matches its manifest entry."""
+    entry = manifest_entry(artifact_path)
+    return (entry is not None and os.path.exists(artifact_path)
+            and _sha(artifact_path) == entry["sha256"])
+
+
+def export(obj: Any, path: str, source: Optional[str] = None,
+           meta: Optional[Dict[str, Any]] = None, compress: Optional[bool] = None) -> Any:
+    """
+    compile_estimator + save, recorded in the manifest with the ``source`` file
+    it came from and ``meta``; returns the compiled object. ``compress``
+    defaults to COMPRESS_ARTIFACTS.
+    """
+    compiled = compile_estimator(obj)
+    save(path, compiled, compress=COMPRESS_ARTIFACTS if compress is None else compress)
+    _record(path, source, meta)
+    return compiled
+
+
+def legacy_path(path: str) -> str:
+    return os.path.splitext(path)[0] + LEGACY_SUFFIX
+
+
+def upgrade_legacy(path: str, source: Optional[str] = None,
+                   meta: Optional[Callable[[], Dict[str, Any]]] = None) -> bool:
+    """
+    Convert a format-1 artifact next to ``path`` into the current format, so an
+    app update keeps working from the old files instead of recompiling (or
+    retraining). Format-1 files had no manifest: ``meta()``, called only when
+    converting, gives what an export of the artifact would record. Returns True
+    if a conversion happened.
+    """
+    old = legacy_path(path)
+    if os.path.exists(path) or old == path or not os.path.exists(old):
+        return False
+    save(path, load(old), compress=COMPRESS_ARTIFACTS)
+    # vouch for the source, and the data it was trained on, only if the old
+    # file was up to date with it
+    fresh = source is not None and is_fresh(old, [source])
+    meta = dict(meta() if meta is not None else {})
+    if not fresh:
+        meta.pop("data_hash", None)
+    meta.update(converted_from=os.path.basename(old), converted_from_sha1=_sha(old, "sha1"))
+    _record(path, source if fresh else None, meta)
+    # keep the old file's age so freshness against the source is unchanged
+    st = os.stat(old)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+    os.remove(old)
+    return True
+
+
+# is_fresh answers per (artifact, sources), valid while the artifact's and the
+# sources' size and mtime are unchanged; every manifest write drops them
+_fresh_cache: Dict[Tuple[str, Tuple[str, ...]], Tuple[Tuple, bool]] = {}
+
+
+def _stat_signature(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def is_fresh(compiled_path: str, source_paths: List[str]) -> bool:
+    """
+    True if ``compiled_path`` exists and was compiled from the current version
+    of every existing source: by its manifest record when there is one (size and
+    mtime, then SHA-1), otherwise by file times. A source whose content matches
+    under a new size or mtime is re-recorded, and the answer is kept until a
+    source or the artifact itself changes, so repeated calls only stat files.
+    """
+    key = (compiled_path, tuple(source_paths))
+    # the artifact's own signature too: a deleted or replaced artifact must not
+    # be vouched for by an earlier answer
+    signatures = tuple(_stat_signature(p) for p in [compiled_path] + list(source_paths))
+    cached = _fresh_cache.get(key)
+    if cached is not None and cached[0] == signatures:
+        return cached[1]
+    fresh = _check_fresh(compiled_path, source_paths)
+    _fresh_cache[key] = (signatures, fresh)
+    return fresh
+
+
+def _check_fresh(compiled_path: str, source_paths: List[str]) -> bool:
+    if not os.path.exists(compiled_path):
+        return False
+    entry = manifest_entry(compiled_path)
+    recorded = (entry or {}).get("source")
+    existing = [p for p in source_paths if os.path.exists(p)]
+    if recorded is None:
+        mtime = os.path.getmtime(compiled_path)
+        return all(os.path.getmtime(p) <= mtime for p in existing)
+    for p in existing:
+        sig = _signature(p)
+        if sig["file"] != recorded["file"]:
+            return False
+        if (sig["size"], sig["mtime_ns"]) != (recorded["size"], recorded["mtime_ns"]):
+            if _sha(p, "sha1") != recorded["sha1"]:
+                return False
+            # same content under new file times (copied or re-extracted): hash it once
+            _rerecord_source(compiled_path, p)
+    return True
@@ -0,0 +1,447 @@
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import dimensions
+import metrics
+import qualifying
+import snapshot
+from concurrency import SINGLE_FLIGHT, atomic_write
+
+# Precomputed historical aggregates for "how does this compare to history".
+#
+# Every qualifying session in hist + curr is folded into one cell per
+# (track, driver, team, year). A cell holds, for each measure, the count, sum,
+# sum of squares, minimum and maximum of its non-NaN values, so any union of
+# cells reduces to count / mean / std / min / max with a few array sums:
+#
+#   keys         (cells, 4) int32    track, driver, team, year (sorted)
+#   count        (cells, M) int32    non-NaN values per measure
+#   total        (cells, M) float64  sums          (0 where count is 0)
+#   squares      (cells, M) float64  sums of squares
+#   low / high   (cells, M) float64  min / max     (NaN where count is 0)
+#   index        (T, D, K, Y) int32  cell row of every key, -1 where empty
+#
+# The measures are the sector times and the lap time, their deltas against
+# track_sector_baselines (per session, so they stay meaningful across tracks)
+# and the telemetry columns (qualifying.EXTRA_COLS). The cells are sparse, but
+# the dense index turns a query into slicing plus a gather of the matching rows:
+# no frame is filtered.
+#
+# The cube is snapshotted to snapshots/history_cube.npz together with the data
+# it was built from (dataset version and workbook signatures) and rebuilt when
+# that data changes; until the first snapshot is written, the copy bundled in
+# saved_models/ is served if it matches. ingest.py folds newly ingested rows
+# into the snapshot instead, since cells only ever add up.
+
+log = logging.getLogger(__name__)
+
+CUBE_FILE = os.path.join(snapshot.SNAPSHOT_DIR, "history_cube.npz")
+# the copy build_artifacts.py bundles with the app, used while it matches the data
+BUNDLED_CUBE_FILE = os.path.join(qualifying.MODEL_DIR, "history_cube.npz")
+# bump whenever the measures or the cell statistics change
+CUBE_VERSION = "1"
+
+AXES = ("track", "driver", "team", "year")
+KEY_COLS = ['Track', 'Driver', 'Team', 'Year']
+DELTA_COLS = ['Delta_S1', 'Delta_S2', 'Delta_S3', 'Delta_Lap']
+MEASURES = qualifying.SECTOR_TIME_COLS + ['LapTime'] + DELTA_COLS + qualifying.EXTRA_COLS
+STATS = ("count", "mean", "std", "min", "max")
+
+_CELL_ARRAYS = ("keys", "count", "total", "squares", "low", "high")
+_META_KEY = "__meta__"
+
+
+def measure_values(df: pd.DataFrame) -> np.ndarray:
+    """(rows, len(MEASURES)) values of every measure for raw or preprocessed session rows."""
+    times = df[qualifying.SECTOR_TIME_COLS].to_numpy(dtype=float)
+    lap = times.sum(axis=1)
+    baselines = dimensions.TRACKS.baseline[dimensions.TRACKS.index(df['Track'].to_numpy())]
+    # recomputed from the times: preprocess_data's Delta_S* have their NaNs filled
+    deltas = np.column_stack([times - baselines, lap - baselines.sum(axis=1)])
+    extras = df[qualifying.EXTRA_COLS].to_numpy(dtype=float)
+    return np.column_stack([times, lap, deltas, extras])
+
+
+def _reduce(keys, count, total, squares, low, high) -> Tuple[np.ndarray, ...]:
+    """Merge the rows that share a key; returns the cell arrays sorted by key."""
+    if not len(keys):
+        return keys, count, total, squares, low, high
+    order = np.lexsort(keys.T[::-1])
+    keys = keys[order]
+    starts = np.flatnonzero(np.r_[True, (keys[1:] != keys[:-1]).any(axis=1)])
+    return (keys[starts],
+            np.add.reduceat(count[order], starts),
+            np.add.reduceat(total[order], starts),
+            np.add.reduceat(squares[order], starts),
+            np.fmin.reduceat(low[order], starts),
+            np.fmax.reduceat(high[order], starts))
+
+
+def _cells_from_rows(df: pd.DataFrame) -> Tuple[np.ndarray, ...]:
+    """One single-session cell per row, before _reduce merges them."""
+    values = measure_values(df)
+    valid = ~np.isnan(values)
+    total = np.where(valid, values, 0.0)
+    return (df[KEY_COLS].to_numpy(dtype=np.int32), valid.astype(np.int32),
+            total, total * total, values, values)
+
+
+class HistoryCube:
+    """Per (track, driver, team, year) statistics of every measure, with a query API."""
+
+    def __init__(self, keys, count, total, squares, low, high, meta: Optional[Dict[str, Any]] = None):
+        self.keys = np.asarray(keys, dtype=np.int32).reshape(-1, len(AXES))
+        self.count = np.asarray(count, dtype=np.int32)
+        self.total = np.asarray(total, dtype=float)
+        self.squares = np.asarray(squares, dtype=float)
+        self.low = np.asarray(low, dtype=float)
+        self.high = np.asarray(high, dtype=float)
+        self.meta = dict(meta or {})
+        self.measures = list(self.meta.get("measures", MEASURES))
+        self._column = {m: i for i, m in enumerate(self.measures)}
+
+        self.year0 = int(self.keys[:, 3].min()) if len(self.keys) else 0
+        coords = self.keys - np.array([0, 0, 0, self.year0], dtype=np.int32)
+        shape = tuple(coords.max(axis=0) + 1) if len(coords) else (0,) * len(AXES)
+        self.index = np.full(shape, -1, dtype=np.int32)
+        self.index[tuple(coords.T)] = np.arange(len(coords), dtype=np.int32)
+
+    # ---- building -----------------------------------------------------------
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, meta: Optional[Dict[str, Any]] = None) -> "HistoryCube":
+        return cls(*_reduce(*_cells_from_rows(df)), meta=meta)
+
+    def with_rows(self, rows: pd.DataFrame, meta: Optional[Dict[str, Any]] = None) -> "HistoryCube":
+        """
+        A new cube with ``rows`` folded in (this one is left as it is): their
+        existing cells are updated in place of a rebuild, new cells are added.
+        """
+        keys, *parts = _reduce(*_cells_from_rows(rows))
+        at = self.row_of(keys)
+        hit = at >= 0
+        count, total, squares = (a.copy() for a in (self.count, self.total, self.squares))
+        for array, part in zip((count, total, squares), parts[:3]):
+            array[at[hit]] += part[hit]
+        low, high = self.low.copy(), self.high.copy()
+        low[at[hit]] = np.fmin(low[at[hit]], parts[3][hit])
+        high[at[hit]] = np.fmax(high[at[hit]], parts[4][hit])
+        cells = [self.keys, count, total, squares, low, high]
+        if not hit.all():
+            cells = [np.concatenate([c, p[~hit]]) for c, p in zip(cells, [keys] + parts)]
+            order = np.lexsort(cells[0].T[::-1])
+            cells = [c[order] for c in cells]
+        return HistoryCube(*cells, meta=dict(self.meta, **(meta or {})))
+
+    # ---- snapshot -----------------------------------------------------------
+
+    def save(self, path: str) -> None:
+        meta = dict(self.meta, measures=self.measures)
+        with atomic_write(path) as fh:
+            np.savez(fh, **{name: getattr(self, name) for name in _CELL_ARRAYS},
+                     **{_META_KEY: np.array(json.dumps(meta))})
+
+    @classmethod
+    def load(cls, path: str) -> "HistoryCube":
+        with np.load(path, allow_pickle=False) as npz:
+            meta = json.loads(str(npz[_META_KEY]))
+            return cls(*(npz[name] for name in _CELL_ARRAYS), meta=meta)
+
+    # ---- queries ------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def row_of(self, keys) -> np.ndarray:
+        """Cell row of each (track, driver, team, year) key; -1 where the cube has none."""
+        coords = np.asarray(keys, dtype=np.int64).reshape(-1, len(AXES)) - np.array([0, 0, 0, self.year0])
+        inside = ((coords >= 0) & (coords < np.array(self.index.shape))).all(axis=1)
+        out = np.full(len(coords), -1, dtype=np.int32)
+        out[inside] = self.index[tuple(coords[inside].T)]
+        return out
+
+    def columns(self, measures=None) -> np.ndarray:
+        """Column positions of ``measures`` (a name, a list of names, or None for all)."""
+        if measures is None:
+            return np.arange(len(self.measures))
+        if isinstance(measures, str):
+            measures = [measures]
+        try:
+            return np.array([self._column[m] for m in measures], dtype=int)
+        except KeyError as e:
+            raise KeyError(f"Unknown measure {e.args[0]!r}; the cube has {self.measures}.") from None
+
+    def cells(self, track=None, driver=None, team=None, year=None) -> np.ndarray:
+        """
+        Rows of the cells matching every filter. A filter is an id, a sequence
+        of ids or None (any); ids the cube has never seen match nothing.
+        """
+        sub = self.index
+        for axis, value in enumerate((track, driver, team, year)):
+            if value is None:
+                continue
+            offset = self.year0 if axis == 3 else 0
+            if np.ndim(value) == 0:
+                # a single id slices a view; out of range gives an empty slice
+                i = int(value) - offset
+                i = i if 0 <= i < sub.shape[axis] else sub.shape[axis]
+                sub = sub[(slice(None),) * axis + (slice(i, i + 1),)]
+                continue
+            ids = np.asarray(value, dtype=int) - offset
+            sub = sub.take(ids[(ids >= 0) & (ids < sub.shape[axis])], axis=axis)
+        return sub[sub >= 0]
+
+    def _stats(self, rows: np.ndarray, cols: np.ndarray,
+               starts: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+        """
+        STATS over ``rows`` for the ``cols`` measures; per group when ``starts``
+        gives where each group begins in ``rows`` (shape (groups, cols)).
+        """
+        rows = rows[:, None]
+        count, total, squares = self.count[rows, cols], self.total[rows, cols], self.squares[rows, cols]
+        low, high = self.low[rows, cols], self.high[rows, cols]
+        if starts is None:
+            count, total, squares = count.sum(axis=0), total.sum(axis=0), squares.sum(axis=0)
+            low = np.fmin.reduce(low, axis=0, initial=np.inf)
+            high = np.fmax.reduce(high, axis=0, initial=-np.inf)
+        elif len(starts):
+            count, total, squares = (np.add.reduceat(a, starts) for a in (count, total, squares))
+            low, high = np.fmin.reduceat(low, starts), np.fmax.reduceat(high, starts)
+        empty = count == 0
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = total / count
+            std = np.sqrt(np.maximum(squares / count - mean * mean, 0.0))
+        low[empty] = np.nan
+        high[empty] = np.nan
+        return {"count": count.astype(np.int64), "mean": mean, "std": std, "min": low, "max": high}
+
+    def query(self, measures=None, track=None, driver=None, team=None, year=None) -> Dict[str, np.ndarray]:
+        """
+        count / mean / std / min / max of ``measures`` over every session
+        matching the filters, as arrays in measure order (NaN where there is
+        no data).
+        """
+        return self._stats(self.cells(track, driver, team, year), self.columns(measures))
+
+    def summary(self, measures=None, track=None, driver=None, team=None,
+                year=None) -> Dict[str, Dict[str, float]]:
+        """query() as {measure: {stat: value}}."""
+        stats = self.query(measures, track, driver, team, year)
+        names = [self.measures[c] for c in self.columns(measures)]
+        return {m: {s: stats[s][i].item() for s in STATS} for i, m in enumerate(names)}
+
+    def breakdown(self, by: str, measures=None, track=None, driver=None, team=None,
+                  year=None) -> Dict[str, np.ndarray]:
+        """
+        query() split by one axis ("track", "driver", "team" or "year"): the
+        ids that have data under ``by`` and one row of stats per id.
+        """
+        if by not in AXES:
+            raise ValueError(f"Unknown axis {by!r}; expected one of {AXES}.")
+        rows = self.cells(track, driver, team, year)
+        group = self.keys[rows, AXES.index(by)]
+        order = np.argsort(group, kind="stable")
+        rows, group = rows[order], group[order]
+        starts = np.flatnonzero(np.r_[True, group[1:] != group[:-1]]) if len(rows) else np.zeros(0, int)
+        out = self._stats(rows, self.columns(measures), starts)
+        out[by] = group[starts]
+        return out
+
+    def latest_team(self, driver: int) -> Optional[int]:
+        """The team of the driver's most recent season in the cube."""
+        rows = self.cells(driver=driver)
+        if not len(rows):
+            return None
+        return int(self.keys[rows[np.argmax(self.keys[rows, 3])], 2])
+
+    def compare(self, track: int, driver: int, measures=None, year=None) -> Dict[str, Any]:
+        """
+        The driver's sessions at ``track`` against their (latest) team's and the
+        whole field's there, with the driver's mean minus each of theirs.
+        """
+        team = self.latest_team(driver)
+        out = {
+            "driver": self.query(measures, track=track, driver=driver, year=year),
+            "team": self.query(measures, track=track, team=-1 if team is None else team, year=year),
+            "field": self.query(measures, track=track, year=year),
+            "team_id": team,
+            "measures": [self.measures[c] for c in self.columns(measures)],
+        }
+        out["vs_team"] = out["driver"]["mean"] - out["team"]["mean"]
+        out["vs_field"] = out["driver"]["mean"] - out["field"]["mean"]
+        return out
+
+
+# =============================
+# SNAPSHOT / CACHE
+# =============================
+
+_cache: Dict[str, Tuple[Optional[Tuple[int, int]], HistoryCube]] = {}
+_cache_lock = threading.Lock()
+
+
+def _sources() -> Dict[str, str]:
+    return {"hist": qualifying.HIST_XLSX, "curr": qualifying.CURR_XLSX}
+
+
+def _file_signature(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def _matches(cube: HistoryCube, dataset: str) -> bool:
+    """True if ``cube`` was built by this code from the data the app is serving (``dataset``)."""
+    meta = cube.meta
+    return (meta.get("version") == CUBE_VERSION and meta.get("measures") == MEASURES
+            and meta.get("dataset") == dataset
+            and not snapshot.sources_changed(meta.get("sources", {}), _sources()))
+
+
+def _read(path: str) -> Optional[HistoryCube]:
+    if not os.path.exists(path):
+        return None
+    try:
+        return HistoryCube.load(path)
+    except Exception as e:
+        log.warning("unreadable snapshot %s -> %r", path, e)
+        return None
+
+
+def _write(cube: HistoryCube, path: str) -> None:
+    try:
+        cube.save(path)
+    except OSError as e:
+        # a read-only install dir just means the cube is rebuilt next launch too
+        log.warning("could not write %s -> %r", path, e)
+
+
+def _publish(cube: HistoryCube, path: str) -> HistoryCube:
+    with _cache_lock:
+        _cache[path] = (_file_signature(path), cube)
+    return cube
+
+
+def build_cube(frames=None) -> HistoryCube:
+    """
+    A cube from preprocessed session frames, by default qualifying's hist and
+    curr (the workbooks or the dataset store).
+    """
+    with metrics.span("history_cube.build"):
+        if frames is None:
+            frames = [qualifying.get_frame(name) for name in ("hist", "curr")]
+        rows = pd.concat([f[KEY_COLS + qualifying.SECTOR_TIME_COLS + qualifying.EXTRA_COLS]
+                          for f in frames], ignore_index=True)
+        meta = {"version": CUBE_VERSION, "dataset": qualifying.dataset_version(),
+                "sources": {name: snapshot.source_record(path) for name, path in _sources().items()},
+                "rows": len(rows)}
+        return HistoryCube.from_frame(rows, meta)
+
+
+def _load_or_build(path: str) -> HistoryCube:
+    dataset = qualifying.dataset_version()
+    cube = _read(path)
+    if cube is not None and _matches(cube, dataset):
+        return _publish(cube, path)
+    if cube is None and path == CUBE_FILE:
+        bundled = _read(BUNDLED_CUBE_FILE)
+        if bundled is not None and _matches(bundled, dataset):
+            return _publish(bundled, path)
+    metrics.count("history_cube.rebuilds")
+    log.info("rebuilding history cube")
+    cube = build_cube()
+    _write(cube, path)
+    return _publish(cube, path)
+
+
+def get_cube(path: Optional[str] = None) -> HistoryCube:
+    """
+    The cube for the current data. Kept in memory after the first call and
+    reloaded only when its snapshot file changes (e.g. after an ingestion in
+    another process).
+    """
+    path = path or CUBE_FILE
+    cached = _cache.get(path)
+    if cached is not None and cached[0] == _file_signature(path):
+        return cached[1]
+    return SINGLE_FLIGHT.do(("history_cube", path), _load_or_build, path)
+
+
+def invalidate() -> None:
+    """Forget the in-memory cube; the next get_cube() checks the snapshot again."""
+    with _cache_lock:
+        _cache.clear()
+
+
+def ingest_rows(rows: pd.DataFrame, previous_dataset: str, dataset: str,
+                path: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Fold newly ingested session rows into the snapshot, if it was built from
+    ``previous_dataset``; otherwise leave it to be rebuilt on the next
+    get_cube(). Returns the cells touched and the new cell count, or None.
+    """
+    path = path or CUBE_FILE
+    cube = _read(path)
+    if cube is None and path == CUBE_FILE:
+        cube = _read(BUNDLED_CUBE_FILE)
+    if cube is None or not _matches(cube, previous_dataset):
+        invalidate()
+        return None
+    updated = cube.with_rows(rows, {"dataset": dataset, "rows": cube.meta.get("rows", 0) + len(rows)})
+    _write(updated, path)
+    _publish(updated, path)
+    touched = np.unique(rows[KEY_COLS].to_numpy(dtype=np.int32), axis=0)
+    return {"cells_touched": len(touched), "cells": len(updated), "new_cells": len(updated) - len(cube)}
+
+
+# =============================
+# APP ENTRY POINT
+# =============================
+
+def _track_history(track_num: int) -> pd.DataFrame:
+    """Every driver with sessions at the track: their lap and sector deltas against the field."""
+    if track_num not in dimensions.track_mapping:
+        raise ValueError(f"Track number {track_num} not in track_mapping.")
+    cube = get_cube()
+    measures = ['LapTime'] + DELTA_COLS
+    per_driver = cube.breakdown("driver", measures, track=track_num)
+    field = cube.query(measures, track=track_num)
+    mean, low = per_driver["mean"], per_driver["min"]
+    table = pd.DataFrame({
+        "DriverName": [dimensions.driver_mapping.get(d) for d in per_driver["driver"].tolist()],
+        "Sessions": per_driver["count"][:, 0],
+        "BestLap": low[:, 0],
+        "MeanLap": mean[:, 0],
+        "BestDelta_Lap": low[:, 4],
+        "MeanDelta_S1": mean[:, 1],
+        "MeanDelta_S2": mean[:, 2],
+        "MeanDelta_S3": mean[:, 3],
+        "LapVsField": mean[:, 0] - field["mean"][0],
+    })
+    return table.sort_values("BestLap", kind="stable").reset_index(drop=True)
+
+
+def main(track_num):
+    """Per-driver history at the track as CSV, best lap first (the error message on failure)."""
+    with metrics.span("history_cube.main"):
+        try:
+            return _track_history(track_num).to_csv(index=False)
+        except Exception as e:
+            return str(e)
+
+
+if __name__ == "__main__":
+    # python history_cube.py: rebuild the snapshot from the current data
+    logging.basicConfig(level=logging.INFO, format="[%(name)s] %(message)s")
+    built = build_cube()
+    _write(built, CUBE_FILE)
+    print(f"[ML] history cube: {len(built)} cells x {len(built.measures)} measures "
+          f"from {built.meta['rows']} sessions")
@@ -0,0 +1,224 @@
+import argparse
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, Sequence
+
+import numpy as np
+import pandas as pd
+
+import dataset_store
+import history_cube
+import metrics
+import qualifying
+from concurrency import training_lock
+
+# Ingest new qualifying sessions without retraining from scratch.
+#
+#     python ingest.py weekend.xlsx [--partition curr] [--no-retrain]
+#
+# or ingest_sessions(rows) from Python. The rows (same columns as the
+# workbooks) are appended to the dataset store (dataset_store.py), which is
+# seeded from the workbooks on first use and updates the TeamAvg_S* running
+# statistics from the new rows alone. Then only the models whose training data
+# changed are updated:
+#
+#   base_rf           grows INGEST_NEW_TREES trees (warm_start) fitted on the
+#                     updated data; refitted at its original size once it would
+#                     pass INGEST_MAX_TREES
+#   telemetry models  only those whose columns have values in the new rows grow
+#                     trees the same way; the rest are kept as they are
+#   scaler            kept, so the old trees still see the features they were
+#                     trained on
+#
+# Models from a boosting engine (qualifying.MODEL_ENGINE, model_engines.py)
+# have no warm start and are refitted on the updated data instead.
+#
+# The historical aggregate cube (history_cube.py) gets the new rows folded
+# into its snapshot, without a rebuild.
+#
+# Predictions afterwards carry the store's dataset version (see
+# qualifying.dataset_version). Without any saved models this falls back to a
+# full fit_models().
+#
+# An ingestion holds the training lock (concurrency.py) from append to save,
+# so it never overlaps a fit_models() or another ingestion.
+
+log = logging.getLogger(__name__)
+
+INGEST_NEW_TREES = 20
+INGEST_MAX_TREES = 400
+
+
+def _open_store() -> dataset_store.DatasetStore:
+    """
+    The dataset store (rebased onto the workbooks if they changed), seeded
+    from the current workbooks if it doesn't exist yet. Raises RuntimeError
+    rather than replacing a store that could not be rebased.
+    """
+    store = qualifying._dataset_store()
+    if store is not None:
+        return store
+    if os.path.exists(dataset_store.MANIFEST_FILE):
+        reason = qualifying.dataset_store_error() or "the dataset store is disabled (USE_DATASET_STORE)"
+        raise RuntimeError(f"Not replacing the dataset store in {dataset_store.STORE_DIR}: {reason}. "
+                           f"Move it aside to start a new one.")
+    log.info("seeding the dataset store from the workbooks")
+    # _load_frame, not get_frame: the store keeps full dtypes even in LOW_MEMORY mode
+    frames = {p: qualifying._load_frame(p) for p in dataset_store.PARTITIONS}
+    return dataset_store.DatasetStore.create(
+        frames, {"hist": qualifying.HIST_XLSX, "curr": qualifying.CURR_XLSX},
+        qualifying._BASELINE_TABLE)
+
+
+def _validate_rows(rows: pd.DataFrame, reference: pd.DataFrame, columns: Sequence[str]) -> pd.DataFrame:
+    """Check the new rows against the store schema and cast them to its dtypes."""
+    missing = [c for c in columns if c not in rows.columns]
+    if missing:
+        raise ValueError(f"New rows are missing columns: {missing}")
+    if rows.empty:
+        raise ValueError("No rows to ingest.")
+    unknown = sorted(set(rows['Track']) - set(qualifying.track_sector_baselines))
+    if unknown:
+        raise ValueError(f"Track numbers {unknown} have no sector baselines.")
+    rows = rows[list(columns)].reset_index(drop=True)
+    return rows.astype({c: reference[c].dtype for c in columns})
+
+
+def _fit(model, X: np.ndarray, y: np.ndarray):
+    return model.fit(X, y)
+
+
+def _grow(model, X: np.ndarray, y: np.ndarray, new_trees: int, max_trees: int, base_params: Dict[str, Any],
+          fit: Callable = _fit):
+    """
+    Add ``new_trees`` trees fitted on (X, y) with ``fit(model, X, y)``; refit at
+    the original size past ``max_trees``. Boosted models
+    (model_engines.BoostedRegressor) are refitted.
+    """
+    if not hasattr(model, "warm_start"):
+        fit(model, X, y)
+        return model, "refit"
+    total = model.n_estimators + new_trees
+    if total > max_trees:
+        model.set_params(warm_start=False, n_estimators=base_params["n_estimators"])
+        fit(model, X, y)
+        return model, "refit"
+    model.set_params(warm_start=True, n_estimators=total)
+    fit(model, X, y)
+    model.set_params(warm_start=False)
+    return model, f"+{new_trees} trees"
+
+
+def _update_telemetry(extra_models: Dict[str, Any], Xs: np.ndarray, all_data: pd.DataFrame,
+                      new_rows: pd.DataFrame, new_trees: int) -> Dict[str, str]:
+    from telemetry_models import MIN_TRAIN_ROWS, TELEMETRY_RF_PARAMS, fit_masked, fit_telemetry_models
+
+    actions = {}
+    covered = set()
+    for key, model in extra_models.items():
+        columns = getattr(model, "columns", [key])
+        covered.update(columns)
+        if not new_rows[columns].notna().to_numpy().any():
+            continue
+        if hasattr(model, "columns"):
+            # block model: targets standardised with the statistics it was first fitted with,
+            # missing ones masked per target
+            z = (all_data[columns].to_numpy(dtype=float) - model.y_mean) / model.y_std
+            model.model, actions[key] = _grow(model.model, Xs, z, new_trees,
+                                              INGEST_MAX_TREES, TELEMETRY_RF_PARAMS, fit=fit_masked)
+        else:
+            mask = all_data[key].notna().to_numpy()
+            extra_models[key], actions[key] = _grow(model, Xs[mask], all_data.loc[mask, key].to_numpy(),
+                                                    new_trees, INGEST_MAX_TREES, TELEMETRY_RF_PARAMS)
+
+    # columns that had too little data before may be trainable now
+    uncovered = [c for c in qualifying.EXTRA_COLS
+                 if c not in covered and all_data[c].notna().sum() >= MIN_TRAIN_ROWS]
+    engine = qualifying.MODEL_ENGINE
+    for col, model in fit_telemetry_models(Xs, all_data, uncovered, layout="per_column", engine=engine).items():
+        extra_models[col] = model
+        actions[col] = "new model"
+    return actions
+
+
+@metrics.timed("ingest")
+@training_lock("ingest")
+def ingest_sessions(rows, partition: str = "curr", retrain: bool = True,
+                    new_trees: int = INGEST_NEW_TREES) -> Dict[str, Any]:
+    """
+    Append new session rows (a DataFrame or a list of dicts with the workbook
+    columns) to ``partition`` and update the affected models. Returns a report
+    with the new dataset version, the (Year, Team) groups whose averages
+    changed and what was retrained.
+    """
+    start = time.perf_counter()
+    rows = pd.DataFrame(rows)
+    previous_dataset = qualifying.dataset_version()
+    store = _open_store()
+    reference = qualifying._load_frame(partition)
+    new_rows = _validate_rows(rows, reference, store.columns)
+
+    with metrics.span("ingest.append"):
+        entry = store.append(partition, new_rows, qualifying._BASELINE_TABLE)
+    qualifying._frames.clear()
+    with metrics.span("ingest.history_cube"):
+        cube = history_cube.ingest_rows(new_rows, previous_dataset, store.tag)
+    report = {"dataset_version": store.tag, "partition": partition, "rows_added": len(new_rows),
+              "affected_groups": entry["groups"], "history_cube": cube, "retrained": {}}
+    log.info("ingested %d rows into %s; dataset version %s", len(new_rows), partition, store.tag)
+
+    if retrain:
+        report["retrained"] = _retrain(new_rows, new_trees)
+        store.annotate_last(retrained=report["retrained"])
+    report["seconds"] = time.perf_counter() - start
+    return report
+
+
+def _retrain(new_rows: pd.DataFrame, new_trees: int) -> Dict[str, str]:
+    import joblib
+
+    paths = (qualifying.SCALER_FILE, qualifying.BASE_RF_FILE, qualifying.EXTRA_FILE)
+    if not all(map(os.path.exists, paths)):
+        log.info("no saved models to update; training from scratch")
+        qualifying.fit_models()
+        return {"all": "full fit"}
+
+    # private copies: the registry's objects may be serving predictions right now
+    scaler, base_rf, extra_models = (joblib.load(p) for p in paths)
+    all_data = qualifying.get_frame("all_data")
+    Xs = scaler.transform(all_data[qualifying.FEATURES])
+
+    actions: Dict[str, str] = {}
+    with metrics.span("ingest.base_rf"):
+        base_rf, actions["base_rf"] = _grow(base_rf, Xs, all_data[qualifying.TARGETS].to_numpy(),
+                                            new_trees, INGEST_MAX_TREES, qualifying.BASE_RF_PARAMS)
+    with metrics.span("ingest.telemetry"):
+        actions.update(_update_telemetry(extra_models, Xs, all_data, new_rows, new_trees))
+    qualifying.save_models(scaler, base_rf, extra_models)
+    for key, action in actions.items():
+        log.info("%s: %s", key, action)
+    return actions
+
+
+def _read_rows(path: str) -> pd.DataFrame:
+    if path.endswith(".csv"):
+        return pd.read_csv(path)
+    return pd.read_excel(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Append new qualifying sessions and update the models.")
+    parser.add_argument("rows", help=".xlsx or .csv file with the workbook columns")
+    parser.add_argument("--partition", choices=dataset_store.PARTITIONS, default="curr")
+    parser.add_argument("--no-retrain", action="store_true", help="only append the rows")
+    parser.add_argument("--new-trees", type=int, default=INGEST_NEW_TREES)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="[%(name)s] %(message)s")
+    report = ingest_sessions(_read_rows(args.rows), args.partition, not args.no_retrain, args.new_trees)
+    print(f"[ML] Done in {report['seconds']:.1f}s; dataset version {report['dataset_version']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+import json
+import os
+import threading
+import time
+import tracemalloc
+from functools import wraps
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import resource
+except ImportError:  # not available on every platform
+    resource = None
+
+# Lightweight timing / counter instrumentation for the prediction modules.
+#
+#     with metrics.span("model_load"):
+#         ...
+#     metrics.count("result_cache.hit")
+#     metrics.get_metrics()       # dict, or get_metrics_json() for Kotlin
+#
+# Spans nest per thread: a span opened inside another is recorded under the
+# path "outer/inner", with its call count, total / max / last duration and
+# error count. Counters are plain integers. Memory is the current and peak RSS and,
+# with enable(track_memory=True), the tracemalloc peak as well.
+#
+# Everything is off unless enable() is called (or SLIPSTREAM_METRICS=1 is set):
+# span() then returns one shared no-op context manager and count() returns
+# immediately, so instrumented code costs a function call per site. The one
+# exception is first_result(): it fires once per process, so it is always kept.
+#
+# Messages (model loads, fallbacks, rebuilds) go to each module's logging logger,
+# never to stdout: nothing configures a handler on the prediction path, so only
+# warnings reach stderr. The CLI entry points switch INFO output on.
+
+_enabled = os.environ.get("SLIPSTREAM_METRICS", "") == "1"
+_track_memory = False
+_lock = threading.Lock()
+_local = threading.local()
+_spans: Dict[str, list] = {}        # path -> [calls, total_s, max_s, last_s, errors]
+_counters: Dict[str, int] = {}
+_started = time.time()
+# metrics is imported by every prediction module, so this is ~interpreter start
+_process_start = time.perf_counter()
+_first_results: Dict[str, float] = {}
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def _stack() -> list:
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+class _Span:
+    __slots__ = ("name", "path", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        stack = _stack()
+        self.path = f"{stack[-1]}/{self.name}" if stack else self.name
+        stack.append(self.path)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        _stack().pop()
+        with _lock:
+            entry = _spans.get(self.path)
+            if entry is None:
+                entry = _spans[self.path] = [0, 0.0, 0.0, 0.0, 0]
+            entry[0] += 1
+            entry[1] += elapsed
+            entry[2] = max(entry[2], elapsed)
+            entry[3] = elapsed
+            if exc_type is not None:
+                entry[4] += 1
+        return False
+
+
+def span(name: str):
+    """Context manager timing the enclosed block under ``name`` (no-op when disabled)."""
+    return _Span(name) if _enabled else _NULL_SPAN
+
+
+def timed(name: Optional[str] = None) -> Callable:
+    """Decorator form of span(); the span is named after the function by default."""
+    def decorate(fn):
+        label = name or fn.__name__
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with _Span(label):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count(name: str, n: int = 1) -> None:
+    """Add ``n`` to counter ``name`` (no-op when disabled)."""
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def first_result(name: str) -> None:
+    """Record the seconds from startup to the first result of ``name`` (once per process)."""
+    if name not in _first_results:
+        _first_results[name] = time.perf_counter() - _process_start
+
+
+def enable(track_memory: bool = False) -> None:
+    """Start recording; ``track_memory`` also traces Python allocations (slower)."""
+    global _enabled, _track_memory
+    _enabled = True
+    _track_memory = track_memory
+    if track_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def disable() -> None:
+    global _enabled, _track_memory
+    _enabled = False
+    if _track_memory and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _track_memory = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def reset() -> None:
+    """Forget every span and counter recorded so far."""
+    global _started
+    with _lock:
+        _spans.clear()
+        _counters.clear()
+        _started = time.time()
+    if _track_memory and hasattr(tracemalloc, "reset_peak"):  # Python 3.9+
+        tracemalloc.reset_peak()
+
+
+def current_rss() -> Optional[int]:
+    """Resident set size right now, in bytes (Linux/Android only, else None)."""
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _memory() -> Dict[str, Any]:
+    out: Dict[str, Any] = {}
+    rss = current_rss()
+    if rss is not None:
+        out["rss_bytes"] = rss
+    if resource is not None:
+        # ru_maxrss is KiB on Linux/Android
+        out["peak_rss_bytes"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    if _track_memory and tracemalloc.is_tracing():
+        current, peak = tracemalloc.get_traced_memory()
+        out["traced_current_bytes"] = current
+        out["traced_peak_bytes"] = peak
+    return out
+
+
+def get_metrics() -> Dict[str, Any]:
+    """Everything recorded since the last reset(), plus the model registry's and warm-up's state."""
+    import warmup
+    from model_registry import REGISTRY
+
+    with _lock:
+        spans = {path: {"calls": e[0], "total_s": e[1], "mean_s": e[1] / e[0],
+                        "max_s": e[2], "last_s": e[3], "errors": e[4]}
+                 for path, e in _spans.items()}
+        counters = dict(_counters)
+    return {
+        "enabled": _enabled,
+        "since": _started,
+        "spans": spans,
+        "counters": counters,
+        "memory": _memory(),
+        "time_to_first_result_s": dict(_first_results),
+        "warmup": warmup.status(),
+        "registry": REGISTRY.stats(),
+    }
+
+
+def get_metrics_json() -> str:
+    """get_metrics() as a JSON string (what the app reads through Chaquopy)."""
+    return json.dumps(get_metrics())
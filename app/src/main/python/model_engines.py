@@ -0,0 +1,85 @@
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+# Model engines for the qualifying sector model (base_rf) and the telemetry
+# models, selected with qualifying.MODEL_ENGINE:
+#
+#   "forest"    RandomForestRegressor with the caller's forest parameters
+#   "hist_gb"   scikit-learn's HistGradientBoostingRegressor
+#   "xgboost"   XGBRegressor(tree_method="hist"), when xgboost is installed
+#
+# Boosters fit one target at a time, so a multi-output fit (the three sector
+# deltas, a grouped telemetry block) is a BoostedRegressor holding one booster
+# per column, each fitted on the rows where its target is not NaN. Every
+# engine compiles to forest_engine's NumPy format, so the prediction path is
+# the same whichever trained the models. Only the fitting code here imports
+# sklearn / xgboost.
+
+MODEL_ENGINES = ("forest", "hist_gb", "xgboost")
+
+# early stopping off: it would hold out a different validation split per fit
+HIST_GB_PARAMS = dict(
+    max_iter=300,
+    learning_rate=0.05,
+    max_leaf_nodes=31,
+    max_depth=8,  # leaf-wise trees grow deep; the compiled walk costs max depth per tree
+    min_samples_leaf=10,
+    early_stopping=False,
+    random_state=42,
+)
+XGBOOST_PARAMS = dict(
+    n_estimators=300,
+    learning_rate=0.05,
+    max_depth=6,
+    subsample=0.8,
+    tree_method="hist",
+    random_state=42,
+    n_jobs=1,
+)
+
+
+def _booster(engine: str, params: Optional[Dict[str, Any]]):
+    if engine == "hist_gb":
+        from sklearn.ensemble import HistGradientBoostingRegressor
+        return HistGradientBoostingRegressor(**(HIST_GB_PARAMS if params is None else params))
+    try:
+        from xgboost import XGBRegressor
+    except ImportError as e:
+        raise ImportError("The 'xgboost' model engine needs the xgboost package.") from e
+    return XGBRegressor(**(XGBOOST_PARAMS if params is None else params))
+
+
+class BoostedRegressor:
+    """One gradient-boosted model per target column, with the forest's fit/predict surface."""
+
+    # missing (NaN) targets are skipped per column (see telemetry_models.fit_masked)
+    masks_targets = True
+
+    def __init__(self, engine: str = "hist_gb", params: Optional[Dict[str, Any]] = None):
+        self.engine = engine
+        self.params = params
+
+    def fit(self, X, y) -> "BoostedRegressor":
+        y = np.asarray(y, dtype=float)
+        self.single_output_ = y.ndim == 1
+        Y = y.reshape(len(y), -1)
+        self.n_outputs_ = Y.shape[1]
+        observed = ~np.isnan(Y)
+        self.boosters_ = [_booster(self.engine, self.params).fit(X[observed[:, k]], Y[observed[:, k], k])
+                          for k in range(self.n_outputs_)]
+        return self
+
+    def predict(self, X) -> np.ndarray:
+        pred = np.column_stack([b.predict(X) for b in self.boosters_])
+        return pred[:, 0] if self.single_output_ else pred
+
+
+def make_regressor(engine: str, forest_params: Dict[str, Any]):
+    """An unfitted regressor for ``engine``; ``forest_params`` only apply to "forest"."""
+    if engine not in MODEL_ENGINES:
+        raise ValueError(f"Unknown model engine {engine!r}; expected one of {MODEL_ENGINES}.")
+    if engine == "forest":
+        from sklearn.ensemble import RandomForestRegressor
+        return RandomForestRegressor(**forest_params)
+    return BoostedRegressor(engine)
@@ -0,0 +1,197 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+import numpy as np
+
+import metrics
+
+# Process-wide cache of the artifacts in saved_models/.
+#
+# Both qualifying.py and strategy.py fetch their models through REGISTRY, so each
+# file is unpickled once per process. An entry is reloaded when the file on disk
+# changes (size or mtime), and the least recently used entries are dropped when
+# the resident total goes over the memory budget. An entry counts the nbytes of
+# the arrays it holds once loaded (compressed artifacts inflate several times
+# over their file size); objects with state numpy can't see, like pickled
+# sklearn trees, count their file size instead. A file that fails to load is
+# not retried until it changes: callers check failed() and use their fallback.
+# Loads and evictions are counted in metrics (registry.loads / registry.evictions).
+
+log = logging.getLogger(__name__)
+
+DEFAULT_BUDGET_BYTES = 256 * 1024 * 1024
+
+
+def _joblib_loader(path: str) -> Any:
+    import joblib  # only pickled sklearn artifacts need it
+
+    # — mem-mapping stays off: some Android/embedded builds don’t like it
+    return joblib.load(path, mmap_mode=None)
+
+
+def _file_signature(path: str) -> Tuple[int, int]:
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def _array_bytes(obj: Any, seen: Set[int]) -> Optional[int]:
+    """Total nbytes of the arrays reachable from ``obj``; None if part of it is opaque."""
+    if id(obj) in seen or obj is None or isinstance(obj, (bool, int, float, str, bytes, np.generic)):
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, dict):
+        parts = list(obj.values())
+    elif isinstance(obj, (list, tuple)):
+        parts = list(obj)
+    elif hasattr(obj, "__dict__"):
+        parts = list(vars(obj).values())
+    else:
+        return None
+    total = 0
+    for part in parts:
+        n = _array_bytes(part, seen)
+        if n is None:
+            return None
+        total += n
+    return total
+
+
+def resident_size(obj: Any, file_size: int) -> int:
+    """Memory an entry is budgeted at (see the header)."""
+    n = _array_bytes(obj, set())
+    return file_size if n is None else n
+
+
+class _Entry:
+    __slots__ = ("obj", "signature", "nbytes")
+
+    def __init__(self, obj: Any, signature: Tuple[int, int], nbytes: int):
+        self.obj = obj
+        self.signature = signature
+        self.nbytes = nbytes
+
+
+class ModelRegistry:
+    """
+    LRU cache of loaded model artifacts keyed by file path, budgeted on the
+    loaded size of each entry (resident_size).
+    """
+
+    def __init__(self, budget_bytes: Optional[int] = DEFAULT_BUDGET_BYTES):
+        self.budget_bytes = budget_bytes
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        # path -> (signature, exception) of the last failed load
+        self._failures: Dict[str, Tuple[Tuple[int, int], BaseException]] = {}
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, path: str, loader: Callable[[str], Any] = _joblib_loader) -> Any:
+        """
+        Return the artifact at ``path``, loading it only if absent or changed on
+        disk. If this version of the file already failed to load, its error is
+        raised again without another attempt.
+        """
+        path = os.path.abspath(path)
+        signature = _file_signature(path)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry.signature == signature:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry.obj
+            failure = self._failures.get(path)
+            if failure is not None and failure[0] == signature:
+                raise failure[1].with_traceback(None)
+
+            self.misses += 1
+            metrics.count("registry.loads")
+            log.debug("loading %s", os.path.basename(path))
+            try:
+                with metrics.span(f"load.{os.path.basename(path)}"):
+                    obj = loader(path)
+            except Exception as e:
+                self._failures[path] = (signature, e)
+                raise
+            self._failures.pop(path, None)
+            self._store(path, obj, signature)
+            return obj
+
+    def failed(self, path: str) -> bool:
+        """True if the current version of ``path`` already failed to load."""
+        path = os.path.abspath(path)
+        with self._lock:
+            failure = self._failures.get(path)
+        if failure is None:
+            return False
+        try:
+            return failure[0] == _file_signature(path)
+        except OSError:
+            return False
+
+    def put(self, path: str, obj: Any) -> None:
+        """Register an object that was just written to ``path`` (skips the reload)."""
+        path = os.path.abspath(path)
+        with self._lock:
+            self._failures.pop(path, None)
+            self._store(path, obj, _file_signature(path))
+
+    def invalidate(self, path: Optional[str] = None) -> None:
+        """Drop one entry (and any recorded load failure), or every entry when ``path`` is None."""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                self._failures.clear()
+            else:
+                self._entries.pop(os.path.abspath(path), None)
+                self._failures.pop(os.path.abspath(path), None)
+
+    def set_budget(self, budget_bytes: Optional[int]) -> None:
+        """Change the memory budget (None = unlimited) and evict down to it."""
+        with self._lock:
+            self.budget_bytes = budget_bytes
+            self._evict()
+
+    def resident_bytes(self) -> int:
+        with self._lock:
+            return sum(e.nbytes for e in self._entries.values())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": [os.path.basename(p) for p in self._entries],
+                "resident_bytes": self.resident_bytes(),
+                "budget_bytes": self.budget_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _store(self, path: str, obj: Any, signature: Tuple[int, int]) -> None:
+        self._entries[path] = _Entry(obj, signature, resident_size(obj, signature[0]))
+        self._entries.move_to_end(path)
+        self._evict()
+
+    def _evict(self) -> None:
+        if self.budget_bytes is None:
+            return
+        # never evict the most recently used entry, even if it alone is over budget
+        while len(self._entries) > 1 and self.resident_bytes() > self.budget_bytes:
+            evicted, _ = self._entries.popitem(last=False)
+            self.evictions += 1
+            metrics.count("registry.evictions")
+            log.debug("evicted %s (memory budget)", os.path.basename(evicted))
+
+
+REGISTRY = ModelRegistry()
+
+
+def set_memory_budget(megabytes: Optional[float]) -> None:
+    """Entry point for the app: cap resident models at ``megabytes`` (None = no cap)."""
+    REGISTRY.set_budget(None if megabytes is None else int(megabytes * 1024 * 1024))
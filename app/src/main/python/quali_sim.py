@@ -0,0 +1,73 @@
+from typing import Optional
+
+import numpy as np
+
+# Probabilistic qualifying grid from per-tree forest predictions.
+#
+# The sector forest's trees disagree with each other, and that spread is a free
+# estimate of how uncertain each driver's pace is. For every simulated
+# qualifying session, each driver's pace is the lap predicted by one randomly
+# drawn tree; every part of the knockout (Q1, Q2, Q3) then adds its own lap-time
+# noise, and the standard cut is applied:
+#
+#   Q1: everyone runs, the slowest drop out and fill the places from Q2_SIZE + 1
+#   Q2: the Q2_SIZE survivors run, the slowest fill Q3_SIZE + 1 .. Q2_SIZE
+#   Q3: the Q3_SIZE survivors run for positions 1 .. Q3_SIZE
+#
+# All samples, tracks and drivers are simulated in one array operation.
+
+Q2_SIZE = 15
+Q3_SIZE = 10
+SESSIONS = 3
+LAP_NOISE_S = 0.12
+
+
+def _rank(times: np.ndarray) -> np.ndarray:
+    """0-based rank of every entry along the last axis (ties keep driver order)."""
+    order = np.argsort(times, axis=-1, kind="stable")
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(times.shape[-1]), axis=-1)
+    return ranks
+
+
+def knockout_positions(session_times: np.ndarray) -> np.ndarray:
+    """
+    Grid slot (0-based) of every driver from their Q1, Q2 and Q3 laps.
+
+    ``session_times`` has shape (..., drivers, 3); the result (..., drivers).
+    """
+    n_drivers = session_times.shape[-2]
+    q2_size, q3_size = min(Q2_SIZE, n_drivers), min(Q3_SIZE, n_drivers)
+    q1, q2, q3 = (session_times[..., k] for k in range(SESSIONS))
+
+    rank1 = _rank(q1)
+    in_q2 = rank1 < q2_size
+    rank2 = _rank(np.where(in_q2, q2, np.inf))
+    in_q3 = in_q2 & (rank2 < q3_size)
+    rank3 = _rank(np.where(in_q3, q3, np.inf))
+    # eliminated drivers keep the rank of the session they dropped out of
+    return np.where(in_q3, rank3, np.where(in_q2, rank2, rank1))
+
+
+def simulate_qualifying(per_tree_laps: np.ndarray,
+                        n_samples: int = 2000,
+                        lap_noise: float = LAP_NOISE_S,
+                        seed: Optional[int] = 0) -> np.ndarray:
+    """
+    Simulated grid slots, shape (samples, groups, drivers), from per-tree lap
+    predictions of shape (trees, groups, drivers). A group is one track.
+    """
+    n_trees, n_groups, n_drivers = per_tree_laps.shape
+    rng = np.random.default_rng(seed)
+    tree = rng.integers(n_trees, size=(n_samples, n_groups, n_drivers))
+    pace = per_tree_laps[tree, np.arange(n_groups)[:, None], np.arange(n_drivers)]
+    noise = rng.normal(0.0, lap_noise, size=(n_samples, n_groups, n_drivers, SESSIONS))
+    return knockout_positions(pace[..., None] + noise)
+
+
+def slot_probabilities(positions: np.ndarray) -> np.ndarray:
+    """P(driver finishes in slot k): shape (groups, drivers, slots) from (samples, groups, drivers)."""
+    n_samples, n_groups, n_drivers = positions.shape
+    cell = (np.arange(n_groups)[:, None] * n_drivers + np.arange(n_drivers)) * n_drivers
+    counts = np.bincount((cell + positions).ravel(), minlength=n_groups * n_drivers * n_drivers)
+    return counts.reshape(n_groups, n_drivers, n_drivers) / n_samples
@@ -1,94 +1,96 @@
+from __future__ import annotations
+
 import pandas as pd
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.preprocessing import StandardScaler
 import numpy as np
-import joblib
 import os
-from typing import Tuple, Dict, Any
+import json
+import hashlib
+import logging
+from typing import TYPE_CHECKING, Tuple, Dict, Any, Optional
+
+import dataset_store
+import dimensions
+import forest_engine
+import metrics
+import quali_sim
+import result_codec
+import snapshot
+import warmup
+from concurrency import SINGLE_FLIGHT, atomic_write, training_lock
+from dimensions import track_mapping, driver_mapping, team_mapping, track_sector_baselines
+from model_registry import REGISTRY
+from telemetry_models import predict_telemetry
+
+# sklearn, joblib and the training helpers are imported inside fit_models: the
+# prediction path runs on the compiled models and never needs them.
+if TYPE_CHECKING:
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.preprocessing import StandardScaler
+
+log = logging.getLogger(__name__)
 
 # Load datasets
 HERE = os.path.dirname(__file__)
+HIST_XLSX = os.path.join(HERE, "HistoricalData.xlsx")
+CURR_XLSX = os.path.join(HERE, "CurrentData.xlsx")
 MODEL_DIR  = os.path.join(HERE, "saved_models")
 SCALER_FILE, BASE_RF_FILE, EXTRA_FILE = [
     os.path.join(MODEL_DIR, fn) for fn in
     ("scaler.joblib", "base_rf.joblib", "extra_models.joblib")
 ]
+METRICS_FILE = os.path.join(MODEL_DIR, "walk_forward_metrics.json")
+# NumPy-only copies of the same models (see forest_engine.py)
+COMPILED_DIR = os.path.join(MODEL_DIR, "compiled")
+COMPILED_SCALER_FILE, COMPILED_BASE_RF_FILE, COMPILED_EXTRA_FILE = [
+    os.path.join(COMPILED_DIR, fn) for fn in
+    ("scaler.bin", "base_rf.bin", "extra_models.bin")
+]
+# serve predictions from the compiled NumPy engine instead of sklearn objects
+USE_COMPILED_MODELS = True
+# simulated qualifying sessions per track for predict_grid_probabilities
+QUALI_SIM_SAMPLES = 2000
+# memory-budget mode: downcast the frames and only hold hist / all_data while
+# training (see get_frame); SLIPSTREAM_LOW_MEMORY=1 turns it on at import
+LOW_MEMORY = os.environ.get("SLIPSTREAM_LOW_MEMORY", "") == "1"
+# read hist/curr from the ingested dataset store when there is one; offline
+# builds (build_artifacts.py) turn this off to train on the workbooks alone
+USE_DATASET_STORE = True
 
 
 # =============================
 # 1) DEFINE MAPPINGS & BASELINES
 # =============================
 
-# Map track number to track names
-track_mapping = {
-    1: 'Abu Dhabi', 2: 'Australia', 3: 'Austria', 4: 'Azerbaijan', 5: 'Bahrain',
-    6: 'Belgium', 7: 'Brazil', 8: 'Canada', 9: 'China', 10: 'Great Britain',
-    11: 'Hungary', 12: 'Imola', 13: 'Italy', 14: 'Japan', 15: 'Las Vegas',
-    16: 'Mexico', 17: 'Miami', 18: 'Monaco', 19: 'Netherlands', 20: 'Qatar',
-    21: 'Saudi Arabia', 22: 'Singapore', 23: 'Spain', 24: 'United States'
-}
-# Map driver ID to short code
-driver_mapping = {
-    1: 'ALB', 2: 'ALO', 3: 'ANT', 4: 'BOR', 5: 'DOO', 6: 'GAS', 7: 'HAD', 8: 'HAM',
-    9: 'HUL', 10: 'LAW', 11: 'LEC', 12: 'NOR', 13: 'OCO', 14: 'PIA', 15: 'RUS',
-    16: 'SAI', 17: 'STR', 18: 'TSU', 19: 'VER', 20: 'BEA', 21: 'BOT', 22: 'LAT',
-    23: 'MAG', 24: 'MSC', 25: 'PER', 26: 'RIC', 27: 'ZHO', 28: 'DEV', 29: 'SAR',
-    30: 'VET', 31: 'COL'
-}
-# Map team ID to team names
-team_mapping = {
-    1: 'WILLIAMS', 2: 'ASTON MARTIN', 3: 'MERCEDES', 4: 'KICK', 5: 'ALPINE',
-    6: 'RACING BULL', 7: 'FERRARI', 8: 'MCLAREN', 9: 'HAAS', 10: 'RED BULL'
-}
-
-# Baseline pole times for each track (e.g. last year’s best Q3 lap)
-track_sector_baselines  = {
-    1: (16.958, 35.776, 29.861),  # Abu Dhabi
-    2: (25.961, 16.997, 32.128),  # Australia
-    3: (16.254,	28.791,	19.269),  # Austria
-    4: (35.702,	40.813,	24.850),  # Azerbaijan
-    5: (28.784,	38.574,	22.483),  # Bahrain
-    6: (31.998,	50.837,	30.324),  # Belgium
-    7: (17.825,	34.909,	16.165),  # Brazil
-    8: (20.057,	22.714,	28.971),  # Canada
-    9: (23.996,	27.227,	39.418),  # China
-    10: (28.016, 34.508, 23.295),  # Great Britain
-    11: (27.606, 26.382, 21.239),  # Hungary
-    12: (23.408, 25.922, 25.416),  # Imola
-    13: (26.492, 26.579, 26.256),  # Italy
-    14: (30.387,	39.355,	17.241),  # Japan
-    15: (25.736,	30.916,	35.660),  # Las Vegas
-    16: (27.037,	29.296,	19.613),  # Mexico
-    17: (28.867,	33.499,	24.875),  # Miami
-    18: (18.386,	33.174,	18.710),  # Monaco
-    19: (23.824,	24.819,	21.030),  # Netherlands
-    20: (29.598,	27.353,	23.569),  # Qatar
-    21: (31.507,	27.756,	28.031),  # Saudi Arabia
-    22: (26.599,	37.630,	25.296),  # Singapore
-    23: (21.383,	28.402,	21.598),  # Spain
-    24: (24.992,	36.887,	30.451),  # United States
-}
+# track_mapping, driver_mapping, team_mapping and track_sector_baselines are
+# defined in dimensions.py, shared with strategy.py, and imported above.
+
+# Same baselines as a (track id → row) array so lookups are a single fancy index
+_BASELINE_TABLE = dimensions.TRACKS.baseline
+
+SECTOR_TIME_COLS = ['Sector1Time', 'Sector2Time', 'Sector3Time']
 
+
+@metrics.timed("preprocess")
 def preprocess_data(df):
-    df = df.copy()
+    df = df.reset_index(drop=True)
 
     # Unpack baseline sectors
-    df['Baseline_S1'] = df['Track'].map(lambda t: track_sector_baselines[t][0])
-    df['Baseline_S2'] = df['Track'].map(lambda t: track_sector_baselines[t][1])
-    df['Baseline_S3'] = df['Track'].map(lambda t: track_sector_baselines[t][2])
+    baselines = _BASELINE_TABLE[df['Track'].to_numpy()]
+    df['Baseline_S1'] = baselines[:, 0]
+    df['Baseline_S2'] = baselines[:, 1]
+    df['Baseline_S3'] = baselines[:, 2]
 
     # Compute deltas
-    df['Delta_S1'] = df['Sector1Time'] - df['Baseline_S1']
-    df['Delta_S2'] = df['Sector2Time'] - df['Baseline_S2']
-    df['Delta_S3'] = df['Sector3Time'] - df['Baseline_S3']
-
-    # Team‑year average for each sector
-    for sec in ['1','2','3']:
-        avg = (df.groupby(['Year','Team'])[f'Sector{sec}Time']
-               .mean()
-               .reset_index()
-               .rename(columns={f'Sector{sec}Time':f'TeamAvg_S{sec}'}))
-        df = df.merge(avg, on=['Year','Team'], how='left')
+    deltas = df[SECTOR_TIME_COLS].to_numpy(dtype=float) - baselines
+    df['Delta_S1'] = deltas[:, 0]
+    df['Delta_S2'] = deltas[:, 1]
+    df['Delta_S3'] = deltas[:, 2]
+
+    # Team‑year average for each sector, broadcast back to the rows in one pass
+    team_avg = df.groupby(['Year', 'Team'])[SECTOR_TIME_COLS].transform('mean').to_numpy()
+    df['TeamAvg_S1'] = team_avg[:, 0]
+    df['TeamAvg_S2'] = team_avg[:, 1]
+    df['TeamAvg_S3'] = team_avg[:, 2]
 
     # Fill any NaNs
     for col in ['Delta_S1','Delta_S2','Delta_S3','TeamAvg_S1','TeamAvg_S2','TeamAvg_S3']:
@@ -96,15 +98,151 @@ def preprocess_data(df):
 
     return df
 
+# bump whenever preprocess_data changes so cached snapshots get rebuilt
+PREPROCESS_VERSION = "1"
+
 # =============================
 # 2) LOAD DATA
 # =============================
 
-historical_data = pd.read_excel(os.path.join(HERE, "HistoricalData.xlsx"))
-current_data = pd.read_excel(os.path.join(HERE, "CurrentData.xlsx"))
-hist = preprocess_data(historical_data)
-curr = preprocess_data(current_data)
-all_data = pd.concat([hist, curr], ignore_index=True)
+# Frames are loaded on first use rather than at import: prediction only needs
+# `curr`, while `hist` and `all_data` are only read when the models are retrained.
+# Preprocessed frames come from binary snapshots; Excel is only parsed when stale.
+# Once sessions have been ingested (see ingest.py), hist/curr come from the
+# dataset store instead, as long as the workbooks it was seeded from are unchanged.
+#
+# With LOW_MEMORY on, hist and curr are downcast (compact_frame) and the
+# training-only frames are never cached: each get_frame("hist"/"all_data")
+# builds a fresh copy that is freed as soon as the caller drops it.
+_frames: Dict[str, pd.DataFrame] = {}
+_LAZY_FRAMES = ("hist", "curr", "all_data", "current_driver_teams")
+_TRAINING_FRAMES = ("hist", "all_data")
+
+
+def get_frame(name: str) -> pd.DataFrame:
+    """Return one of the module-level frames, loading it on first access."""
+    if name in _frames:
+        return _frames[name]
+    with metrics.span(f"data_load.{name}"):
+        frame = _load_frame(name)
+        if LOW_MEMORY and name in dataset_store.PARTITIONS:
+            frame = compact_frame(frame, keep=FEATURES + TARGETS)
+    if LOW_MEMORY and name in _TRAINING_FRAMES:
+        return frame
+    _frames[name] = frame
+    return frame
+
+
+def release_training_frames() -> None:
+    """Drop the cached frames only training reads; they reload on next use."""
+    for name in _TRAINING_FRAMES:
+        _frames.pop(name, None)
+
+
+def compact_frame(df: pd.DataFrame, keep=()) -> pd.DataFrame:
+    """
+    ``df`` with integer columns in the smallest dtype that holds them, floats as
+    float32 and strings as categoricals. Columns in ``keep`` are left as they
+    are (the model inputs and targets, so predictions don't change).
+    """
+    out = {}
+    for col in df.columns:
+        values = df[col]
+        if col in keep:
+            out[col] = values
+        elif pd.api.types.is_integer_dtype(values.dtype):
+            out[col] = pd.to_numeric(values, downcast="integer")
+        elif pd.api.types.is_float_dtype(values.dtype):
+            out[col] = values.astype(np.float32)
+        elif pd.api.types.is_object_dtype(values.dtype) or pd.api.types.is_string_dtype(values.dtype):
+            out[col] = values.astype("category")
+        else:
+            out[col] = values
+    return pd.DataFrame(out, index=df.index)
+
+
+# (manifest signature, error) of a dataset store that could not be rebased, so
+# the workbooks are served without retrying (and logging) on every call
+_store_rebase_failure: Optional[Tuple[Tuple[int, int], str]] = None
+
+
+def _workbook_frame(name: str) -> pd.DataFrame:
+    source = HIST_XLSX if name == "hist" else CURR_XLSX
+    return snapshot.load_frame(source, name, preprocess_data, PREPROCESS_VERSION)
+
+
+def _dataset_store() -> Optional[dataset_store.DatasetStore]:
+    """
+    The ingested dataset store, or None if there is none or it is disabled.
+    A store seeded from older workbooks is rebased onto the current ones first
+    (see dataset_store.py); if that fails it is left on disk untouched and the
+    workbooks are served instead.
+    """
+    global _store_rebase_failure
+    if not USE_DATASET_STORE:
+        return None
+    store = dataset_store.DatasetStore.open()
+    if store is None:
+        return None
+    sources = {"hist": HIST_XLSX, "curr": CURR_XLSX}
+    if not store.sources_changed(sources):
+        return store
+
+    with training_lock("dataset_store"):
+        signature = snapshot.source_signature(dataset_store.MANIFEST_FILE)
+        signature = (signature["size"], signature["mtime_ns"])
+        if _store_rebase_failure is not None and _store_rebase_failure[0] == signature:
+            return None
+        store = dataset_store.DatasetStore.open()  # another thread may have rebased it already
+        if not store.sources_changed(sources):
+            return store
+        try:
+            with metrics.span("dataset_store.rebase"):
+                entry = store.rebase({p: _workbook_frame(p) for p in dataset_store.PARTITIONS},
+                                     sources, _BASELINE_TABLE)
+        except (OSError, ValueError) as e:
+            _store_rebase_failure = (signature, repr(e))
+            metrics.count("dataset_store.rebase_failures")
+            log.warning("workbooks changed and the dataset store could not be rebased -> %r; "
+                        "serving the workbooks", e)
+            return None
+    _frames.clear()
+    metrics.count("dataset_store.rebases")
+    log.warning("workbooks changed; dataset store rebased (%d ingested rows kept, %d already in the workbooks)",
+                entry["rows_kept"], entry["rows_dropped"])
+    return store
+
+
+def dataset_store_error() -> Optional[str]:
+    """Why the dataset store is being ignored, if it could not be rebased onto changed workbooks."""
+    return None if _store_rebase_failure is None else _store_rebase_failure[1]
+
+
+def dataset_version() -> str:
+    """Tag of the data the models were trained on: "0" for the shipped workbooks."""
+    store = _dataset_store()
+    return store.tag if store is not None else "0"
+
+
+def _load_frame(name: str) -> pd.DataFrame:
+    if name in dataset_store.PARTITIONS:
+        store = _dataset_store()
+        if store is not None:
+            return store.frame(name, _BASELINE_TABLE)
+    if name in ("hist", "curr"):
+        return _workbook_frame(name)
+    if name == "all_data":
+        return pd.concat([get_frame("hist"), get_frame("curr")], ignore_index=True)
+    if name == "current_driver_teams":
+        return get_current_driver_teams(get_frame("curr"))
+    raise KeyError(name)
+
+
+def __getattr__(name):
+    # keeps `qualifying.curr`, `qualifying.all_data`, ... working for callers
+    if name in _LAZY_FRAMES:
+        return get_frame(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # =============================
 # 3) HELPER FUNCTION: GET 2025 TEAMS
@@ -116,8 +254,6 @@ def get_current_driver_teams(df):
     """
     return df.drop_duplicates('Driver', keep='last')[['Driver','Team']]
 
-current_driver_teams = get_current_driver_teams(current_data)
-
 # =============================
 # 4) FEATURE ENGINEERING
 # =============================
@@ -130,161 +266,450 @@ EXTRA_COLS = ['Sector1SpeedMin','Sector1SpeedMax','Sector1SpeedAvg','Sector1RPMA
               'Sector3SpeedMin','Sector3SpeedMax','Sector3SpeedAvg','Sector3RPMAvg','Sector3ThrottleAvg','Sector3BrakeAvg','SpeedI1','SpeedI2','SpeedFL','SpeedST']
 
 
-def fit_models() -> Tuple[StandardScaler, RandomForestRegressor, Dict[str, RandomForestRegressor]]:
-    # ensure we have a session identifier in chronological order:
-    all_data['SessionID'] = (
-            all_data['Year'].astype(str) + "_" +
-            all_data['RaceNo'].astype(str)  # or whatever orders your races
-    )
-
-    sessions = all_data['SessionID'].unique().tolist()
+BASE_RF_PARAMS = dict(
+    n_estimators=200,
+    max_depth=12,
+    max_features="sqrt",
+    bootstrap=True,
+    random_state=42,
+)
+# only the most recent sessions are worth validating on (see walk_forward.py)
+WALK_FORWARD_MAX_FOLDS = 8
+# "per_column" (one forest per EXTRA_COLS entry) or "grouped" (multi-output blocks)
+TELEMETRY_LAYOUT = "per_column"
+# what base_rf and the telemetry models are trained with: "forest", "hist_gb" or
+# "xgboost" (see model_engines.py); SLIPSTREAM_MODEL_ENGINE overrides it at import
+MODEL_ENGINE = os.environ.get("SLIPSTREAM_MODEL_ENGINE", "forest")
+
+
+@metrics.timed("fit_models")
+@training_lock("qualifying")
+def fit_models(max_folds: int = WALK_FORWARD_MAX_FOLDS,
+               n_jobs: int = None,
+               telemetry_layout: str = TELEMETRY_LAYOUT,
+               engine: Optional[str] = None) -> Tuple[StandardScaler, RandomForestRegressor, Dict[str, RandomForestRegressor]]:
+    all_data = get_frame("all_data")
+    scaler, base_rf, scores = fit_sector_model(all_data, max_folds, n_jobs, engine)
+    extra_models = fit_extra_models(all_data, scaler, telemetry_layout, engine)
+    save_models(scaler, base_rf, extra_models, scores)
+    return scaler, base_rf, extra_models
 
-    splits = []
-    for i in range(len(sessions)-1):
-        train_sess = sessions[: i+1]     # train on all up to session i
-        val_sess   = sessions[i+1]       # validate on session i+1
-        train_idx  = all_data['SessionID'].isin(train_sess)
-        val_idx    = all_data['SessionID'] == val_sess
-        splits.append((train_idx, val_idx))
 
-    for train_mask, val_mask in splits:
+def fit_sector_model(all_data: pd.DataFrame,
+                     max_folds: int = WALK_FORWARD_MAX_FOLDS,
+                     n_jobs: int = None,
+                     engine: Optional[str] = None) -> Tuple[StandardScaler, Any, Dict[str, Any]]:
+    """Walk-forward scores, then the scaler and base_rf fitted on every session (nothing is saved)."""
+    from sklearn.preprocessing import StandardScaler
+    from model_engines import make_regressor
+    from walk_forward import run_walk_forward
+
+    engine = engine or MODEL_ENGINE
+    # session identifier in chronological order (kept off the cached frame)
+    session_ids = (all_data['Year'].astype(str) + "_" + all_data['RaceNo'].astype(str)).to_numpy()
+
+    # walk-forward validation: folds run in parallel and are only scored, never kept
+    scores = run_walk_forward(
+        all_data[FEATURES].values, all_data[TARGETS].values, session_ids,
+        BASE_RF_PARAMS, TARGETS, max_folds=max_folds, n_jobs=n_jobs, engine=engine)
+    for fold in scores['folds']:
+        log.info("walk-forward %s MAE %s", fold['val_session'],
+                 {t: round(v, 4) for t, v in fold['mae'].items()})
+
+    # production model: fitted exactly once, on every session
+    X_all = all_data[FEATURES]
+    scaler = StandardScaler().fit(X_all)
+    base_rf = make_regressor(engine, BASE_RF_PARAMS)
+    base_rf.fit(scaler.transform(X_all), all_data[TARGETS])
+    return scaler, base_rf, scores
+
+
+def fit_extra_models(all_data: pd.DataFrame,
+                     scaler: Optional[StandardScaler] = None,
+                     telemetry_layout: str = TELEMETRY_LAYOUT,
+                     engine: Optional[str] = None) -> Dict[str, Any]:
+    """
+    The telemetry models on every session. Without ``scaler`` the feature
+    scaler is fitted here, exactly as fit_sector_model fits it, so both can run
+    independently.
+    """
+    from sklearn.preprocessing import StandardScaler
+    from telemetry_models import fit_telemetry_models
 
-        X_tr = all_data.loc[train_mask, FEATURES]
-        y_tr = all_data.loc[train_mask, TARGETS]
-        X_vl = all_data.loc[val_mask, FEATURES]
-        y_vl = all_data.loc[val_mask, TARGETS]
+    X_all = all_data[FEATURES]
+    if scaler is None:
+        scaler = StandardScaler().fit(X_all)
+    return fit_telemetry_models(
+        scaler.transform(X_all), all_data, EXTRA_COLS, layout=telemetry_layout, engine=engine or MODEL_ENGINE)
 
-        scaler = StandardScaler().fit(X_tr)
 
-        base_rf = RandomForestRegressor(
-            n_estimators=200,
-            max_depth=12,
-            max_features="sqrt",
-            bootstrap=True,
-            random_state=42,)
+def save_models(scaler, base_rf, extra_models, scores: Optional[Dict[str, Any]] = None) -> None:
+    """Persist the models (and walk-forward scores, if given) and register them."""
+    import joblib
 
-        base_rf.fit(scaler.transform(X_tr), y_tr)
+    # save everything for next run; each file appears only once fully written
+    for path, obj in ((SCALER_FILE, scaler), (BASE_RF_FILE, base_rf), (EXTRA_FILE, extra_models)):
+        with atomic_write(path) as fh:
+            joblib.dump(obj, fh)
+    if scores is not None:
+        with atomic_write(METRICS_FILE, "w") as fh:
+            json.dump(scores, fh, indent=2)
+    # seed the shared registry so the next prediction doesn't unpickle them again
+    for path, obj in ((SCALER_FILE, scaler), (BASE_RF_FILE, base_rf), (EXTRA_FILE, extra_models)):
+        REGISTRY.put(path, obj)
+    export_compiled_models(scaler, base_rf, extra_models)
 
 
+def _data_hash() -> str:
+    """SHA-1 over the workbooks and the ingested dataset version the models are trained on."""
+    digest = hashlib.sha1(dataset_version().encode())
+    for path in (HIST_XLSX, CURR_XLSX):
+        if os.path.exists(path):
+            digest.update(snapshot.file_hash(path).encode())
+    return digest.hexdigest()
 
-    extra_models: dict[str, RandomForestRegressor] = {}
-    for col in EXTRA_COLS:
-        mask = all_data[col].notna()
-        if mask.sum() < 30:        # arbitrary minimum to avoid overfitting on tiny samples
-            continue
-        X_sub = scaler.transform(all_data.loc[mask, FEATURES])
-        y_sub = all_data.loc[mask, col]
-        model = RandomForestRegressor(n_estimators=120, max_depth=10, random_state=42)
-        model.fit(X_sub, y_sub)
-        extra_models[col] = model
 
-    # make sure model dir exists and save everything for next run
-    os.makedirs(MODEL_DIR, exist_ok=True)
-    joblib.dump(scaler,      SCALER_FILE)
-    joblib.dump(base_rf,     BASE_RF_FILE)
-    joblib.dump(extra_models,EXTRA_FILE)
-    return scaler, base_rf, extra_models
+def _artifact_meta(targets, data_hash: str, engine: str = "forest") -> Dict[str, Any]:
+    """What the manifest records for a qualifying artifact besides the file itself."""
+    return {"features": FEATURES, "targets": targets, "data_hash": data_hash,
+            "preprocess_version": PREPROCESS_VERSION, "engine": engine}
 
 
+def export_compiled_models(scaler, base_rf, extra_models) -> Tuple[Any, Any, Dict[str, Any]]:
+    """
+    Flatten the fitted models into the NumPy-only format used at inference time,
+    recording what they were trained on in the artifact manifest.
+    """
+    data_hash = _data_hash()
+    engine = getattr(base_rf, "engine", "forest")
+    compiled = []
+    for obj, path, source, targets in ((scaler, COMPILED_SCALER_FILE, SCALER_FILE, None),
+                                       (base_rf, COMPILED_BASE_RF_FILE, BASE_RF_FILE, TARGETS),
+                                       (extra_models, COMPILED_EXTRA_FILE, EXTRA_FILE, EXTRA_COLS)):
+        c = forest_engine.export(obj, path, source=source, meta=_artifact_meta(targets, data_hash, engine))
+        REGISTRY.put(path, c)
+        compiled.append(c)
+    return tuple(compiled)
+
+
+@metrics.timed("model_load")
 def _load_or_train_models() -> Tuple[StandardScaler,RandomForestRegressor,Dict[str, RandomForestRegressor]]:
     """
-    Try to load cached models; if that fails for *any* reason, retrain and cache.
+    Fetch the models from the process-wide registry (unpickled once, reloaded only
+    when a file changes on disk). Compiled models that fail to load are compiled
+    again from the joblib files, and joblib files that fail fall back to the
+    compiled models; if neither loads this raises, and only a tree with no saved
+    models at all is trained from scratch. A warm-up in flight (warmup.py) is
+    waited for rather than duplicated, and overlapping callers share a single
+    load or retrain.
     """
+    warmup.wait("qualifying")
+    return SINGLE_FLIGHT.do("qualifying.models", _load_models)
 
-    paths = (SCALER_FILE, BASE_RF_FILE, EXTRA_FILE)
-    print("[ML] expecting models at:")
-    for p in paths:
-        print("      ", p, "✓" if os.path.exists(p) else "✗")
 
+def _load_models() -> Tuple[Any, Any, Dict[str, Any]]:
+    paths = (SCALER_FILE, BASE_RF_FILE, EXTRA_FILE)
+    compiled_paths = (COMPILED_SCALER_FILE, COMPILED_BASE_RF_FILE, COMPILED_EXTRA_FILE)
+
+    if USE_COMPILED_MODELS:
+        for c, p, targets in zip(compiled_paths, paths, (None, TARGETS, EXTRA_COLS)):
+            # format-1 artifacts only ever held forests
+            if forest_engine.upgrade_legacy(c, p, lambda t=targets: _artifact_meta(t, _data_hash())):
+                log.info("converted %s to artifact format %s", os.path.basename(c), forest_engine.FORMAT_VERSION)
+        if all(forest_engine.is_fresh(c, [p]) for c, p in zip(compiled_paths, paths)):
+            try:
+                return tuple(REGISTRY.get(c, loader=forest_engine.load) for c in compiled_paths)
+            except Exception as e:
+                metrics.count("qualifying.model_load_failures")
+                log.warning("failed to load compiled models -> %r; re-exporting them", e)
+        if any(map(REGISTRY.failed, paths)):
+            # these joblib files already failed to unpickle: don't try them again
+            models = _compiled_fallback(compiled_paths)
+            if models is not None:
+                return models
+
+    if all(map(os.path.exists, paths)):
+        try:
+            scaler       = REGISTRY.get(SCALER_FILE)
+            base_rf      = REGISTRY.get(BASE_RF_FILE)
+            extra_models = REGISTRY.get(EXTRA_FILE)
+        except Exception as e:
+            # any pickle or version incompatibility lands here
+            metrics.count("qualifying.model_load_failures")
+            log.warning("failed to load cached models -> %r", e)
+            models = _compiled_fallback(compiled_paths)
+            if models is not None:
+                log.warning("serving the compiled models instead")
+                return models
+            # never a multi-minute retrain on the device: rebuild offline
+            raise RuntimeError(f"saved models in {MODEL_DIR} can't be loaded; "
+                               f"rebuild them with build_artifacts.py") from e
+        if USE_COMPILED_MODELS:
+            # compile once so later processes skip sklearn entirely
+            return export_compiled_models(scaler, base_rf, extra_models)
+        return scaler, base_rf, extra_models
+    if USE_COMPILED_MODELS and any(map(os.path.exists, compiled_paths)):
+        raise RuntimeError(f"compiled models in {MODEL_DIR} can't be loaded and their "
+                           f"joblib sources are missing; rebuild them with build_artifacts.py")
+
+    # ↳ nothing saved yet: build everything
+    log.warning("model files missing, will train fresh: %s", [p for p in paths if not os.path.exists(p)])
+    metrics.count("qualifying.retrains")
+    models = fit_models()
+    if USE_COMPILED_MODELS:
+        # already registered by export_compiled_models, so these are cache hits
+        return tuple(REGISTRY.get(c, loader=forest_engine.load) for c in compiled_paths)
+    return models
+
+
+def _compiled_fallback(compiled_paths) -> Optional[Tuple[Any, Any, Dict[str, Any]]]:
+    """
+    The compiled models even if older than the joblib files: they don't depend
+    on scikit-learn, so they beat a retrain. None if they can't be loaded.
+    """
+    if not (USE_COMPILED_MODELS and all(map(os.path.exists, compiled_paths))):
+        return None
     try:
-        if all(map(os.path.exists, paths)):
-            print("[ML] Loading cached models …")
-            # — turn off mem-mapping: some Android/embedded builds don’t like it
-            scaler       = joblib.load(SCALER_FILE, mmap_mode=None)
-            base_rf      = joblib.load(BASE_RF_FILE, mmap_mode=None)
-            extra_models = joblib.load(EXTRA_FILE, mmap_mode=None)
-            print("[ML] …loaded OK.")
-            return scaler, base_rf, extra_models
-        else:
-            print("[ML] One or more model files missing; will train fresh.")
+        models = tuple(REGISTRY.get(c, loader=forest_engine.load) for c in compiled_paths)
     except Exception as e:
-        # any pickle or version incompatibility lands here
-        print("[ML] Failed to load cached models ->", repr(e))
-        print("[ML] Retraining from scratch…")
-
-    # ↳ either files missing *or* load failed: build everything again
-    return fit_models()
+        log.warning("failed to load compiled models -> %r", e)
+        return None
+    metrics.count("qualifying.compiled_fallbacks")
+    return models
 
-def _fallback_latest(driver_id: int, col: str) -> float:
-    """Return the most‑recent recorded value for (driver, col) or np.nan."""
-    rows = curr[curr['Driver'] == driver_id]
-    if rows.empty or col not in rows.columns:
-        return np.nan
-    return rows.iloc[-1][col]
 
 # =============================
-# 6) PREDICTION FUNCTION
+# 6) PREDICTION FUNCTIONS
 # =============================
 
-def predict_qualifying_results(track_number: int) -> Dict[str, Any]:
-    # the three globals used by predict_qualifying_results below
-    scaler, base_rf, extra_models = _load_or_train_models()
-    # Ensure track_number is valid
-    if track_number not in track_mapping:
-        raise ValueError(f"Track number {track_number} not in track_mapping.")
+# Predictions only depend on the track and on the model/data version, so results
+# are cached per track and dropped wholesale when any artifact changes.
+_result_cache: Dict[str, Any] = {"version": None, "results": {}}
+
+
+def _artifact_version() -> Tuple:
+    """Size/mtime of every input a prediction depends on."""
+    sig = []
+    for path in (SCALER_FILE, BASE_RF_FILE, EXTRA_FILE, COMPILED_SCALER_FILE,
+                 COMPILED_BASE_RF_FILE, COMPILED_EXTRA_FILE, CURR_XLSX,
+                 dataset_store.MANIFEST_FILE):
+        if os.path.exists(path):
+            st = os.stat(path)
+            sig.append((path, st.st_size, st.st_mtime_ns))
+    return (PREPROCESS_VERSION, *sig)
+
+
+# Per-driver dimension table (latest team, TeamAvg_S* and telemetry) for the
+# current data. Rebuilt when `curr` is reloaded, i.e. once per dataset version.
+_drivers: Dict[str, Any] = {"frame": None, "table": None}
 
-    # feature rows (one per current driver)
-    latest = curr.drop_duplicates('Driver', keep='last')
-    rows = [{
+
+def driver_dimensions() -> dimensions.DriverTable:
+    """Every current driver's most recent session, indexed for array lookups."""
+    curr = get_frame("curr")
+    if _drivers["frame"] is not curr:
+        table = dimensions.DriverTable.from_frame(
+            curr, ['TeamAvg_S1', 'TeamAvg_S2', 'TeamAvg_S3'] + EXTRA_COLS)
+        _drivers.update(frame=curr, table=table)
+    return _drivers["table"]
+
+
+def _inference_matrix(tracks, drivers: dimensions.DriverTable) -> pd.DataFrame:
+    """Feature rows for every (track, driver) pair, track-major."""
+    n_drivers, n_tracks = len(drivers), len(tracks)
+    return pd.DataFrame({
         'Year': 2025,
-        'Driver': r['Driver'],
-        'Team': r['Team'],
-        'Track': track_number,
-        'TeamAvg_S1': r['TeamAvg_S1'],
-        'TeamAvg_S2': r['TeamAvg_S2'],
-        'TeamAvg_S3': r['TeamAvg_S3']
-    } for _, r in latest.iterrows()]
-    X_inf = pd.DataFrame(rows)[FEATURES]
-    Xs_inf = scaler.transform(X_inf)
+        'Driver': np.tile(drivers.driver, n_tracks),
+        'Team': np.tile(drivers.team, n_tracks),
+        'Track': np.repeat(tracks, n_drivers),
+        'TeamAvg_S1': np.tile(drivers.column('TeamAvg_S1'), n_tracks),
+        'TeamAvg_S2': np.tile(drivers.column('TeamAvg_S2'), n_tracks),
+        'TeamAvg_S3': np.tile(drivers.column('TeamAvg_S3'), n_tracks),
+    })[FEATURES]
+
+
+def _predict_tracks(tracks, scaler, base_rf, extra_models) -> Dict[int, pd.DataFrame]:
+    """Score every (track, driver) pair in one feature matrix, then split per track."""
+    drivers = driver_dimensions()
+    n_drivers = len(drivers)
+    with metrics.span("scale"):
+        Xs_inf = scaler.transform(_inference_matrix(tracks, drivers))
 
     # sector‑time deltas → absolute times
-    deltas = base_rf.predict(Xs_inf)
-    b1, b2, b3 = track_sector_baselines[track_number]
-    secs   = deltas + np.array([b1, b2, b3])
-    laps   = secs.sum(axis=1)
-
-    out = pd.DataFrame({
-        'Driver': latest['Driver'].values,
-        'Sector1Time': secs[:, 0],
-        'Sector2Time': secs[:, 1],
-        'Sector3Time': secs[:, 2],
-        'LapTime': laps
-    })
-
-    # Telemetry predictions / fallbacks
-    for col in EXTRA_COLS:
-        if col in extra_models:
-            out[col] = extra_models[col].predict(Xs_inf)
-        else:
-            out[col] = [ _fallback_latest(drv, col) for drv in out['Driver'] ]
+    with metrics.span("predict.base_rf"):
+        deltas = base_rf.predict(Xs_inf)
+    baselines = np.repeat(dimensions.TRACKS.baseline[tracks], n_drivers, axis=0)
+    secs = deltas + baselines
 
-    # Final formatting & ordering
-    out['Position']    = out['LapTime'].rank(method='first').astype(int)
-    out['DriverName']  = out['Driver'].map(driver_mapping)
-    out['TeamName']    = out['Driver'].apply(lambda d: team_mapping[curr[curr['Driver']==d]['Team'].iloc[-1]])
+    # Telemetry predictions (one call per model) / latest recorded value as fallback
+    with metrics.span("predict.telemetry"):
+        extra = predict_telemetry(extra_models, Xs_inf)
 
+    driver_names = drivers.code
+    team_names = drivers.team_name
     ordered_cols = ['Position', 'DriverName', 'TeamName',
-                    'Sector1Time', 'Sector2Time', 'Sector3Time'] + EXTRA_COLS + ['LapTime']
+                    'Sector1Time', 'Sector2Time', 'Sector3Time'] + EXTRA_COLS + ['LapTime', 'DatasetVersion']
+    version = dataset_version()
+
+    results = {}
+    for i, track in enumerate(tracks):
+        rows = slice(i * n_drivers, (i + 1) * n_drivers)
+        out = pd.DataFrame({
+            'DriverName': driver_names,
+            'TeamName': team_names,
+            'Sector1Time': secs[rows, 0],
+            'Sector2Time': secs[rows, 1],
+            'Sector3Time': secs[rows, 2],
+            'LapTime': secs[rows].sum(axis=1),
+        })
+        for col in EXTRA_COLS:
+            out[col] = extra[col][rows] if col in extra else drivers.column(col)
+
+        # Final formatting & ordering
+        out['Position'] = out['LapTime'].rank(method='first').astype(int)
+        out['DatasetVersion'] = version
+        results[track] = out[ordered_cols].sort_values('Position').reset_index(drop=True)
+    return results
+
+
+def predict_all_tracks(tracks=None) -> Dict[int, pd.DataFrame]:
+    """
+    Predicted qualifying grid for every track (or the given subset), computed in
+    one batched pass per model and served from the result cache afterwards.
+    """
+    tracks = sorted(track_mapping) if tracks is None else list(tracks)
+    for t in tracks:
+        if t not in track_mapping:
+            raise ValueError(f"Track number {t} not in track_mapping.")
 
-    return out[ordered_cols].sort_values('Position').reset_index(drop=True)
+    scaler, base_rf, extra_models = _load_or_train_models()
+    version = _artifact_version()
+    if _result_cache["version"] != version:
+        _result_cache["version"] = version
+        _result_cache["results"] = {}
+    cached = _result_cache["results"]
+
+    missing = [t for t in tracks if t not in cached]
+    metrics.count("qualifying.result_cache.hit", len(tracks) - len(missing))
+    metrics.count("qualifying.result_cache.miss", len(missing))
+    if missing:
+        # cold requests for different tracks all ask for the full grid: compute it once
+        cached.update(SINGLE_FLIGHT.do(("qualifying.predict", version, tuple(missing)),
+                                       _predict_tracks, missing, scaler, base_rf, extra_models))
+    return {t: cached[t].copy() for t in tracks}
+
+
+def _per_tree_deltas(base_rf, Xs: np.ndarray) -> np.ndarray:
+    """
+    Sector deltas from every tree of the forest: shape (trees, rows, sectors).
+    A boosted model has no spread across its trees, so it counts as a single one.
+    """
+    if hasattr(base_rf, "predict_per_tree"):
+        return base_rf.predict_per_tree(Xs)
+    if not hasattr(base_rf, "estimators_"):
+        return np.asarray(base_rf.predict(Xs)).reshape(1, len(Xs), -1)
+    return np.stack([est.predict(Xs).reshape(len(Xs), -1) for est in base_rf.estimators_])
+
+
+@metrics.timed("grid_probabilities")
+def predict_grid_probabilities(tracks=None, n_samples: int = QUALI_SIM_SAMPLES,
+                               seed: Optional[int] = 0) -> Dict[int, pd.DataFrame]:
+    """
+    Probabilistic grid for every track (or the given subset): per-tree lap
+    predictions run through ``n_samples`` simulated Q1/Q2/Q3 knockouts (see
+    quali_sim.py). One row per driver, ordered by expected position, with the
+    probability of pole, of a top-10 start and of every grid slot (P1..Pn).
+    """
+    tracks = sorted(track_mapping) if tracks is None else list(tracks)
+    for t in tracks:
+        if t not in track_mapping:
+            raise ValueError(f"Track number {t} not in track_mapping.")
+
+    scaler, base_rf, _ = _load_or_train_models()
+    drivers = driver_dimensions()
+    n_drivers = len(drivers)
+    Xs_inf = scaler.transform(_inference_matrix(tracks, drivers))
+
+    # (trees, tracks * drivers, sectors) -> lap time per (tree, track, driver)
+    deltas = _per_tree_deltas(base_rf, Xs_inf)
+    baselines = np.repeat(dimensions.TRACKS.baseline[tracks], n_drivers, axis=0)
+    laps = (deltas + baselines).sum(axis=2).reshape(len(deltas), len(tracks), n_drivers)
+
+    probs = quali_sim.slot_probabilities(quali_sim.simulate_qualifying(laps, n_samples, seed=seed))
+    slots = np.arange(1, n_drivers + 1)
+    version = dataset_version()
+    driver_names = drivers.code
+    team_names = drivers.team_name
+
+    results = {}
+    for i, track in enumerate(tracks):
+        p = probs[i]
+        out = pd.DataFrame({
+            'DriverName': driver_names,
+            'TeamName': team_names,
+            'ExpectedPosition': p @ slots,
+            'MeanLapTime': laps[:, i].mean(axis=0),
+            'PoleProbability': p[:, 0],
+            'Top10Probability': p[:, :quali_sim.Q3_SIZE].sum(axis=1),
+        })
+        for k in range(n_drivers):
+            out[f'P{k + 1}'] = p[:, k]
+        out['DatasetVersion'] = version
+        results[track] = out.sort_values('ExpectedPosition', kind='stable').reset_index(drop=True)
+    return results
+
+
+def predict_qualifying_results(track_number: int) -> pd.DataFrame:
+    # Ensure track_number is valid
+    if track_number not in track_mapping:
+        raise ValueError(f"Track number {track_number} not in track_mapping.")
+
+    # the first request fills the grid for every track; later ones are lookups
+    if track_number not in _result_cache["results"]:
+        predict_all_tracks()
+    return predict_all_tracks([track_number])[track_number]
 
 # =============================
 # 7) OPTIONAL: CLI MAIN
 # =============================
 
-def main(track_num):
-    try:
-        predictions = predict_qualifying_results(track_num)
+def _results_csv(track_num) -> str:
+    predictions = predict_qualifying_results(track_num)
+    with metrics.span("serialize_csv"):
         return predictions.to_csv(index=False) # ✅ safest output format
-    except Exception as e:
-        return str(e)
\ No newline at end of file
+
+
+def main(track_num):
+    with metrics.span("qualifying.main"):
+        try:
+            # identical requests in flight share one prediction
+            csv = SINGLE_FLIGHT.do(("qualifying.main", track_num), _results_csv, track_num)
+            metrics.first_result("qualifying")
+            return csv
+        except Exception as e:
+            metrics.count("qualifying.errors")
+            return str(e)
+
+
+# The binary and probability entry points raise on failure, like the strategy
+# ones: an error message is not a valid result_codec buffer. main() keeps
+# returning the message as its CSV.
+
+@metrics.timed("qualifying.binary_main")
+def binary_main(track_num) -> bytes:
+    """main(), encoded with result_codec instead of CSV."""
+    predictions = predict_qualifying_results(track_num)
+    with metrics.span("serialize_binary"):
+        return result_codec.encode(predictions)
+
+
+@metrics.timed("qualifying.batch_binary_main")
+def batch_binary_main(tracks=None) -> bytes:
+    """The grid of every track (or the given ones) in one result_codec buffer, with a Track field."""
+    return result_codec.encode_batch(predict_all_tracks(tracks), key="Track")
+
+
+@metrics.timed("qualifying.probabilities_main")
+def probabilities_main(track_num, n_samples=QUALI_SIM_SAMPLES) -> str:
+    """predict_grid_probabilities() for one track, as CSV."""
+    return predict_grid_probabilities([track_num], n_samples)[track_num].to_csv(index=False)
\ No newline at end of file
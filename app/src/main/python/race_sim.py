@@ -0,0 +1,172 @@
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+# Monte Carlo race simulation for strategy strings such as "M-H" or "I-M-S".
+#
+# The strategy classifier says which strategies teams *tend* to run; this
+# module checks how fast they actually are. For each candidate, n_samples races
+# are simulated at once as a (samples x laps) array of lap times:
+#
+#   lap time = base + compound pace + degradation * tyre age + noise
+#
+# plus the pit loss on the first lap of every new stint. Pit laps are spread in
+# proportion to each compound's stint life with some jitter, and a safety car
+# (probability SC_PROBABILITY per race) neutralises SC_LAPS laps: lap times are
+# the same for everyone and pitting under it is cheaper. Candidates share their
+# random numbers, so differences between them come from the strategy alone.
+#
+# In wet races the track dries during the race (fully dry somewhere within
+# DRYING_FRACTION of the distance), so dry compounds catch up with I/W tyres.
+#
+# Finishing positions come from racing the 19 other grid slots: every slot
+# further back loses PACE_PER_SLOT_S per lap plus the track-position value of
+# the place (higher where overtaking is hard), and the field runs the fastest
+# candidate in the same simulated races.
+
+BASE_LAP_TIME_S = 90.0
+LAP_NOISE_S = 0.4
+
+# compound: (dry pace s/lap, wet pace s/lap, degradation s/lap per lap of age,
+#            relative stint life)
+COMPOUNDS = {
+    'S': (0.0, 6.0, 0.10, 0.7),
+    'M': (0.35, 6.3, 0.06, 1.0),
+    'H': (0.7, 6.6, 0.035, 1.4),
+    'I': (4.0, 0.0, 0.05, 1.1),
+    'W': (8.0, 1.5, 0.04, 1.3),
+}
+
+# degradation is given for this stint length and track temperature
+REFERENCE_STINT_LAPS = 20.0
+REFERENCE_TRACK_TEMP = 35.0
+TEMP_DEG_PER_C = 0.02
+PIT_JITTER_LAPS = 2.0
+# wet races: fraction of the distance by which the track is fully dry
+DRYING_FRACTION = (0.3, 0.9)
+
+PIT_LOSS_S = 22.0
+SC_PIT_LOSS_S = 11.0
+SC_PROBABILITY = 0.45
+SC_LAPS = 4
+SC_LAP_FACTOR = 1.4
+
+GRID_SIZE = 20
+PACE_PER_SLOT_S = 0.03
+TRACK_POSITION_S = {'low': 0.5, 'medium': 1.5, 'high': 3.0}
+FIELD_NOISE_S = 8.0
+
+
+def parse_strategy(strategy: str) -> List[str]:
+    """'M-H-H' -> ['M', 'H', 'H'] (unknown compounds raise ValueError)."""
+    stints = [c.strip().upper() for c in str(strategy).split('-') if c.strip()]
+    unknown = [c for c in stints if c not in COMPOUNDS]
+    if not stints or unknown:
+        raise ValueError(f"Cannot simulate strategy {strategy!r}: unknown compounds {unknown}")
+    return stints
+
+
+def _pit_laps(life: np.ndarray, laps: int, rng: np.random.Generator, n_samples: int) -> np.ndarray:
+    """First lap of every stint after the first: shape (samples, stints - 1), strictly increasing."""
+    stops = len(life) - 1
+    planned = np.cumsum(life)[:-1] / life.sum() * laps
+    jitter = rng.normal(0.0, PIT_JITTER_LAPS, size=(n_samples, stops))
+    pit = np.rint(planned + jitter).astype(np.int64)
+    # every stint at least one lap long, in order
+    offset = np.arange(stops)
+    pit = np.maximum.accumulate(np.clip(pit - offset, 1, laps - stops), axis=1) + offset
+    return pit
+
+
+def simulate_race_times(strategy: str,
+                        laps: int,
+                        is_wet: bool = False,
+                        track_temp: float = REFERENCE_TRACK_TEMP,
+                        stint_length: float = REFERENCE_STINT_LAPS,
+                        n_samples: int = 10000,
+                        seed: Optional[int] = 0) -> np.ndarray:
+    """Total race time in seconds for ``n_samples`` simulated races: shape (samples,)."""
+    stints = parse_strategy(strategy)
+    spec = np.array([COMPOUNDS[c] for c in stints], dtype=np.float32)
+    wear = max(0.2, 1 + TEMP_DEG_PER_C * (track_temp - REFERENCE_TRACK_TEMP))
+    deg = spec[:, 2] * np.float32(wear * REFERENCE_STINT_LAPS / max(stint_length, 1.0))
+
+    # separate streams so the shared events (noise, safety car, drying) are
+    # identical for every candidate whatever its number of stops
+    rng, pit_rng = (np.random.default_rng(s) for s in np.random.SeedSequence(seed).spawn(2))
+    lap = np.arange(laps)
+    pit = _pit_laps(spec[:, 3], laps, pit_rng, n_samples)
+    rows = np.arange(n_samples)[:, None]
+    new_stint = np.zeros((n_samples, laps), dtype=bool)
+    new_stint[rows, pit] = True
+    stint = np.cumsum(new_stint, axis=1, dtype=np.int8)
+    age = lap - np.maximum.accumulate(np.where(new_stint, lap, 0), axis=1)
+
+    if is_wet:
+        # the track dries from fully wet at the start to dry by a random lap
+        dry_by = rng.uniform(*DRYING_FRACTION, size=(n_samples, 1)) * laps
+        wetness = np.clip(1 - lap / dry_by, 0, 1).astype(np.float32)
+        pace = wetness * spec[stint, 1] + (1 - wetness) * spec[stint, 0]
+    else:
+        pace = spec[stint, 0]
+    times = BASE_LAP_TIME_S + pace + deg[stint] * age
+    times += rng.standard_normal((n_samples, laps), dtype=np.float32) * np.float32(LAP_NOISE_S)
+
+    # safety car: SC_LAPS identical slow laps starting at a random lap
+    has_sc = rng.random(n_samples) < SC_PROBABILITY
+    sc_start = rng.integers(1, max(2, laps - SC_LAPS), size=(n_samples, 1))
+    under_sc = has_sc[:, None] & (lap >= sc_start) & (lap < sc_start + SC_LAPS)
+    times[under_sc] = BASE_LAP_TIME_S * SC_LAP_FACTOR
+
+    pit_loss = np.where(under_sc[rows, pit], SC_PIT_LOSS_S, PIT_LOSS_S).sum(axis=1)
+    return times.sum(axis=1, dtype=np.float64) + pit_loss
+
+
+def finishing_positions(race_times: np.ndarray, field_times: np.ndarray, start_position: int,
+                        laps: int, overtaking: str = 'medium',
+                        seed: Optional[int] = 0) -> np.ndarray:
+    """
+    Finishing position (1..GRID_SIZE) in each simulated race. ``field_times``
+    are the same races run with the field's strategy, so shared events (safety
+    car, lap noise) cancel out and only the strategy and car spread remain.
+    """
+    slot_cost = PACE_PER_SLOT_S * laps + TRACK_POSITION_S.get(overtaking, TRACK_POSITION_S['medium'])
+    others = np.array([p for p in range(1, GRID_SIZE + 1) if p != start_position])
+    rng = np.random.default_rng(None if seed is None else [seed, 1])
+    field = field_times[:, None] + slot_cost * (others - 1) \
+        + rng.normal(0.0, FIELD_NOISE_S, size=(len(race_times), len(others)))
+    ours = race_times + slot_cost * (start_position - 1)
+    return 1 + (field < ours[:, None]).sum(axis=1)
+
+
+def score_strategies(strategies: Sequence[str],
+                     laps: int,
+                     start_position: int,
+                     is_wet: bool = False,
+                     track_temp: float = REFERENCE_TRACK_TEMP,
+                     stint_length: float = REFERENCE_STINT_LAPS,
+                     overtaking: str = 'medium',
+                     n_samples: int = 10000,
+                     seed: Optional[int] = 0) -> List[Dict[str, Any]]:
+    """
+    Simulate every candidate and return, in the input order, its expected race
+    time, spread, expected finishing position and the distribution over
+    positions 1..GRID_SIZE (``position_distribution[i]`` = P(finish i+1)).
+    """
+    if seed is None:
+        seed = np.random.SeedSequence().entropy  # random, but shared by all candidates
+    times = [simulate_race_times(s, laps, is_wet, track_temp, stint_length, n_samples, seed)
+             for s in strategies]
+    field_times = min(times, key=np.mean)
+    scored = []
+    for strategy, t in zip(strategies, times):
+        positions = finishing_positions(t, field_times, start_position, laps, overtaking, seed)
+        distribution = np.bincount(positions, minlength=GRID_SIZE + 1)[1:] / len(positions)
+        scored.append({
+            'strategy': strategy,
+            'expected_time_s': float(t.mean()),
+            'time_std_s': float(t.std()),
+            'expected_position': float(positions.mean()),
+            'position_distribution': distribution,
+        })
+    return scored
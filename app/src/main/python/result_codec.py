@@ -0,0 +1,122 @@
+import json
+import struct
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Binary encoding of the prediction tables, an alternative to CSV across the
+# Chaquopy boundary.
+#
+#   offset 0   MAGIC (4 bytes) | u16 FORMAT_VERSION | u16 0 | u32 header length
+#   offset 12  UTF-8 JSON header, space-padded so the records start 8-aligned:
+#                {"rows": 20, "itemsize": 240,
+#                 "fields": [["Position", "<i4", 0], ["DriverName", "|S3", 4], ...],
+#                 "meta": {...}}
+#   then       rows x itemsize bytes: a NumPy structured array, one record per
+#              row, every field at the header's byte offset
+#
+# Everything is little-endian. Kotlin wraps the bytes in a ByteBuffer
+# (order(LITTLE_ENDIAN)) and reads field i of row r at
+# records + r * itemsize + offset with getDouble / getFloat / getInt / getLong;
+# "|Sn" fields are UTF-8, NUL-padded to n bytes. Nothing is parsed per cell, and
+# in Python decode() is a zero-copy np.frombuffer view.
+#
+# Floats are float64 by default, so values round-trip exactly like the CSV's
+# repr formatting; float32 halves those fields when that precision is enough.
+
+MAGIC = b"SLPR"
+FORMAT_VERSION = 1
+_PREFIX = struct.Struct("<4sHHI")
+_ALIGN = 8
+
+
+def _field(values: np.ndarray, float_dtype) -> Tuple[np.ndarray, str]:
+    """One column as an array in its wire dtype."""
+    if values.dtype.kind == "b":
+        return values.astype("<i1"), "<i1"
+    if values.dtype.kind in "iu":
+        small = values.size == 0 or (values.min() >= -2**31 and values.max() < 2**31)
+        wire = "<i4" if small else "<i8"
+        return values.astype(wire), wire
+    if values.dtype.kind == "f":
+        wire = np.dtype(float_dtype).newbyteorder("<").str
+        return values.astype(wire), wire
+    # strings (object or pandas string dtype); missing values become empty
+    encoded = [b"" if v is None or (isinstance(v, float) and np.isnan(v)) else str(v).encode("utf-8")
+               for v in values.tolist()]
+    wire = f"|S{max(1, max(map(len, encoded), default=1))}"
+    return np.array(encoded, dtype=wire), wire
+
+
+def to_records(columns, float_dtype=np.float64) -> np.ndarray:
+    """
+    A DataFrame (or a mapping of column name to values) as an aligned structured
+    array in the wire format.
+    """
+    items = columns.items() if hasattr(columns, "items") else columns
+    arrays, names, formats = [], [], []
+    for name, values in items:
+        values = values.to_numpy() if isinstance(values, pd.Series) else np.asarray(values)
+        if values.dtype == object or pd.api.types.is_string_dtype(values.dtype):
+            values = np.asarray(values, dtype=object)
+        array, wire = _field(values, float_dtype)
+        arrays.append(array)
+        names.append(str(name))
+        formats.append(wire)
+    dtype = np.dtype({"names": names, "formats": formats}, align=True)
+    records = np.zeros(len(arrays[0]) if arrays else 0, dtype=dtype)
+    for name, array in zip(names, arrays):
+        records[name] = array
+    return records
+
+
+def encode(columns, meta: Optional[Dict[str, Any]] = None, float_dtype=np.float64) -> bytes:
+    """Header plus records for a DataFrame or a mapping of column name to values."""
+    records = to_records(columns, float_dtype)
+    fields = [[name, records.dtype.fields[name][0].str, records.dtype.fields[name][1]]
+              for name in records.dtype.names]
+    header = json.dumps({"rows": len(records), "itemsize": records.dtype.itemsize,
+                         "fields": fields, "meta": meta or {}}, separators=(",", ":")).encode()
+    header += b" " * (-(_PREFIX.size + len(header)) % _ALIGN)
+    return _PREFIX.pack(MAGIC, FORMAT_VERSION, 0, len(header)) + header + records.tobytes()
+
+
+def encode_batch(frames: Mapping[Any, pd.DataFrame], key: str = "Track",
+                 meta: Optional[Dict[str, Any]] = None, float_dtype=np.float64) -> bytes:
+    """Several tables with the same columns in one buffer, with their key as the first field."""
+    keys, tables = list(frames), list(frames.values())
+    if not tables:
+        return encode({key: np.zeros(0, dtype=np.int64)}, meta, float_dtype)
+    # one concat, with the key column added as an array (per-table assign() is slower than encoding)
+    table = pd.concat(tables, ignore_index=True)
+    columns = {key: np.repeat(keys, [len(t) for t in tables])}
+    columns.update(table.items())
+    return encode(columns, meta, float_dtype)
+
+
+def decode(buffer) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """(records, header) from encoded bytes; the records are a read-only view of ``buffer``."""
+    magic, version, _, header_len = _PREFIX.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError("Not an encoded result table.")
+    if version > FORMAT_VERSION:
+        raise ValueError(f"Result format {version}; this build reads up to {FORMAT_VERSION}.")
+    header = json.loads(bytes(buffer[_PREFIX.size:_PREFIX.size + header_len]))
+    names, formats, offsets = zip(*header["fields"]) if header["fields"] else ((), (), ())
+    dtype = np.dtype({"names": list(names), "formats": list(formats), "offsets": list(offsets),
+                      "itemsize": header["itemsize"]})
+    records = np.frombuffer(buffer, dtype=dtype, count=header["rows"], offset=_PREFIX.size + header_len)
+    return records, header
+
+
+def decode_frame(buffer) -> pd.DataFrame:
+    """Encoded bytes back into a DataFrame (strings decoded from UTF-8)."""
+    records, _ = decode(buffer)
+    out = {}
+    for name in records.dtype.names:
+        column = records[name]
+        if column.dtype.kind == "S":
+            column = np.array([v.decode("utf-8") for v in column.tolist()], dtype=object)
+        out[name] = column
+    return pd.DataFrame(out)
@@ -0,0 +1,153 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import metrics
+from concurrency import atomic_write
+
+# Binary snapshots of the Excel workbooks shipped with the app.
+#
+# Parsing .xlsx through openpyxl is the slowest part of a cold start, so each
+# workbook is converted once into a NumPy .npz file that holds the frame *after*
+# preprocessing. The snapshot remembers the size, mtime and SHA-1 of the source
+# workbook and is only rebuilt from Excel when that workbook changes.
+
+log = logging.getLogger(__name__)
+
+HERE = os.path.dirname(__file__)
+SNAPSHOT_DIR = os.path.join(HERE, "snapshots")
+
+_META_KEY = "__meta__"
+_NA_PREFIX = "__na__"
+
+
+def file_hash(path: str, chunk_size: int = 1 << 20) -> str:
+    """SHA-1 of the file contents."""
+    h = hashlib.sha1()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def source_signature(path: str) -> Dict[str, int]:
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def source_record(path: str) -> Dict[str, Any]:
+    """Size, mtime and SHA-1 of a source file, for telling later whether it changed."""
+    return dict(source_signature(path), sha1=file_hash(path))
+
+
+def sources_changed(recorded: Dict[str, Dict[str, Any]], sources: Dict[str, str]) -> bool:
+    """
+    True if any file in ``sources`` (name -> path) differs from its entry in
+    ``recorded`` (name -> source_record). The content hash decides when only
+    the size or mtime moved.
+    """
+    for name, path in sources.items():
+        entry = recorded.get(name)
+        if entry is None or not os.path.exists(path):
+            return True
+        sig = source_signature(path)
+        if (sig["size"], sig["mtime_ns"]) == (entry["size"], entry["mtime_ns"]):
+            continue
+        if file_hash(path) != entry["sha1"]:
+            return True
+    return False
+
+
+def frame_to_arrays(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """Split a frame into one plain array per column (no pickled objects)."""
+    arrays = {}
+    for i, col in enumerate(df.columns):
+        values = df[col]
+        if values.dtype.kind in "biuf":
+            arrays[f"c{i}"] = values.to_numpy()
+        else:
+            # strings / mixed objects: store as fixed-width unicode plus a NaN mask
+            na = values.isna().to_numpy()
+            arrays[f"c{i}"] = values.astype(str).to_numpy(dtype=str)
+            arrays[f"{_NA_PREFIX}{i}"] = na
+    return arrays
+
+
+def arrays_to_frame(npz, columns) -> pd.DataFrame:
+    data = {}
+    for i, col in enumerate(columns):
+        values = npz[f"c{i}"]
+        na_key = f"{_NA_PREFIX}{i}"
+        if na_key in npz.files:
+            values = values.astype(object)
+            values[npz[na_key]] = np.nan
+        data[col] = values
+    return pd.DataFrame(data, columns=columns)
+
+
+def _read_snapshot(path: str) -> Optional[Tuple[dict, Any]]:
+    if not os.path.exists(path):
+        return None
+    try:
+        npz = np.load(path, allow_pickle=False)
+        meta = json.loads(str(npz[_META_KEY]))
+        return meta, npz
+    except Exception as e:
+        log.warning("unreadable snapshot %s -> %r", path, e)
+        return None
+
+
+def _write_snapshot(path: str, df: pd.DataFrame, meta: dict) -> None:
+    meta = dict(meta, columns=[str(c) for c in df.columns])
+    try:
+        with atomic_write(path) as fh:
+            np.savez(fh, **frame_to_arrays(df), **{_META_KEY: np.array(json.dumps(meta))})
+    except OSError as e:
+        # a read-only install dir just means we parse Excel next time too
+        log.warning("could not write %s -> %r", path, e)
+
+
+def load_frame(source: str,
+               name: str,
+               transform: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None,
+               version: str = "1") -> pd.DataFrame:
+    """
+    Return ``transform(pd.read_excel(source))``, served from a binary snapshot
+    whenever the workbook is unchanged since the snapshot was written.
+
+    ``version`` identifies the transform; bump it whenever the preprocessing
+    logic changes so that stale snapshots are rebuilt.
+    """
+    snap_path = os.path.join(SNAPSHOT_DIR, name + ".npz")
+    sig = source_signature(source)
+
+    cached = _read_snapshot(snap_path)
+    if cached is not None:
+        meta, npz = cached
+        if meta.get("version") == version:
+            if meta.get("size") == sig["size"] and meta.get("mtime_ns") == sig["mtime_ns"]:
+                df = arrays_to_frame(npz, meta["columns"])
+                npz.close()
+                return df
+            # mtime moved (e.g. assets re-extracted after an app update):
+            # the content hash decides whether the data really changed
+            digest = file_hash(source)
+            if meta.get("sha1") == digest:
+                df = arrays_to_frame(npz, meta["columns"])
+                npz.close()
+                _write_snapshot(snap_path, df, dict(meta, **sig))
+                return df
+        npz.close()
+
+    metrics.count(f"snapshot.rebuilds.{name}")
+    log.info("rebuilding %s from %s", name, os.path.basename(source))
+    df = pd.read_excel(source)
+    if transform is not None:
+        df = transform(df)
+    _write_snapshot(snap_path, df, dict(sig, version=version, sha1=file_hash(source)))
+    return df
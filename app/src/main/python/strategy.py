@@ -1,23 +1,266 @@
 import pandas as pd
 import numpy as np
-import glob
 import os
-from sklearn.model_selection import train_test_split, GridSearchCV
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
-from sklearn.preprocessing import LabelEncoder, StandardScaler
-from sklearn.pipeline import Pipeline
-from sklearn.metrics import accuracy_score, classification_report
-import joblib
+import hashlib
+import json
+import logging
+import time
 from datetime import datetime
-import re
 
+# sklearn and joblib are imported by train_model/save_model only: predictions run
+# on the compiled model, so the inference path never loads them.
+import forest_engine
+import metrics
+from concurrency import SINGLE_FLIGHT, atomic_write, training_lock
+import race_sim
+import result_codec
+import snapshot
+import warmup
+from dimensions import TRACKS, TRACK_INFO, DEFAULT_TRACK_INFO, TRACK_MAX_PITSTOPS, DEFAULT_MAX_PITSTOPS
+from model_registry import REGISTRY
 
 import warnings
 warnings.filterwarnings('ignore')
 
+log = logging.getLogger(__name__)
+
 HERE = os.path.dirname(__file__)
 MODEL_DIR = os.path.join(HERE, "saved_models")  # same as your qualifying code
 MODEL_FILE = os.path.join(MODEL_DIR, "f1_strategy_model.joblib")
+# NumPy-only copy of the same model (see forest_engine.py)
+COMPILED_MODEL_FILE = os.path.join(MODEL_DIR, "compiled", "f1_strategy_model.bin")
+# serve predictions from the compiled NumPy engine instead of sklearn objects
+USE_COMPILED_MODELS = True
+
+# Per-track race characteristics (TRACK_INFO, TRACK_MAX_PITSTOPS and their
+# defaults) are defined in dimensions.py, shared with qualifying.py.
+
+# Temperature spread assumed for every prediction (the app doesn't collect it)
+DEFAULT_TEMP_RANGE = 8
+
+# Training profiles for train_model:
+#   "full":     exhaustive GridSearchCV over PARAM_GRID (offline builds)
+#   "budgeted": successive halving over the same grid with n_estimators as the
+#               halving resource; conditions left when the time budget runs
+#               out are trained with the "fast" settings instead
+#   "fast":     one reasonable forest and no search, for on-device fallback
+#               training so the user gets an answer almost immediately
+TRAINING_PROFILES = ("full", "budgeted", "fast")
+PARAM_GRID = {
+    'model__n_estimators': [100, 300, 500],
+    'model__max_depth': [None],
+    'model__min_samples_split': [2, 5, 10],
+    'model__max_features': [None],
+    'model__bootstrap': [True, False]
+}
+FAST_PARAMS = {
+    'model__n_estimators': 100,
+    'model__max_depth': None,
+    'model__min_samples_split': 2,
+    'model__max_features': None,
+    'model__bootstrap': False,
+}
+# Search results per (condition, profile, grid, training data hash), so an
+# unchanged dataset refits the known best parameters without searching again
+SEARCH_CACHE_FILE = os.path.join(MODEL_DIR, "strategy_search_cache.json")
+
+
+def _data_hash(X: pd.DataFrame, y: pd.Series) -> str:
+    rows = pd.util.hash_pandas_object(pd.concat([X, y], axis=1), index=True).values
+    return hashlib.sha1(rows.tobytes()).hexdigest()
+
+
+def _load_search_cache() -> dict:
+    try:
+        with open(SEARCH_CACHE_FILE) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_search_cache(cache: dict) -> None:
+    with atomic_write(SEARCH_CACHE_FILE, "w") as fh:
+        json.dump(cache, fh, indent=1)
+
+
+def _json_params(params: dict) -> dict:
+    return {k: v.item() if isinstance(v, np.generic) else v for k, v in params.items()}
+
+
+def _summarise_cv_results(cv_results: dict) -> dict:
+    """The JSON-safe part of ``cv_results_``: candidates and their per-fold scores."""
+    summary = {'params': [_json_params(p) for p in cv_results['params']]}
+    for k, v in cv_results.items():
+        if k in ('mean_test_score', 'rank_test_score', 'iter', 'n_resources') \
+                or (k.startswith('split') and k.endswith('_test_score')):
+            summary[k] = np.asarray(v).tolist()
+    return summary
+
+
+def _search_best_params(pipeline, X_train, y_train, profile: str) -> tuple:
+    """Run the search for ``profile``; returns (refitted best model, best params, cv summary)."""
+    from sklearn.model_selection import GridSearchCV
+
+    if profile == "full":
+        search = GridSearchCV(
+            pipeline,
+            param_grid=PARAM_GRID,
+            cv=3,
+            n_jobs=-1,
+            scoring='accuracy'
+        )
+    else:
+        from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+        from sklearn.model_selection import HalvingGridSearchCV
+
+        grid = {k: v for k, v in PARAM_GRID.items() if k != 'model__n_estimators'}
+        search = HalvingGridSearchCV(
+            pipeline,
+            param_grid=grid,
+            resource='model__n_estimators',
+            min_resources=50,
+            max_resources=max(PARAM_GRID['model__n_estimators']),
+            factor=3,
+            cv=3,
+            n_jobs=-1,
+            scoring='accuracy',
+            random_state=42,
+        )
+    search.fit(X_train, y_train)
+    best_params = _json_params(search.best_params_)
+    return search.best_estimator_, best_params, _summarise_cv_results(search.cv_results_)
+
+
+STRATEGY_FEATURES = [
+    'Track', 'StartPosition', 'AvgStintLength', 'TempRange',
+    'AirTemp', 'TrackTemp', 'IsWet', 'TrackSpeed',
+    'TrackTypeEncoded', 'OvertakingDifficultyEncoded', 'NumPitStops'
+]
+CONDITION_NAMES = ("dry", "wet")
+
+
+def prepare_training_data(full_df: pd.DataFrame) -> tuple:
+    """
+    Clean and label-encode the StrategyData frame; returns ({"dry": frame,
+    "wet": frame}, encoders). Both conditions share the same encoders.
+    """
+    from sklearn.preprocessing import LabelEncoder
+
+    # Basic cleaning
+    full_df['IsWet'] = full_df['IsWet'].astype(int)
+    # Add a new column with max pit stops for each row based on Track
+    # full_df['MaxPitStops'] = full_df['Track'].map(TRACK_MAX_PITSTOPS)
+
+
+    # Now filter based on per-track maximums
+    # full_df = full_df[full_df['NumPitStops'] <= full_df['MaxPitStops']]
+
+    # Encode TrackType and OvertakingDifficulty
+    track_type_encoder = LabelEncoder()
+    overtaking_diff_encoder = LabelEncoder()
+    strategy_encoder = LabelEncoder()
+
+    full_df['TrackTypeEncoded'] = track_type_encoder.fit_transform(full_df['TrackType'])
+    full_df['OvertakingDifficultyEncoded'] = overtaking_diff_encoder.fit_transform(full_df['OvertakingDifficulty'])
+    full_df['StrategyEncoded'] = strategy_encoder.fit_transform(full_df['Strategy'])
+
+    strategy_counts = full_df['Strategy'].value_counts()
+    common_strategies = strategy_counts[strategy_counts >= 5].index  # Keep strategies with at least 3 appearances
+    full_df = full_df[full_df['Strategy'].isin(common_strategies)]
+
+
+    dry_df = full_df[(full_df['IsWet'] == 0) & (~full_df['Strategy'].str.contains('I|W'))]
+
+    # For wet races, allow any strategy (dry, intermediate, or wet tyres)
+    wet_df = full_df[(full_df['IsWet'] == 1) & (full_df['Strategy'].str.contains('W|I'))]
+
+    encoders = {
+        'strategy_encoder': strategy_encoder,
+        'track_type_encoder': track_type_encoder,
+        'overtaking_diff_encoder': overtaking_diff_encoder
+    }
+    return {'dry': dry_df, 'wet': wet_df}, encoders
+
+
+def train_condition(condition: str, df: pd.DataFrame, profile: str = "full",
+                    search_cache: dict = None) -> tuple:
+    """
+    Fit one condition's pipeline with ``profile``'s parameters. Returns
+    (model, (cache key, entry)) when a search ran, else (model, None); the
+    caller decides where the search cache is saved.
+    """
+    from sklearn.model_selection import train_test_split
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.pipeline import Pipeline
+    from sklearn.metrics import accuracy_score
+
+    search_cache = {} if search_cache is None else search_cache
+    log.info("training %s model on %d samples", condition, len(df))
+
+    # Define features to use
+    features = STRATEGY_FEATURES
+
+    target = 'StrategyEncoded'
+
+    # Split X and y
+    X = df[features + ['FinishPosition', 'PositionChange']]  # keep FinishPosition for later
+    y = df[target]
+
+    # Now split
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=42
+    )
+
+    # Drop forbidden columns from train
+    X_train = X_train.drop(columns=['FinishPosition', 'PositionChange'])
+    # Drop forbidden columns from test
+    X_test = X_test.drop(columns=['FinishPosition', 'PositionChange'])
+
+    # Pipeline
+    pipeline = Pipeline([
+        ('scaler', StandardScaler()),
+        ('model', RandomForestClassifier(
+            random_state=42,
+            class_weight='balanced'
+        ))
+    ])
+
+    best_model, searched = None, None
+    if profile == "fast":
+        best_params = FAST_PARAMS
+    else:
+        cache_key = hashlib.sha1(json.dumps(
+            [condition, profile, PARAM_GRID, _data_hash(X_train, y_train)],
+            sort_keys=True).encode()).hexdigest()
+        if cache_key in search_cache:
+            log.info("reusing cached %s search results", profile)
+            best_params = search_cache[cache_key]['best_params']
+        else:
+            best_model, best_params, cv_summary = _search_best_params(
+                pipeline, X_train, y_train, profile)
+            searched = (cache_key, {'best_params': best_params, 'cv_results': cv_summary})
+
+    if best_model is None:
+        best_model = pipeline.set_params(**best_params).fit(X_train, y_train)
+    y_pred = best_model.predict(X_test)
+    acc = accuracy_score(y_test, y_pred)
+
+    log.info("%s RandomForest best accuracy: %.3f with %s", condition, acc, best_params)
+    return best_model, searched
+
+
+def assemble_model_data(models: dict, encoders: dict) -> dict:
+    """The saved model layout: both conditions' pipelines, their encoders and the features."""
+    return {
+        'dry_model': models['dry'],
+        'wet_model': models['wet'],
+        'dry_encoders': dict(encoders),
+        'wet_encoders': dict(encoders),
+        'features': list(STRATEGY_FEATURES),
+    }
+
+
 class F1StrategyPredictor:
     """
     A comprehensive ML-based system for predicting optimal race strategies in Formula 1
@@ -28,309 +271,264 @@ class F1StrategyPredictor:
         self.model_data = None
         self.data_path = os.path.join(os.path.dirname(__file__), "data")
 
-    def train_model(self):
+    @metrics.timed("train_model")
+    @training_lock("strategy")
+    def train_model(self, profile="full", time_budget_s=None, data=None):
         """
         Train two machine learning models: one for dry races, one for wet races.
+
+        ``profile`` is one of TRAINING_PROFILES. ``time_budget_s`` (budgeted
+        profile) bounds the total search time; it is checked before each
+        condition's search starts. ``data`` trains on the given frame (same
+        columns as StrategyData.xlsx) instead of the shipped workbook.
         """
+        if profile not in TRAINING_PROFILES:
+            raise ValueError(f"Unknown training profile {profile!r}; expected one of {TRAINING_PROFILES}.")
+        deadline = None if time_budget_s is None else time.monotonic() + time_budget_s
+        search_cache = _load_search_cache()
 
-        print("Training strategy models from Excel...")
+        log.info("training strategy models from Excel")
 
         # Load the full dataset
-        full_df = pd.read_excel(os.path.join(HERE, "StrategyData.xlsx"))
-
-        # Basic cleaning
-        full_df['IsWet'] = full_df['IsWet'].astype(int)
-        # Add a new column with max pit stops for each row based on Track
-        track_max_pitstops = {
-            1: 2,
-            2: 2,
-            3: 2,
-            4: 1,
-            5: 2,
-            6: 2,
-            7: 2,
-            8: 3,
-            9: 3,
-            10: 3,
-            11: 2,
-            12: 1,
-            13: 2,
-            14: 3,
-            15: 2,
-            16: 2,
-            17: 2,
-            18: 1,
-            19: 2,
-            20: 2,
-            21: 1,
-            22: 1,
-            23: 2,
-            24: 1,
-        }
-        # full_df['MaxPitStops'] = full_df['Track'].map(track_max_pitstops)
-
-
-        # Now filter based on per-track maximums
-        # full_df = full_df[full_df['NumPitStops'] <= full_df['MaxPitStops']]
-
-        # Encode TrackType and OvertakingDifficulty
-        track_type_encoder = LabelEncoder()
-        overtaking_diff_encoder = LabelEncoder()
-        strategy_encoder = LabelEncoder()
-
-        full_df['TrackTypeEncoded'] = track_type_encoder.fit_transform(full_df['TrackType'])
-        full_df['OvertakingDifficultyEncoded'] = overtaking_diff_encoder.fit_transform(full_df['OvertakingDifficulty'])
-        full_df['StrategyEncoded'] = strategy_encoder.fit_transform(full_df['Strategy'])
-
-        strategy_counts = full_df['Strategy'].value_counts()
-        common_strategies = strategy_counts[strategy_counts >= 5].index  # Keep strategies with at least 3 appearances
-        full_df = full_df[full_df['Strategy'].isin(common_strategies)]
-
-
-        dry_df = full_df[(full_df['IsWet'] == 0) & (~full_df['Strategy'].str.contains('I|W'))]
-
-        # For wet races, allow any strategy (dry, intermediate, or wet tyres)
-        wet_df = full_df[(full_df['IsWet'] == 1) & (full_df['Strategy'].str.contains('W|I'))]
+        if data is None:
+            full_df = snapshot.load_frame(os.path.join(HERE, "StrategyData.xlsx"), "strategy")
+        else:
+            full_df = data.copy()
+        frames, encoders = prepare_training_data(full_df)
 
         models = {}
-        encoders = {}
-
-        for condition, df in [('dry', dry_df), ('wet', wet_df)]:
-            print(f"  -> Training {condition} model on {len(df)} samples")
-
-            # Define features to use
-            features = [
-                'Track', 'StartPosition', 'AvgStintLength', 'TempRange',
-                'AirTemp', 'TrackTemp', 'IsWet', 'TrackSpeed',
-                'TrackTypeEncoded', 'OvertakingDifficultyEncoded', 'NumPitStops'
-            ]
-
-            target = 'StrategyEncoded'
-
-            # Split X and y
-            X = df[features + ['FinishPosition', 'PositionChange']]  # keep FinishPosition for later
-            y = df[target]
-
-            # Now split
-            X_train, X_test, y_train, y_test = train_test_split(
-                X, y, test_size=0.2, random_state=42
-            )
-
-            # Drop forbidden columns from train
-            X_train = X_train.drop(columns=['FinishPosition', 'PositionChange'])
-            # Drop forbidden columns from test
-            X_test = X_test.drop(columns=['FinishPosition', 'PositionChange'])
-
-            # Define RandomForest parameters
-            param_grid = {
-                'model__n_estimators': [100, 300, 500],
-                'model__max_depth': [None],
-                'model__min_samples_split': [2, 5, 10],
-                'model__max_features': [None],
-                'model__bootstrap': [True, False]
-            }
-
-            # Pipeline
-            pipeline = Pipeline([
-                ('scaler', StandardScaler()),
-                ('model', RandomForestClassifier(
-                    random_state=42,
-                    class_weight='balanced'
-                ))
-            ])
-
-            # Grid search
-            grid = GridSearchCV(
-                pipeline,
-                param_grid=param_grid,
-                cv=3,
-                n_jobs=-1,
-                scoring='accuracy'
-            )
-
-            grid.fit(X_train, y_train)
-
-            best_model = grid.best_estimator_
-            y_pred = best_model.predict(X_test)
-            acc = accuracy_score(y_test, y_pred)
-
-            print(f"    {condition.capitalize()} RandomForest best accuracy: {acc:.3f} with {grid.best_params_}")
-
-            models[condition] = best_model
-            encoders[condition] = {
-                'strategy_encoder': strategy_encoder,
-                'track_type_encoder': track_type_encoder,
-                'overtaking_diff_encoder': overtaking_diff_encoder
-            }
+        for condition, df in frames.items():
+            condition_profile = profile
+            if deadline is not None and time.monotonic() >= deadline:
+                log.info("time budget spent; %s model uses the fast profile", condition)
+                condition_profile = "fast"
+            models[condition], searched = train_condition(condition, df, condition_profile, search_cache)
+            if searched is not None:
+                search_cache[searched[0]] = searched[1]
+                _save_search_cache(search_cache)
 
         # Save everything
-        self.model_data = {
-            'dry_model': models['dry'],
-            'wet_model': models['wet'],
-            'dry_encoders': encoders['dry'],
-            'wet_encoders': encoders['wet'],
-            'features': features,
-        }
-
+        self.model_data = assemble_model_data(models, encoders)
         return self.model_data
 
+    def predict_strategy(self, track, start_position, is_wet, air_temp, track_temp):
+        return self.predict_strategies_batch(track, start_position, is_wet, air_temp, track_temp)[0]
 
+    def simulate_strategy(self, track, start_position, is_wet, air_temp, track_temp,
+                          top_k=5, n_samples=10000, seed=0):
+        """
+        ``predict_strategy`` plus a race simulation of its candidates (see
+        race_sim.py): ``result['simulation']`` lists, best candidate first, each
+        strategy's expected race time and finishing-position distribution.
+        """
+        result = self.predict_strategies_batch(track, start_position, is_wet, air_temp, track_temp,
+                                               top_k=top_k)[0]
+        row = TRACKS.index(track)
+        stint, overtaking, laps = TRACKS.stint_length[row], TRACKS.overtaking[row], int(TRACKS.laps[row])
+        candidates = [result['best_strategy']] + [s for s, _ in result['alternative_strategies']]
+        confidences = [result['best_strategy_confidence']] + [c for _, c in result['alternative_strategies']]
+        with metrics.span("race_sim"):
+            scored = race_sim.score_strategies(candidates, laps, start_position, is_wet, track_temp,
+                                               stint, overtaking, n_samples=n_samples, seed=seed)
+        for entry, confidence in zip(scored, confidences):
+            entry['confidence'] = confidence
+        result['simulation'] = scored
+        return result
+
+    def predict_strategies_batch(self, tracks, start_positions, is_wet, air_temps, track_temps,
+                                 top_k=5):
+        """
+        Ranked strategies for many scenarios at once.
 
-    def predict_strategy(self, track, start_position, is_wet, air_temp, track_temp):
+        Arguments are scalars or equal-length arrays and are broadcast together,
+        e.g. ``start_positions=range(1, 21)`` with scalar conditions sweeps the
+        whole grid. Each model (dry / wet) runs one ``predict_proba`` over all
+        of its rows. Returns one dict per scenario,
+        shaped like ``predict_strategy``'s result.
+        """
         if self.model_data is None:
-            print("Model not trained yet. Training now...")
+            log.warning("model not trained yet; training now")
             self.train_model()
 
-        # ── unpack things we saved after training ─────────────────────────────
-        # Choose the correct model
-        model_key = 'wet_model' if is_wet else 'dry_model'
-        enc_key = 'wet_encoders' if is_wet else 'dry_encoders'
-
-        model = self.model_data[model_key]
-        encoders = self.model_data[enc_key]
-        strategy_enc = encoders['strategy_encoder']
-        track_type_enc = encoders['track_type_encoder']
-        overtaking_enc = encoders['overtaking_diff_encoder']
-        features_order = self.model_data['features']
+        tracks, start_positions, is_wet, air_temps, track_temps = np.broadcast_arrays(
+            np.atleast_1d(tracks), np.atleast_1d(start_positions),
+            np.atleast_1d(is_wet).astype(bool), np.atleast_1d(air_temps), np.atleast_1d(track_temps))
+        n = len(tracks)
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        results = [None] * n
 
-        track_mapping = {
-            1: (21.90, 274.53, 'high_speed', 'medium', 57),
-            2: (20.52, 259.99, 'high_speed', 'medium', 58),
-            3: (20.52, 259.99, 'high_speed', 'medium', 71),
-            4: (22.37, 259.07, 'high_speed', 'medium', 51),
-            5: (15.08, 263.30, 'high_speed', 'low', 66),
-            6: (20.52, 259.99, 'high_speed', 'medium', 44),
-            7: (20.52, 259.99, 'high_speed', 'medium', 71),
-            8: (20.52, 259.99, 'high_speed', 'medium', 70),
-            9: (20.52, 259.99, 'high_speed', 'medium', 56),
-            10: (20.52, 259.99, 'high_speed', 'medium', 52),
-            11: (20.52, 259.99, 'high_speed', 'medium', 70),
-            12: (20.52, 259.99, 'high_speed', 'medium', 63),
-            13: (20.52, 259.99, 'high_speed', 'medium', 53),
-            14: (20.52, 259.99, 'high_speed', 'medium', 53),
-            15: (18.55, 239.07, 'high_speed', 'medium', 50),
-            16: (22.10, 280.69, 'high_speed', 'medium', 71),
-            17: (23.49, 235.59, 'high_speed', 'medium', 57),
-            18: (26.58, 219.80, 'medium_speed', 'high', 78),
-            19: (20.52, 259.99, 'high_speed', 'medium', 72),
-            20: (11.79, 261.35, 'high_speed', 'low', 57),
-            21: (22.16, 280.60, 'high_speed', 'medium', 50),
-            22: (27.37, 271.43, 'high_speed', 'high', 61),
-            23: (20.52, 259.99, 'high_speed', 'medium', 66),
-            24: (17.71, 213.35, 'medium_speed', 'low', 56)
-        }
-
-        # 📦 Get the correct track info
-        avg_stint_length, track_speed, track_type, overtaking_diff, number_of_laps = track_mapping.get(track, (20, 250, 'medium_speed', 'medium', 60))
+        for wet in (False, True):
+            rows = np.flatnonzero(is_wet == wet)
+            if len(rows) == 0:
+                continue
 
-        # Encode TrackType and OvertakingDifficulty
-        track_type_encoded = track_type_enc.transform([track_type])[0]
-        overtaking_difficulty_encoded = overtaking_enc.transform([overtaking_diff])[0]
+            scenario = (tracks[rows], start_positions[rows], air_temps[rows], track_temps[rows])
+            with metrics.span("predict.wet_model" if wet else "predict.dry_model"):
+                probs, names = self._scenario_probabilities(wet, *scenario)
+            allowed = self._allowed_strategies(names, wet)
+            names, probs = names[allowed], probs[:, allowed]
+
+            # highest probability first; ties keep class order
+            ranked = np.argsort(-probs, axis=1, kind='stable')[:, :top_k]
+            for i, row in enumerate(rows):
+                order = ranked[i]
+                candidates = [(names[j], probs[i, j]) for j in order]
+                results[row] = {
+                    'best_strategy': candidates[0][0],
+                    'best_strategy_confidence': candidates[0][1],
+                    'alternative_strategies': candidates[1:],
+                    'prediction_timestamp': timestamp,
+                }
+        return results
+
+    def _scenario_probabilities(self, is_wet, tracks, start_positions, air_temps, track_temps):
+        """Live class probabilities and decoded class names for one condition's scenarios."""
+        # ── unpack things we saved after training ─────────────────────────
+        model = self.model_data['wet_model' if is_wet else 'dry_model']
+        encoders = self.model_data['wet_encoders' if is_wet else 'dry_encoders']
+        features_order = self.model_data['features']
 
+        track_ids = np.asarray(tracks)
+        rows = TRACKS.index(track_ids)
 
-        track_max_pitstops = {
-            1: 2, 2: 2, 3: 2, 4: 1, 5: 2, 6: 2, 7: 2, 8: 3, 9: 3, 10: 3,
-            11: 2, 12: 1, 13: 2, 14: 3, 15: 2, 16: 2, 17: 2, 18: 1, 19: 2,
-            20: 2, 21: 1, 22: 1, 23: 2, 24: 1
-        }
-        num_pit_stops = track_max_pitstops.get(track, 2)
-
-        X = pd.DataFrame([{
-            'Track': track,
-            'StartPosition': start_position,
-            'AvgStintLength': avg_stint_length,
-            'TempRange': 8,
-            'AirTemp': air_temp,
-            'TrackTemp': track_temp,
+        X = pd.DataFrame({
+            'Track': track_ids,
+            'StartPosition': start_positions,
+            'AvgStintLength': TRACKS.stint_length[rows],
+            'TempRange': DEFAULT_TEMP_RANGE,
+            'AirTemp': air_temps,
+            'TrackTemp': track_temps,
             'IsWet': int(is_wet),
-            'TrackSpeed': track_speed,
-            'TrackTypeEncoded': track_type_encoded,
-            'OvertakingDifficultyEncoded': overtaking_difficulty_encoded,
-            'NumPitStops': num_pit_stops
-        }])[features_order]
+            'TrackSpeed': TRACKS.speed[rows],
+            'TrackTypeEncoded': encoders['track_type_encoder'].transform(TRACKS.track_type[rows]),
+            'OvertakingDifficultyEncoded': encoders['overtaking_diff_encoder'].transform(TRACKS.overtaking[rows]),
+            'NumPitStops': TRACKS.max_pitstops[rows],
+        })[features_order]
+
+        probs = model.predict_proba(X)
+        names = encoders['strategy_encoder'].inverse_transform(model.classes_)
+        return probs, names
+
+    @staticmethod
+    def _allowed_strategies(names, is_wet):
+        """Mask over the model's classes that may be recommended."""
+        compounds = [str(name).split('-') for name in names]
+        if not is_wet:
+            # Filter out Wet/Intermediate if dry race
+            return np.array([not any(c in ('W', 'I') for c in comp) for comp in compounds])
+        # Only keep strategies that START with W or I, if there are any;
+        # otherwise fall back to any available strategy (mixed conditions)
+        starts_wet = np.array([comp[0] in ('W', 'I') for comp in compounds])
+        return starts_wet if starts_wet.any() else np.ones(len(names), dtype=bool)
 
-        probs = model.predict_proba(X)[0]
-        class_labels = model.classes_
+    def save_model(self, filename=None):
+        """Save the trained model to disk (MODEL_FILE by default)"""
+        import joblib
 
-        # Build list of (strategy name, probability)
-        candidates = []
-        for idx, p in enumerate(probs):
-            strat_encoded = class_labels[idx]
-            strat = strategy_enc.inverse_transform([strat_encoded])[0]
+        filename = filename or MODEL_FILE
+        if self.model_data is None:
+            log.warning("no model to save; training first")
+            self.train_model()
 
-            # Filter out Wet/Intermediate if dry race
-            if not is_wet and ('W' in strat or 'I' in strat):
-                continue
+        with atomic_write(filename) as fh:
+            joblib.dump(self.model_data, fh)
+        REGISTRY.put(filename, self.model_data)
+        if filename == MODEL_FILE:
+            REGISTRY.put(COMPILED_MODEL_FILE, _export_compiled(self.model_data))
+        log.info("model saved as %s", filename)
+
+    def load_model(self, filename=None):
+        """Load a trained model from disk (shared through the process-wide registry)"""
+        filename = filename or MODEL_FILE
+        if USE_COMPILED_MODELS and filename == MODEL_FILE:
+            if forest_engine.upgrade_legacy(COMPILED_MODEL_FILE, filename,
+                                            lambda: _compiled_meta(STRATEGY_FEATURES)):
+                log.info("converted the compiled strategy model to artifact format %s",
+                         forest_engine.FORMAT_VERSION)
+            # a joblib file that already failed to unpickle isn't tried again
+            if forest_engine.is_fresh(COMPILED_MODEL_FILE, [filename]) or (
+                    REGISTRY.failed(filename) and os.path.exists(COMPILED_MODEL_FILE)):
+                try:
+                    self.model_data = REGISTRY.get(COMPILED_MODEL_FILE, loader=forest_engine.load)
+                except Exception as e:
+                    # damaged or unreadable: compile it again from the joblib
+                    # model, never retrain; with no usable joblib model, raise
+                    if not os.path.exists(filename) or REGISTRY.failed(filename):
+                        raise
+                    metrics.count("strategy.reexports")
+                    log.warning("failed to load the compiled strategy model -> %r; re-exporting it", e)
+                    self.model_data = _export_compiled(REGISTRY.get(filename))
+                    REGISTRY.put(COMPILED_MODEL_FILE, self.model_data)
+            else:
+                try:
+                    # compile once so later processes skip sklearn entirely
+                    compiled = _export_compiled(REGISTRY.get(filename))
+                except FileNotFoundError:
+                    raise
+                except Exception as e:
+                    # e.g. a scikit-learn upgrade: the older compiled copy still works
+                    if not os.path.exists(COMPILED_MODEL_FILE):
+                        raise
+                    log.warning("failed to load the strategy model -> %r; serving the compiled model", e)
+                    compiled = REGISTRY.get(COMPILED_MODEL_FILE, loader=forest_engine.load)
+                REGISTRY.put(COMPILED_MODEL_FILE, compiled)
+                self.model_data = compiled
+            return self.model_data
+        self.model_data = REGISTRY.get(filename)
+        return self.model_data
 
-            candidates.append((strat, p))
 
-        if is_wet:
-            # Only keep strategies that START with W or I
-            starting_wet_candidates = [c for c in candidates if c[0].split('-')[0] in ('W', 'I')]
+def _compiled_meta(features) -> dict:
+    """What the manifest records for the compiled model: its features and training data."""
+    data_file = os.path.join(HERE, "StrategyData.xlsx")
+    return {"features": list(features),
+            "data_hash": snapshot.file_hash(data_file) if os.path.exists(data_file) else None}
 
-            if starting_wet_candidates:
-                # If we have strategies starting with Wet/Intermediate, prefer those
-                candidates = starting_wet_candidates
-            else:
-                # Otherwise fallback to any available strategy (mixed conditions)
-                pass
 
-        # Sort candidates by probability
-        candidates.sort(key=lambda x: x[1], reverse=True)
+def _export_compiled(model_data):
+    """Compile the model for inference, recording its features and data in the manifest."""
+    meta = _compiled_meta(model_data.get("features", []))
+    return forest_engine.export(model_data, COMPILED_MODEL_FILE, source=MODEL_FILE, meta=meta)
 
-        # Return top 3
-        best_strategy, best_confidence = candidates[0]
-        alternative_strategies = candidates[1:5]
 
-        return {
-            'best_strategy': best_strategy,
-            'best_strategy_confidence': best_confidence,
-            'alternative_strategies': alternative_strategies,
-            'prediction_timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        }
+import pandas as pd
 
+# One predictor per process: requests reuse it instead of constructing and
+# loading a new one each time.
+_predictor = None
 
-    def save_model(self, filename=MODEL_FILE):
-        """Save the trained model to disk"""
-        if self.model_data is None:
-            print("No model to save. Training first...")
-            self.train_model()
 
-        # Ensure directory exists
-        os.makedirs(os.path.dirname(filename), exist_ok=True)
-        joblib.dump(self.model_data, filename)
-        print(f"Model saved as {filename}")
+def get_predictor() -> F1StrategyPredictor:
+    """The resident predictor, with its model refreshed if the artifact changed on disk."""
+    warmup.wait("strategy")
+    # overlapping requests share one load (or one fallback training run)
+    return SINGLE_FLIGHT.do("strategy.predictor", _refresh_predictor)
 
-    def load_model(self, filename=MODEL_FILE):
-        """Load a trained model from disk"""
-        self.model_data = joblib.load(filename)
-        print(f"Model loaded from {filename}")
-        return self.model_data
 
-import pandas as pd
+def _refresh_predictor() -> F1StrategyPredictor:
+    global _predictor
+    predictor = _predictor or F1StrategyPredictor()
+    if os.path.exists(MODEL_FILE) or os.path.exists(COMPILED_MODEL_FILE):
+        # a model that exists but can't be loaded raises: it is never retrained here
+        with metrics.span("model_load"):
+            predictor.load_model()  # registry hit unless the file changed
+    else:
+        # nothing shipped: train the fast profile now, the full search runs offline
+        with training_lock("strategy"):
+            metrics.count("strategy.retrains")
+            predictor.train_model(profile="fast")
+            predictor.save_model()
+    _predictor = predictor
+    return predictor
 
-def main(track_number: int, start_position: int, is_wet: bool, air_temp: int, track_temp: int) -> str:
-    print(f"[DEBUG] track_number: {track_number}")
-    print(f"[DEBUG] start_position: {start_position}")
-    print(f"[DEBUG] is_wet: {is_wet}")
-    print(f"[DEBUG] air_temp: {air_temp}")
-    print(f"[DEBUG] track_temp: {track_temp}")
 
-    predictor = F1StrategyPredictor()
-    try:
-        predictor.load_model()
-    except FileNotFoundError:
-        predictor.train_model()
-        predictor.save_model()
-
-    result = predictor.predict_strategy(
-        track=track_number,
-        start_position=start_position,
-        is_wet=is_wet,
-        air_temp=air_temp,
-        track_temp=track_temp
-    )
+def predict_strategies_batch(tracks, start_positions, is_wet, air_temps, track_temps, top_k=5):
+    """Module-level shortcut for ``get_predictor().predict_strategies_batch(...)``."""
+    return get_predictor().predict_strategies_batch(
+        tracks, start_positions, is_wet, air_temps, track_temps, top_k=top_k)
+
 
+def _result_row(result) -> dict:
     num_stops = result['best_strategy'].count('-')
 
     # Build dynamic alternative columns
@@ -339,14 +537,99 @@ def main(track_number: int, start_position: int, is_wet: bool, air_temp: int, tr
         alternatives[f'alternative_{idx+1}'] = strategy
         alternatives[f'confidence_{idx+1}'] = confidence
 
-    # Format output into a simple one-row DataFrame
-    data = {
+    return {
         "best_strategy": result['best_strategy'],
         "confidence": result['best_strategy_confidence'],
         "num_stops": num_stops,
         **alternatives  # <<<<<<<< include all dynamic alternatives
     }
 
-    df = pd.DataFrame([data])
-    return df.to_csv(index=False)
 
+@metrics.timed("strategy.grid_main")
+def grid_main(track_number: int, is_wet: bool, air_temp: int, track_temp: int) -> str:
+    """Best strategy for every start position 1-20 in one call, as CSV (one row per position)."""
+    return _grid_frame(track_number, is_wet, air_temp, track_temp).to_csv(index=False)
+
+
+@metrics.timed("strategy.grid_binary_main")
+def grid_binary_main(track_number: int, is_wet: bool, air_temp: int, track_temp: int) -> bytes:
+    """grid_main(), encoded with result_codec instead of CSV."""
+    return result_codec.encode(_grid_frame(track_number, is_wet, air_temp, track_temp))
+
+
+def _grid_frame(track_number: int, is_wet: bool, air_temp: int, track_temp: int) -> pd.DataFrame:
+    positions = np.arange(1, 21)
+    results = predict_strategies_batch(track_number, positions, is_wet, air_temp, track_temp)
+    df = pd.DataFrame([_result_row(r) for r in results])
+    df.insert(0, "start_position", positions)
+    return df
+
+
+@metrics.timed("strategy.simulation_main")
+def simulation_main(track_number: int, start_position: int, is_wet: bool, air_temp: int,
+                    track_temp: int, n_samples: int = 10000) -> str:
+    """Top candidates with simulated race time and finishing distribution, as CSV (one row each)."""
+    result = get_predictor().simulate_strategy(track_number, start_position, is_wet, air_temp,
+                                               track_temp, n_samples=n_samples)
+    rows = []
+    for entry in result['simulation']:
+        row = {
+            "strategy": entry['strategy'],
+            "confidence": entry['confidence'],
+            "expected_time_s": round(entry['expected_time_s'], 2),
+            "time_std_s": round(entry['time_std_s'], 2),
+            "expected_position": round(entry['expected_position'], 2),
+        }
+        for pos, p in enumerate(entry['position_distribution'], start=1):
+            row[f"p_position_{pos}"] = round(float(p), 4)
+        rows.append(row)
+    return pd.DataFrame(rows).to_csv(index=False)
+
+
+@metrics.timed("strategy.main")
+def main(track_number: int, start_position: int, is_wet: bool, air_temp: int, track_temp: int) -> str:
+    # identical requests in flight share one prediction
+    args = (track_number, start_position, is_wet, air_temp, track_temp)
+    csv = SINGLE_FLIGHT.do(("strategy.main",) + args, _main_csv, *args)
+    metrics.first_result("strategy")
+    return csv
+
+
+def _main_csv(track_number: int, start_position: int, is_wet: bool, air_temp: int, track_temp: int) -> str:
+    predictor = get_predictor()
+    with metrics.span("predict"):
+        result = predictor.predict_strategy(
+            track=track_number,
+            start_position=start_position,
+            is_wet=is_wet,
+            air_temp=air_temp,
+            track_temp=track_temp
+        )
+
+    # Format output into a simple one-row DataFrame
+    with metrics.span("serialize_csv"):
+        df = pd.DataFrame([_result_row(result)])
+        return df.to_csv(index=False)
+
+
+@metrics.timed("strategy.binary_main")
+def binary_main(track_number: int, start_position: int, is_wet: bool, air_temp: int, track_temp: int) -> bytes:
+    """main(), encoded with result_codec straight from the result row (no DataFrame)."""
+    result = get_predictor().predict_strategy(track_number, start_position, is_wet, air_temp, track_temp)
+    with metrics.span("serialize_binary"):
+        return result_codec.encode({k: [v] for k, v in _result_row(result).items()})
+
+
+if __name__ == "__main__":
+    # offline training: python strategy.py [--profile full|budgeted|fast] [--budget SECONDS]
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Train and save the strategy models.")
+    parser.add_argument("--profile", choices=TRAINING_PROFILES, default="full")
+    parser.add_argument("--budget", type=float, default=None, help="time budget in seconds")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="[%(name)s] %(message)s")
+    trainer = F1StrategyPredictor()
+    trainer.train_model(profile=args.profile, time_budget_s=args.budget)
+    trainer.save_model()
@@ -0,0 +1,247 @@
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+import metrics
+from model_engines import make_regressor
+
+# Telemetry (EXTRA_COLS) models for qualifying.py, in two layouts:
+#
+#   "per_column": one forest per telemetry column (the original layout)
+#   "grouped":    one multi-output forest per block of related columns, so a
+#                 whole sector's speed/RPM/throttle/brake comes out of one pass
+#
+# Both layouts are stored in the same dict (extra_models.joblib); a grouped
+# entry is keyed by block name and carries its ``columns``. predict_telemetry
+# reads either, and is the only part needed at inference time, so sklearn is
+# imported by the fitting functions alone.
+#
+# A block trains on every row with at least one of its targets. Missing targets
+# are handled per target: a forest searches its splits with them at the column
+# mean, then each leaf's value for a target is reset to the mean of the rows
+# that reach it *and* have that target (fit_masked); boosters fit one model per
+# target on that target's rows only.
+#
+# A block is only kept if it passes an acceptance check. The most recent
+# ACCEPTANCE_HOLDOUT share of sessions is cut into ACCEPTANCE_FOLDS windows;
+# for each, the block and per-column forests are fitted on every earlier
+# session and scored on the window. Pooled over the windows (one window alone
+# is too noisy to decide on), the block's MAE must be within
+# TELEMETRY_TOLERANCE of the per-column forests' for every column. A block that
+# fails, or has too little data to check, falls back to per-column forests.
+
+log = logging.getLogger(__name__)
+
+TELEMETRY_LAYOUTS = ("per_column", "grouped")
+
+TELEMETRY_GROUPS = {
+    'Sector1': ['Sector1SpeedMin', 'Sector1SpeedMax', 'Sector1SpeedAvg',
+                'Sector1RPMAvg', 'Sector1ThrottleAvg', 'Sector1BrakeAvg'],
+    'Sector2': ['Sector2SpeedMin', 'Sector2SpeedMax', 'Sector2SpeedAvg',
+                'Sector2RPMAvg', 'Sector2ThrottleAvg', 'Sector2BrakeAvg'],
+    'Sector3': ['Sector3SpeedMin', 'Sector3SpeedMax', 'Sector3SpeedAvg',
+                'Sector3RPMAvg', 'Sector3ThrottleAvg', 'Sector3BrakeAvg'],
+    'SpeedTrap': ['SpeedI1', 'SpeedI2', 'SpeedFL', 'SpeedST'],
+}
+
+TELEMETRY_RF_PARAMS = dict(n_estimators=120, max_depth=10, random_state=42)
+MIN_TRAIN_ROWS = 30   # arbitrary minimum to avoid overfitting on tiny samples
+# largest relative MAE increase over per-column forests a block may have
+TELEMETRY_TOLERANCE = 0.10
+# share of the most recent sessions the acceptance check holds out, in how many windows
+ACCEPTANCE_HOLDOUT = 0.2
+ACCEPTANCE_FOLDS = 3
+
+
+class TelemetryBlockModel:
+    """
+    Multi-output model for a block of telemetry columns.
+
+    Targets are standardised before fitting so that e.g. RPM (~10^4) does not
+    dominate the split criterion over brake fraction (~10^-1). ``acceptance``
+    holds the hold-out MAE per column against per-column forests.
+    """
+
+    def __init__(self, columns: Sequence[str], model: Any,
+                 y_mean: np.ndarray, y_std: np.ndarray,
+                 acceptance: Optional[Dict[str, Dict[str, float]]] = None):
+        self.columns = list(columns)
+        self.model = model
+        self.y_mean = y_mean
+        self.y_std = y_std
+        self.acceptance = acceptance
+
+    def predict(self, X) -> np.ndarray:
+        z = np.asarray(self.model.predict(X)).reshape(len(X), -1)
+        return z * self.y_std + self.y_mean
+
+
+def _fit_per_column(Xs: np.ndarray, frame: pd.DataFrame, columns: Sequence[str],
+                    params: Dict[str, Any], engine: str) -> Dict[str, Any]:
+    models = {}
+    for col in columns:
+        if col not in frame.columns:
+            continue
+        mask = frame[col].notna().to_numpy()
+        if mask.sum() < MIN_TRAIN_ROWS:
+            continue
+        model = make_regressor(engine, params)
+        model.fit(Xs[mask], frame.loc[mask, col])
+        models[col] = model
+    return models
+
+
+def _observed_leaf_means(forest: Any, X: np.ndarray, Z: np.ndarray, observed: np.ndarray) -> None:
+    """Reset every tree's leaf values to the mean of the observed targets reaching the leaf."""
+    partial = np.flatnonzero(~observed.all(axis=0))
+    if not len(partial):
+        return
+    leaves = forest.apply(X)
+    for t, tree in enumerate(forest.estimators_):
+        value = tree.tree_.value
+        for k in partial:
+            rows = observed[:, k]
+            counts = np.bincount(leaves[rows, t], minlength=len(value))
+            sums = np.bincount(leaves[rows, t], weights=Z[rows, k], minlength=len(value))
+            # a leaf no row with this target reaches keeps its fitted value
+            reached = counts > 0
+            value[reached, k, 0] = sums[reached] / counts[reached]
+
+
+def fit_masked(model: Any, X: np.ndarray, Z: np.ndarray) -> Any:
+    """
+    Fit ``model`` on standardised targets ``Z`` with NaN for missing values,
+    on the rows that have at least one target (see the header).
+    """
+    observed = ~np.isnan(Z)
+    rows = observed.any(axis=1)
+    X, Z, observed = X[rows], Z[rows], observed[rows]
+    if getattr(model, "masks_targets", False):
+        return model.fit(X, Z)
+    model.fit(X, np.where(observed, Z, 0.0))
+    if hasattr(model, "estimators_"):
+        _observed_leaf_means(model, X, Z, observed)
+    return model
+
+
+def _fit_block_model(X: np.ndarray, Y: np.ndarray, columns: List[str],
+                     params: Dict[str, Any], engine: str) -> TelemetryBlockModel:
+    y_mean = np.nanmean(Y, axis=0)
+    y_std = np.nanstd(Y, axis=0)
+    y_std[y_std == 0] = 1.0
+    model = fit_masked(make_regressor(engine, params), X, (Y - y_mean) / y_std)
+    return TelemetryBlockModel(columns, model, y_mean, y_std)
+
+
+def _acceptance_folds(frame: pd.DataFrame) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """(train, test) row masks: each window of recent sessions against every session before it."""
+    if {'Year', 'RaceNo'} <= set(frame.columns):
+        session = frame['Year'].to_numpy(dtype=np.int64) * 1000 + frame['RaceNo'].to_numpy(dtype=np.int64)
+    else:
+        session = np.arange(len(frame))
+    sessions = np.unique(session)
+    n_held_out = int(round(len(sessions) * ACCEPTANCE_HOLDOUT))
+    if n_held_out < ACCEPTANCE_FOLDS or n_held_out >= len(sessions):
+        return []
+    windows = np.array_split(sessions[len(sessions) - n_held_out:], ACCEPTANCE_FOLDS)
+    return [(session < window[0], np.isin(session, window)) for window in windows]
+
+
+def _acceptance(Xs: np.ndarray, frame: pd.DataFrame, columns: List[str],
+                params: Dict[str, Any], engine: str) -> Optional[Dict[str, Dict[str, float]]]:
+    """
+    Pooled hold-out MAE per column of the block and of per-column forests (see
+    the header); None when there is too little data to compare them.
+    """
+    folds = _acceptance_folds(frame)
+    Y = frame[columns].to_numpy(dtype=float)
+    observed = ~np.isnan(Y)
+    errors = np.zeros((2, len(columns)))
+    counts = np.zeros(len(columns))
+    for train, test in folds:
+        if (observed[train].sum(axis=0) < MIN_TRAIN_ROWS).any():
+            return None
+        grouped = _fit_block_model(Xs[train], Y[train], columns, params, engine).predict(Xs[test])
+        for k in range(len(columns)):
+            rows, held_out = train & observed[:, k], test & observed[:, k]
+            if not held_out.any():
+                continue
+            single = make_regressor(engine, params).fit(Xs[rows], Y[rows, k])
+            y = Y[held_out, k]
+            errors[0, k] += np.abs(grouped[observed[test, k], k] - y).sum()
+            errors[1, k] += np.abs(np.asarray(single.predict(Xs[held_out])) - y).sum()
+            counts[k] += len(y)
+    if not folds or not counts.all():
+        return None
+    return {col: {"grouped_mae": float(errors[0, k] / counts[k]), "per_column_mae": float(errors[1, k] / counts[k])}
+            for k, col in enumerate(columns)}
+
+
+def _fit_block(Xs: np.ndarray, frame: pd.DataFrame, name: str, columns: List[str],
+               params: Dict[str, Any], engine: str, tolerance: Optional[float]) -> Dict[str, Any]:
+    """
+    Fit one block if it passes the acceptance check at ``tolerance`` (None skips
+    the check); otherwise per-column models for its columns. Columns too sparse
+    to train on are left out.
+    """
+    columns = [c for c in columns
+               if c in frame.columns and frame[c].notna().sum() >= MIN_TRAIN_ROWS]
+    if not columns:
+        return {}
+    report = None
+    if tolerance is not None:
+        report = _acceptance(Xs, frame, columns, params, engine)
+        over = (["(too little data to check)"] if report is None else
+                [c for c, r in report.items() if not r["grouped_mae"] <= r["per_column_mae"] * (1 + tolerance)])
+        if over:
+            metrics.count("telemetry.blocks_rejected")
+            log.info("%s block over the %.0f%% MAE tolerance on %s; using per-column models",
+                     name, tolerance * 100, over)
+            return _fit_per_column(Xs, frame, columns, params, engine)
+
+    block = _fit_block_model(Xs, frame[columns].to_numpy(dtype=float), columns, params, engine)
+    block.acceptance = report
+    return {name: block}
+
+
+def fit_telemetry_models(Xs: np.ndarray,
+                         frame: pd.DataFrame,
+                         columns: Sequence[str],
+                         layout: str = "per_column",
+                         params: Dict[str, Any] = None,
+                         engine: str = "forest",
+                         tolerance: Optional[float] = TELEMETRY_TOLERANCE) -> Dict[str, Any]:
+    """
+    Train the telemetry models for ``columns`` on the (already scaled) ``Xs``,
+    with ``engine`` (see model_engines.py); ``params`` apply to forests.
+    Grouped blocks over ``tolerance`` fall back to per-column models.
+    """
+    if layout not in TELEMETRY_LAYOUTS:
+        raise ValueError(f"Unknown telemetry layout {layout!r}; expected one of {TELEMETRY_LAYOUTS}.")
+    params = TELEMETRY_RF_PARAMS if params is None else params
+    if layout == "per_column":
+        return _fit_per_column(Xs, frame, columns, params, engine)
+
+    models: Dict[str, Any] = {}
+    grouped = set()
+    for name, block in TELEMETRY_GROUPS.items():
+        block = [c for c in block if c in columns]
+        grouped.update(block)
+        models.update(_fit_block(Xs, frame, name, block, params, engine, tolerance))
+    # anything not covered by a block keeps its own model
+    models.update(_fit_per_column(Xs, frame, [c for c in columns if c not in grouped], params, engine))
+    return models
+
+
+def predict_telemetry(models: Dict[str, Any], Xs: np.ndarray) -> Dict[str, np.ndarray]:
+    """Column → predictions for every telemetry column covered by ``models``."""
+    out = {}
+    for key, model in models.items():
+        columns = getattr(model, "columns", [key])
+        with metrics.span(f"predict.{key}"):
+            pred = np.asarray(model.predict(Xs)).reshape(len(Xs), -1)
+        for i, col in enumerate(columns):
+            out[col] = pred[:, i]
+    return out
@@ -0,0 +1,100 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sklearn.preprocessing import StandardScaler
+
+from model_engines import make_regressor
+
+# Walk-forward (expanding window) evaluation for the qualifying sector model.
+#
+# Fold k trains on every session up to k and is scored on session k+1. Only the
+# most recent ``max_folds`` folds are evaluated: older folds train on a small
+# prefix of the data, say little about today's model and are what made the
+# previous loop quadratic in the number of sessions. Folds are independent, so
+# they run on a process pool; the production model is fitted separately, once.
+
+log = logging.getLogger(__name__)
+
+
+def expanding_window_folds(session_ids: Sequence,
+                           max_folds: Optional[int] = None) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """
+    (train_idx, val_idx) row indices for each expanding-window split, in the
+    chronological order sessions first appear in ``session_ids``.
+    """
+    session_ids = np.asarray(session_ids)
+    _, first_seen, codes = np.unique(session_ids, return_index=True, return_inverse=True)
+    # rank sessions by first appearance so the order matches the data, not the sort
+    order = np.empty_like(first_seen)
+    order[np.argsort(first_seen)] = np.arange(len(first_seen))
+    session_rank = order[codes]
+
+    n_sessions = len(first_seen)
+    first_fold = 0 if max_folds is None else max(0, n_sessions - 1 - max_folds)
+    folds = []
+    for i in range(first_fold, n_sessions - 1):
+        train_idx = np.flatnonzero(session_rank <= i)
+        val_idx = np.flatnonzero(session_rank == i + 1)
+        folds.append((train_idx, val_idx))
+    return folds
+
+
+def _fit_and_score(fold: int, X_tr: np.ndarray, y_tr: np.ndarray,
+                   X_vl: np.ndarray, y_vl: np.ndarray,
+                   params: Dict[str, Any], engine: str) -> Dict[str, Any]:
+    scaler = StandardScaler().fit(X_tr)
+    model = make_regressor(engine, params).fit(scaler.transform(X_tr), y_tr)
+    pred = model.predict(scaler.transform(X_vl)).reshape(len(X_vl), -1)
+    mae = np.abs(pred - y_vl.reshape(len(y_vl), -1)).mean(axis=0)
+    return {
+        "fold": fold,
+        "train_rows": int(len(X_tr)),
+        "val_rows": int(len(X_vl)),
+        "mae": [float(m) for m in mae],
+    }
+
+
+def run_walk_forward(X: np.ndarray,
+                     Y: np.ndarray,
+                     session_ids: Sequence,
+                     params: Dict[str, Any],
+                     target_names: Sequence[str],
+                     max_folds: Optional[int] = None,
+                     n_jobs: Optional[int] = None,
+                     engine: str = "forest") -> Dict[str, Any]:
+    """
+    Score a model of ``engine`` (a RandomForestRegressor with ``params`` by
+    default, see model_engines.py) on every walk-forward fold.
+
+    Returns per-fold MAE for each target plus the mean over folds. ``n_jobs``
+    is the number of worker processes (None = one per CPU, 1 = in-process).
+    """
+    X = np.asarray(X, dtype=float)
+    Y = np.asarray(Y, dtype=float)
+    folds = expanding_window_folds(session_ids, max_folds)
+    # one tree-building thread per worker; the pool provides the parallelism
+    params = dict(params, n_jobs=1)
+    jobs = [(k, X[tr], Y[tr], X[vl], Y[vl], params, engine) for k, (tr, vl) in enumerate(folds)]
+
+    n_workers = min(len(jobs), n_jobs or os.cpu_count() or 1)
+    results = None
+    if n_workers > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=n_workers) as pool:
+                results = list(pool.map(_fit_and_score, *zip(*jobs)))
+        except (OSError, ImportError, NotImplementedError, RuntimeError) as e:
+            # e.g. Android builds without working semaphores: fall back to serial
+            log.warning("process pool unavailable -> %r", e)
+    if results is None:
+        results = [_fit_and_score(*job) for job in jobs]
+
+    session_ids = np.asarray(session_ids)
+    for r, (_, vl) in zip(results, folds):
+        r["val_session"] = str(session_ids[vl[0]])
+        r["mae"] = dict(zip(target_names, r["mae"]))
+    mean_mae = {t: float(np.mean([r["mae"][t] for r in results])) if results else float("nan")
+                for t in target_names}
+    return {"engine": engine, "folds": results, "mean_mae": mean_mae}
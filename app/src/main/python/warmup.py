@@ -0,0 +1,142 @@
+import json
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import metrics
+
+# Background warm-up for the prediction modules, started at app launch:
+#
+#     warmup.warmup()            # returns at once; loading runs on daemon threads
+#     warmup.status_json()       # {"state": "loading", "progress": 0.4, ...}
+#
+# The first qualifying.main / strategy.main otherwise pays for the import, the
+# data load and the model load (or retrain) on the request path. The warm-up
+# runs those stages ahead of time, one thread per module in WARMUP_MODULES,
+# and fills the qualifying result cache for every track.
+#
+# qualifying._load_or_train_models and strategy.get_predictor call wait() first,
+# so a prediction requested mid warm-up blocks on the in-flight load instead of
+# starting a second one. Each module has its own thread and event, so a
+# strategy request never waits for the qualifying stages (or the reverse).
+# Without a warm-up, wait() returns immediately.
+
+log = logging.getLogger(__name__)
+
+WARMUP_MODULES = ("qualifying", "strategy")
+
+_lock = threading.Lock()
+_threads: Dict[str, threading.Thread] = {}
+_ready: Dict[str, threading.Event] = {}
+_state: Dict[str, Any] = {"state": "idle", "stage": None, "done": 0, "total": 0,
+                          "started": None, "finished": None, "stages": {}, "errors": {}}
+
+
+def _qualifying_stages() -> List[Tuple[str, Callable[[], Any]]]:
+    import qualifying
+    return [
+        ("qualifying.data", lambda: qualifying.get_frame("curr")),
+        ("qualifying.models", qualifying._load_or_train_models),
+        ("qualifying.predictions", qualifying.predict_all_tracks),
+    ]
+
+
+def _strategy_stages() -> List[Tuple[str, Callable[[], Any]]]:
+    import strategy
+    return [("strategy.model", strategy.get_predictor)]
+
+
+_STAGES = {"qualifying": _qualifying_stages, "strategy": _strategy_stages}
+# imports count as a stage of their own, so progress starts moving straight away
+_STAGE_COUNTS = {"qualifying": 4, "strategy": 2}
+
+
+def _run(module: str) -> None:
+    try:
+        stages: List[Tuple[str, Callable[[], Any]]] = []
+        _run_stage(f"{module}.import", lambda: stages.extend(_STAGES[module]()))
+        for name, fn in stages:
+            _run_stage(name, fn)
+    except Exception as e:
+        # the request path will try again (and surface the error) on its own
+        with _lock:
+            _state["errors"][module] = repr(e)
+        log.warning("warm-up of %s failed -> %r", module, e)
+    finally:
+        _ready[module].set()
+        with _lock:
+            if all(event.is_set() for event in _ready.values()):
+                _state["state"] = "failed" if _state["errors"] else "ready"
+                _state["stage"] = None
+                _state["finished"] = time.time()
+
+
+def _run_stage(name: str, fn: Callable[[], Any]) -> None:
+    with _lock:
+        _state["stage"] = name
+    start = time.perf_counter()
+    with metrics.span(f"warmup.{name}"):
+        fn()
+    with _lock:
+        _state["stages"][name] = time.perf_counter() - start
+        _state["done"] += 1
+
+
+def warmup(modules: Tuple[str, ...] = WARMUP_MODULES) -> str:
+    """
+    Start loading ``modules``, each on its own background thread (once per
+    process), and return the status as JSON. Calling it again only reports
+    the status.
+    """
+    unknown = [m for m in modules if m not in _STAGES]
+    if unknown:
+        raise ValueError(f"Unknown warm-up modules {unknown}; expected some of {WARMUP_MODULES}.")
+    with _lock:
+        if not _threads:
+            for module in modules:
+                _ready[module] = threading.Event()
+            _state.update(state="loading", total=sum(_STAGE_COUNTS[m] for m in modules),
+                          started=time.time())
+            for module in modules:
+                _threads[module] = threading.Thread(target=_run, args=(module,),
+                                                    name=f"slipstream-warmup-{module}", daemon=True)
+            for thread in _threads.values():
+                thread.start()
+    return status_json()
+
+
+def wait(module: str, timeout: Optional[float] = None) -> bool:
+    """
+    Block until the warm-up of ``module`` has finished, if one was started.
+    Returns False only on timeout. A no-op on that module's warm-up thread.
+    """
+    event = _ready.get(module)
+    if event is None or threading.current_thread() is _threads.get(module):
+        return True
+    if not event.is_set():
+        metrics.count(f"warmup.waits.{module}")
+        with metrics.span(f"warmup.wait.{module}"):
+            return event.wait(timeout)
+    return True
+
+
+def is_ready(module: Optional[str] = None) -> bool:
+    """True once ``module`` (or, by default, every warmed module) has finished loading."""
+    if module is not None:
+        event = _ready.get(module)
+        return event is not None and event.is_set()
+    return _state["state"] in ("ready", "failed")
+
+
+def status() -> Dict[str, Any]:
+    """State ("idle", "loading", "ready" or "failed"), progress 0..1 and per-stage seconds."""
+    with _lock:
+        out = dict(_state, stages=dict(_state["stages"]), errors=dict(_state["errors"]))
+    out["progress"] = out["done"] / out["total"] if out["total"] else 0.0
+    out["ready"] = {m: e.is_set() for m, e in _ready.items()}
+    return out
+
+
+def status_json() -> str:
+    return json.dumps(status())
@@ -0,0 +1,139 @@
+"""
+Size and load time of the saved models: joblib files vs the compiled artifacts, as JSON.
+
+    python benchmarks/artifact_report.py [--repeat 5] [--output report.json]
+
+For every model in saved_models/ this compares:
+
+    joblib          the pickled scikit-learn objects (joblib.load)
+    artifact_mmap   the compiled artifact, memory-mapped (forest_engine.load)
+    artifact_read   the same file loaded with a single read()
+    artifact_zlib   the artifact re-saved with compress=True (written to a temp dir)
+
+Memory-mapped loads only fault pages in when they are used, so each artifact
+row also reports "load_touch_s": load plus one pass over every array. The
+scikit-learn import is excluded from the joblib timings. The shipped files are
+only read (run a prediction first so older .npz artifacts get converted); the
+compressed copies live in a temp directory.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+SRC = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app", "src", "main", "python"))
+sys.path.insert(0, SRC)
+import forest_engine  # noqa: E402
+import qualifying  # noqa: E402
+import strategy  # noqa: E402
+
+MODELS = {
+    "scaler": (qualifying.SCALER_FILE, qualifying.COMPILED_SCALER_FILE),
+    "base_rf": (qualifying.BASE_RF_FILE, qualifying.COMPILED_BASE_RF_FILE),
+    "extra_models": (qualifying.EXTRA_FILE, qualifying.COMPILED_EXTRA_FILE),
+    "strategy": (strategy.MODEL_FILE, strategy.COMPILED_MODEL_FILE),
+}
+
+
+def best_of(fn, repeat):
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - start)
+    return {"best_s": min(runs), "median_s": statistics.median(runs)}
+
+
+def _arrays(obj):
+    """Every array in a compiled object tree."""
+    if isinstance(obj, np.ndarray):
+        yield obj
+    elif isinstance(obj, dict):
+        for v in obj.values():
+            yield from _arrays(v)
+    elif isinstance(obj, list):
+        for v in obj:
+            yield from _arrays(v)
+    elif hasattr(obj, "_fields"):
+        for f in obj._fields:
+            yield from _arrays(getattr(obj, f))
+
+
+def _touch(obj):
+    """Read one value per page of every array (forces memory-mapped pages in)."""
+    return sum(a.view(np.uint8).ravel()[::4096].sum() for a in _arrays(obj) if a.size)
+
+
+def report_model(name, source, artifact, workdir, repeat):
+    import joblib
+
+    out = {}
+    if os.path.exists(source):
+        joblib.load(source)  # keep the one-off scikit-learn import out of the timing
+        out["joblib"] = dict(size_bytes=os.path.getsize(source),
+                             **best_of(lambda: joblib.load(source), max(1, repeat // 2)))
+    if not os.path.exists(artifact):
+        return out
+
+    def load_touch(**kw):
+        return lambda: _touch(forest_engine.load(artifact, **kw))
+
+    size = os.path.getsize(artifact)
+    out["artifact_mmap"] = dict(size_bytes=size, **best_of(lambda: forest_engine.load(artifact), repeat),
+                                load_touch_s=best_of(load_touch(), repeat)["best_s"])
+    out["artifact_read"] = dict(size_bytes=size,
+                                **best_of(lambda: forest_engine.load(artifact, use_mmap=False), repeat),
+                                load_touch_s=best_of(load_touch(use_mmap=False), repeat)["best_s"])
+
+    packed = os.path.join(workdir, os.path.basename(artifact))
+    forest_engine.save(packed, forest_engine.load(artifact), compress=True)
+    out["artifact_zlib"] = dict(size_bytes=os.path.getsize(packed),
+                                **best_of(lambda: forest_engine.load(packed), repeat),
+                                load_touch_s=best_of(lambda: _touch(forest_engine.load(packed)), repeat)["best_s"])
+    out["manifest"] = forest_engine.manifest_entry(artifact)
+    return out
+
+
+def print_table(results):
+    print(f"{'model':<13} {'variant':<14} {'MB':>8} {'load ms':>9} {'+touch ms':>10}")
+    for name, variants in results["models"].items():
+        for variant, row in variants.items():
+            if variant == "manifest":
+                continue
+            touch = row.get("load_touch_s")
+            print(f"{name:<13} {variant:<14} {row['size_bytes'] / 1e6:>8.2f} {row['best_s'] * 1e3:>9.1f} "
+                  f"{'' if touch is None else f'{touch * 1e3:.1f}':>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="write the JSON report here (default: stdout)")
+    args = parser.parse_args()
+
+    results = {"format": forest_engine.FORMAT_VERSION, "libraries": forest_engine.library_versions(),
+               "models": {}}
+    workdir = tempfile.mkdtemp(prefix="slipstream-artifacts-")
+    try:
+        for name, (source, artifact) in MODELS.items():
+            results["models"][name] = report_model(name, source, artifact, workdir, args.repeat)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    document = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as fh:
+            fh.write(document + "\n")
+    else:
+        print(document)
+    print_table(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+History comparisons: history_cube queries against pandas filters over all_data, as JSON.
+
+    python benchmarks/bench_history_cube.py [--scales 1 10] [--repeat 5] [--output report.json]
+
+Scale 1 is the real hist + curr data; larger scales use synthetic_data's
+frames. For every scale it reports building the cube, its snapshot size and
+load time, and folding one weekend (20 new sessions) into it against a full
+rebuild. Then each query is timed both ways:
+
+    driver_at_track    one driver's sessions at a track
+    field_at_track     every session at a track
+    team_season        one team's sessions in one year
+    driver_by_year     one driver at a track, per year
+    drivers_at_track   every driver at a track, per driver (history_cube.main)
+    compare            driver vs their team vs the field at a track
+
+The pandas side gets the measure columns (lap time, deltas) precomputed, so
+only the filtering and aggregation is compared. "max_abs_diff" is the largest
+difference between the two means. Times are per call, in microseconds.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import timeit
+from contextlib import redirect_stdout
+
+import numpy as np
+import pandas as pd
+
+SRC = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app", "src", "main", "python"))
+sys.path.insert(0, SRC)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import history_cube  # noqa: E402
+import qualifying  # noqa: E402
+import synthetic_data  # noqa: E402
+from history_cube import HistoryCube  # noqa: E402
+
+TRACK, DRIVER, TEAM = 2, 19, 7
+WEEKEND_ROWS = 20
+
+
+def per_call_us(fn, repeat):
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number * 1e6
+
+
+def session_rows(scale, seed):
+    if scale == 1:
+        with redirect_stdout(sys.stderr):
+            return qualifying.get_frame("all_data")
+    hist, curr = synthetic_data.qualifying_frames(scale, seed)
+    return qualifying.preprocess_data(pd.concat([hist, curr], ignore_index=True))
+
+
+def measure_frame(rows):
+    """What the pandas side scans: the keys plus every cube measure as a column."""
+    frame = pd.DataFrame(history_cube.measure_values(rows), columns=history_cube.MEASURES)
+    for col in history_cube.KEY_COLS:
+        frame[col] = rows[col].to_numpy()
+    return frame
+
+
+def pandas_cases(frame, measures):
+    def agg(sub):
+        return sub[measures].agg(["count", "mean", "std", "min", "max"])
+
+    def by(sub, key):
+        return sub.groupby(key)[measures].agg(["count", "mean", "std", "min", "max"])
+
+    def compare():
+        mine = frame[frame.Driver == DRIVER]
+        team = int(mine.loc[mine.Year.idxmax(), "Team"])
+        at_track = frame[frame.Track == TRACK]
+        return [agg(at_track[at_track.Driver == DRIVER]), agg(at_track[at_track.Team == team]), agg(at_track)]
+
+    return {
+        "driver_at_track": lambda: agg(frame[(frame.Track == TRACK) & (frame.Driver == DRIVER)]),
+        "field_at_track": lambda: agg(frame[frame.Track == TRACK]),
+        "team_season": lambda: agg(frame[(frame.Team == TEAM) & (frame.Year == frame.Year.max())]),
+        "driver_by_year": lambda: by(frame[(frame.Track == TRACK) & (frame.Driver == DRIVER)], "Year"),
+        "drivers_at_track": lambda: by(frame[frame.Track == TRACK], "Driver"),
+        "compare": compare,
+    }
+
+
+def cube_cases(cube, measures, year):
+    return {
+        "driver_at_track": lambda: cube.query(measures, track=TRACK, driver=DRIVER),
+        "field_at_track": lambda: cube.query(measures, track=TRACK),
+        "team_season": lambda: cube.query(measures, team=TEAM, year=year),
+        "driver_by_year": lambda: cube.breakdown("year", measures, track=TRACK, driver=DRIVER),
+        "drivers_at_track": lambda: cube.breakdown("driver", measures, track=TRACK),
+        "compare": lambda: cube.compare(TRACK, DRIVER, measures),
+    }
+
+
+def max_abs_diff(pandas_result, cube_result):
+    if isinstance(pandas_result, list):
+        return max(max_abs_diff(p, cube_result[k]) for p, k in zip(pandas_result, ("driver", "team", "field")))
+    if isinstance(pandas_result.columns, pd.MultiIndex):
+        expected = pandas_result.xs("mean", axis=1, level=1).to_numpy()
+    else:
+        expected = pandas_result.loc["mean"].to_numpy()
+    diff = np.abs(expected - cube_result["mean"])
+    return float(np.nanmax(diff)) if np.isfinite(diff).any() else 0.0
+
+
+def bench_scale(scale, args):
+    rows = session_rows(scale, args.seed)
+    frame = measure_frame(rows)
+    measures = history_cube.MEASURES
+    out = {"sessions": len(rows)}
+
+    start = time.perf_counter()
+    cube = HistoryCube.from_frame(rows)
+    out["build_s"] = time.perf_counter() - start
+    out["cells"] = len(cube)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "history_cube.npz")
+        cube.save(path)
+        out["snapshot_bytes"] = os.path.getsize(path)
+        out["load_us"] = per_call_us(lambda: HistoryCube.load(path), args.repeat)
+    weekend = rows.tail(WEEKEND_ROWS)
+    out["update_weekend_us"] = per_call_us(lambda: cube.with_rows(weekend), args.repeat)
+    out["rebuild_us"] = per_call_us(lambda: HistoryCube.from_frame(pd.concat([rows, weekend])), args.repeat)
+
+    year = int(frame.Year.max())
+    by_pandas = pandas_cases(frame, measures)
+    queries = {}
+    for name, query in cube_cases(cube, measures, year).items():
+        queries[name] = {"pandas_us": per_call_us(by_pandas[name], args.repeat),
+                         "cube_us": per_call_us(query, args.repeat),
+                         "max_abs_diff": max_abs_diff(by_pandas[name](), query())}
+    out["queries"] = queries
+    return out
+
+
+def print_table(results):
+    for scale, r in results.items():
+        print(f"scale {scale}: {r['sessions']} sessions -> {r['cells']} cells, build {r['build_s'] * 1e3:.1f} ms, "
+              f"snapshot {r['snapshot_bytes'] / 1e3:.0f} KB, load {r['load_us'] / 1e3:.2f} ms, "
+              f"weekend update {r['update_weekend_us'] / 1e3:.2f} ms vs rebuild {r['rebuild_us'] / 1e3:.2f} ms")
+        print(f"  {'query':<18} {'pandas us':>10} {'cube us':>9} {'speedup':>8} {'max diff':>9}")
+        for name, q in r["queries"].items():
+            print(f"  {name:<18} {q['pandas_us']:>10.1f} {q['cube_us']:>9.1f} "
+                  f"{q['pandas_us'] / q['cube_us']:>8.1f} {q['max_abs_diff']:>9.1e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scales", type=int, nargs="*", default=[1, 10])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here (default: stdout)")
+    args = parser.parse_args()
+
+    results = {str(scale): bench_scale(scale, args) for scale in args.scales}
+    document = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as fh:
+            fh.write(document + "\n")
+    else:
+        print(document)
+    print_table(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Speed and peak memory of qualifying.preprocess_data against the previous
+row-wise/merge implementation, on the real workbooks and on copies scaled
+up 10x and 100x.
+
+    python benchmarks/bench_preprocess.py [--scales 1 10 100] [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app", "src", "main", "python")))
+import qualifying  # noqa: E402
+
+
+def legacy_preprocess_data(df):
+    """preprocess_data as it was before vectorisation (kept as the reference)."""
+    track_sector_baselines = qualifying.track_sector_baselines
+    df = df.copy()
+    df['Baseline_S1'] = df['Track'].map(lambda t: track_sector_baselines[t][0])
+    df['Baseline_S2'] = df['Track'].map(lambda t: track_sector_baselines[t][1])
+    df['Baseline_S3'] = df['Track'].map(lambda t: track_sector_baselines[t][2])
+    df['Delta_S1'] = df['Sector1Time'] - df['Baseline_S1']
+    df['Delta_S2'] = df['Sector2Time'] - df['Baseline_S2']
+    df['Delta_S3'] = df['Sector3Time'] - df['Baseline_S3']
+    for sec in ['1', '2', '3']:
+        avg = (df.groupby(['Year', 'Team'])[f'Sector{sec}Time']
+               .mean()
+               .reset_index()
+               .rename(columns={f'Sector{sec}Time': f'TeamAvg_S{sec}'}))
+        df = df.merge(avg, on=['Year', 'Team'], how='left')
+    for col in ['Delta_S1', 'Delta_S2', 'Delta_S3', 'TeamAvg_S1', 'TeamAvg_S2', 'TeamAvg_S3']:
+        df[col] = df[col].fillna(df[col].mean())
+    return df
+
+
+def scale_rows(df, factor):
+    """Repeat the rows ``factor`` times, shifting Year so team-year groups grow too."""
+    if factor == 1:
+        return df.reset_index(drop=True)
+    copies = []
+    for i in range(factor):
+        part = df.copy()
+        part['Year'] = part['Year'] + 100 * i
+        copies.append(part)
+    return pd.concat(copies, ignore_index=True)
+
+
+def measure(fn, df, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(df)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    fn(df)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    raw = pd.concat([pd.read_excel(qualifying.HIST_XLSX), pd.read_excel(qualifying.CURR_XLSX)],
+                    ignore_index=True)
+
+    print(f"{'scale':>6} {'rows':>9} {'legacy ms':>10} {'new ms':>9} {'speedup':>8} "
+          f"{'legacy MiB':>11} {'new MiB':>8}")
+    for factor in args.scales:
+        df = scale_rows(raw, factor)
+        pd.testing.assert_frame_equal(qualifying.preprocess_data(df), legacy_preprocess_data(df))
+        old_t, old_mem = measure(legacy_preprocess_data, df, args.repeat)
+        new_t, new_mem = measure(qualifying.preprocess_data, df, args.repeat)
+        print(f"{factor:>5}x {len(df):>9} {old_t * 1e3:>10.1f} {new_t * 1e3:>9.1f} {old_t / new_t:>7.1f}x "
+              f"{old_mem / 2**20:>11.1f} {new_mem / 2**20:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
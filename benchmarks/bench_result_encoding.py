@@ -0,0 +1,130 @@
+"""
+Payload size and encode + decode time of the prediction results: CSV vs result_codec binary, as JSON.
+
+    python benchmarks/bench_result_encoding.py [--repeat 7] [--output report.json]
+
+Cases, all computed once up front so only serialisation is timed:
+
+    qualifying_track       qualifying.main's table (one track, 20 rows)
+    qualifying_all_tracks  every track in one payload (batch_binary_main; the
+                           CSV side is the same table with a Track column)
+    strategy_single        strategy.main's one-row result
+    strategy_grid          grid_main's 20 start positions
+
+Encodings: "csv" (what the app receives today), "binary" (result_codec,
+float64) and "binary_f32" (float32 fields). "decode" is what the reader has to
+do before it can use the values: for CSV, split every line and convert the
+numeric cells (what the Kotlin side does with opencsv and toDouble()); for
+binary, decode() plus reading every field out of the records. "view" is
+decode() alone, the zero-copy part. Times are per call, in microseconds.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import timeit
+from contextlib import redirect_stdout
+
+import numpy as np
+import pandas as pd
+
+SRC = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app", "src", "main", "python"))
+sys.path.insert(0, SRC)
+import qualifying  # noqa: E402
+import result_codec  # noqa: E402
+import strategy  # noqa: E402
+
+TRACK = 2
+SCENARIO = (5, 3, False, 27, 38)
+
+
+def per_call_us(fn, repeat):
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number * 1e6
+
+
+def decode_csv(text):
+    rows = list(csv.reader(io.StringIO(text)))
+    out = []
+    for row in rows[1:]:
+        values = []
+        for cell in row:
+            try:
+                values.append(float(cell))
+            except ValueError:
+                values.append(cell)
+        out.append(values)
+    return out
+
+
+def decode_binary(payload):
+    records, _ = result_codec.decode(payload)
+    return [records[name].tolist() for name in records.dtype.names]
+
+
+def cases():
+    with redirect_stdout(sys.stderr):
+        grids = qualifying.predict_all_tracks()
+        row = strategy._result_row(strategy.get_predictor().predict_strategy(*SCENARIO))
+        grid = strategy._grid_frame(SCENARIO[0], SCENARIO[2], SCENARIO[3], SCENARIO[4])
+    batch = pd.concat([df.assign(Track=t)[["Track"] + list(df.columns)] for t, df in grids.items()],
+                      ignore_index=True)
+    return {
+        "qualifying_track": (lambda: grids[TRACK].to_csv(index=False),
+                             lambda f: result_codec.encode(grids[TRACK], float_dtype=f)),
+        "qualifying_all_tracks": (lambda: batch.to_csv(index=False),
+                                  lambda f: result_codec.encode_batch(grids, float_dtype=f)),
+        # strategy.main builds a one-row DataFrame for the CSV; binary_main encodes the dict
+        "strategy_single": (lambda: pd.DataFrame([row]).to_csv(index=False),
+                            lambda f: result_codec.encode({k: [v] for k, v in row.items()}, float_dtype=f)),
+        "strategy_grid": (lambda: grid.to_csv(index=False),
+                          lambda f: result_codec.encode(grid, float_dtype=f)),
+    }
+
+
+def bench_case(to_csv, to_binary, repeat):
+    text = to_csv()
+    out = {"csv": {"rows": len(text.splitlines()) - 1, "bytes": len(text.encode()),
+                   "encode_us": per_call_us(to_csv, repeat),
+                   "decode_us": per_call_us(lambda: decode_csv(text), repeat)}}
+    for name, float_dtype in (("binary", np.float64), ("binary_f32", np.float32)):
+        payload = to_binary(float_dtype)
+        out[name] = {"bytes": len(payload),
+                     "encode_us": per_call_us(lambda: to_binary(float_dtype), repeat),
+                     "decode_us": per_call_us(lambda: decode_binary(payload), repeat),
+                     "view_us": per_call_us(lambda: result_codec.decode(payload), repeat)}
+    return out
+
+
+def print_table(results):
+    print(f"{'case':<22} {'encoding':<11} {'bytes':>8} {'encode us':>10} {'decode us':>10} {'total x':>8}")
+    for case, encodings in results.items():
+        base = encodings["csv"]["encode_us"] + encodings["csv"]["decode_us"]
+        for name, row in encodings.items():
+            total = row["encode_us"] + row["decode_us"]
+            print(f"{case:<22} {name:<11} {row['bytes']:>8} {row['encode_us']:>10.1f} "
+                  f"{row['decode_us']:>10.1f} {base / total:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--output", help="write the JSON report here (default: stdout)")
+    args = parser.parse_args()
+
+    results = {case: bench_case(to_csv, to_binary, args.repeat)
+               for case, (to_csv, to_binary) in cases().items()}
+    document = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as fh:
+            fh.write(document + "\n")
+    else:
+        print(document)
+    print_table(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""
+Timings for every stage of qualifying.py and strategy.py on synthetic data at 1x/10x/100x rows, as JSON.
+
+    python benchmarks/bench_suite.py [--scales 1 10 100] [--max-train-scale 1]
+                                     [--repeat 5] [--output results.json]
+                                     [--compare previous.json]
+
+Each scale runs in its own temporary model directory with synthetic frames
+(benchmarks/synthetic_data.py) injected in place of the workbooks, so the
+shipped saved_models/ are never touched. Measured separately:
+
+    qualifying.preprocess_data            raw historical + current rows
+    qualifying.fit_models                 walk-forward + final models
+    qualifying._load_or_train_models      cold (empty registry) and warm
+    qualifying.predict_qualifying_results cold (all tracks) and warm (cached)
+    strategy.train_model                  --strategy-profile
+    strategy.predict_strategy             cold (fresh predictor) and warm
+
+Training is slow at large scales, so fit_models and train_model only run up to
+--max-train-scale. Larger scales reuse the largest trained models and still
+time preprocessing, loading and prediction. With real artifacts present, a
+"cold_start" section also times a fresh interpreter from import to the first
+result for each module. Pass --compare with an earlier JSON file to print the
+ratio of every timing against that run.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager, redirect_stdout
+
+import numpy as np
+import pandas as pd
+
+SRC = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app", "src", "main", "python"))
+sys.path.insert(0, SRC)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import qualifying  # noqa: E402
+import strategy  # noqa: E402
+import synthetic_data  # noqa: E402
+from model_registry import REGISTRY  # noqa: E402
+
+QUALIFYING_PATHS = ("SCALER_FILE", "BASE_RF_FILE", "EXTRA_FILE", "METRICS_FILE",
+                    "COMPILED_SCALER_FILE", "COMPILED_BASE_RF_FILE", "COMPILED_EXTRA_FILE")
+STRATEGY_PATHS = ("MODEL_FILE", "COMPILED_MODEL_FILE", "SEARCH_CACHE_FILE")
+BENCH_TRACK = 2
+BENCH_SCENARIO = dict(track=5, start_position=3, is_wet=False, air_temp=27, track_temp=38)
+
+
+def timed(fn, repeat=1):
+    """Best and median wall time of ``repeat`` calls, in seconds."""
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - start)
+    return {"best_s": min(runs), "median_s": statistics.median(runs), "runs": repeat}
+
+
+@contextmanager
+def sandbox(model_dir, hist, curr):
+    """Point both modules at ``model_dir`` and the given preprocessed frames; restore afterwards."""
+    saved_q = {name: getattr(qualifying, name) for name in QUALIFYING_PATHS}
+    saved_s = {name: getattr(strategy, name) for name in STRATEGY_PATHS}
+    saved_frames = dict(qualifying._frames)
+    try:
+        for name, path in saved_q.items():
+            setattr(qualifying, name, os.path.join(model_dir, os.path.relpath(path, qualifying.MODEL_DIR)))
+        for name, path in saved_s.items():
+            setattr(strategy, name, os.path.join(model_dir, os.path.relpath(path, strategy.MODEL_DIR)))
+        qualifying._frames.clear()
+        qualifying._frames.update(hist=hist, curr=curr)
+        reset_caches()
+        yield
+    finally:
+        for name, path in saved_q.items():
+            setattr(qualifying, name, path)
+        for name, path in saved_s.items():
+            setattr(strategy, name, path)
+        qualifying._frames.clear()
+        qualifying._frames.update(saved_frames)
+        reset_caches()
+
+
+def reset_caches():
+    REGISTRY.invalidate()
+    qualifying._result_cache.update(version=None, results={})
+    strategy._predictor = None
+
+
+def bench_scale(scale, train, model_dir, args):
+    hist_raw, curr_raw = synthetic_data.qualifying_frames(scale, args.seed)
+    strategy_raw = synthetic_data.strategy_frame(scale, args.seed)
+    raw = pd.concat([hist_raw, curr_raw], ignore_index=True)
+    out = {"rows": {"historical": len(hist_raw), "current": len(curr_raw), "strategy": len(strategy_raw)},
+           "trained": train}
+
+    out["preprocess_data"] = timed(lambda: qualifying.preprocess_data(raw), args.repeat)
+    hist = qualifying.preprocess_data(hist_raw)
+    curr = qualifying.preprocess_data(curr_raw)
+
+    os.makedirs(model_dir, exist_ok=True)
+    with sandbox(model_dir, hist, curr):
+        if train:
+            out["fit_models"] = timed(lambda: qualifying.fit_models())
+            predictor = strategy.F1StrategyPredictor()
+            out["train_model"] = timed(lambda: predictor.train_model(args.strategy_profile, data=strategy_raw))
+            out["train_model"]["profile"] = args.strategy_profile
+            predictor.save_model(strategy.MODEL_FILE)
+
+        reset_caches()
+        out["load_models_cold"] = timed(qualifying._load_or_train_models)
+        out["load_models_warm"] = timed(qualifying._load_or_train_models, args.repeat)
+
+        out["predict_qualifying_cold"] = timed(lambda: qualifying.predict_qualifying_results(BENCH_TRACK))
+        out["predict_qualifying_warm"] = timed(
+            lambda: qualifying.predict_qualifying_results(BENCH_TRACK), args.repeat)
+
+        reset_caches()
+        out["predict_strategy_cold"] = timed(lambda: strategy.get_predictor().predict_strategy(**BENCH_SCENARIO))
+        out["predict_strategy_warm"] = timed(
+            lambda: strategy.get_predictor().predict_strategy(**BENCH_SCENARIO), args.repeat)
+    return out
+
+
+def cold_start():
+    """Fresh interpreter: import + first result, on the real workbooks and shipped models."""
+    if not (os.path.exists(qualifying.BASE_RF_FILE) and os.path.exists(strategy.MODEL_FILE)):
+        return None
+    snippets = {
+        "qualifying": "import qualifying; qualifying.main(%d)" % BENCH_TRACK,
+        "strategy": "import strategy; strategy.main(%(track)d, %(start_position)d, %(is_wet)s, "
+                    "%(air_temp)d, %(track_temp)d)" % BENCH_SCENARIO,
+    }
+    results = {}
+    for name, code in snippets.items():
+        timer = ("import time, sys; sys.stdout = open('/dev/null', 'w'); t = time.perf_counter(); "
+                 f"{code}; sys.stderr.write(repr(time.perf_counter() - t))")
+        proc = subprocess.run([sys.executable, "-c", timer], cwd=SRC, capture_output=True, text=True)
+        results[name] = {"first_result_s": float(proc.stderr.strip().splitlines()[-1])}
+    return results
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=SRC,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def _flatten(results):
+    """{(section, stage): best_s} for every timing in a results document."""
+    flat = {}
+    for scale, stages in results.get("scales", {}).items():
+        for stage, value in stages.items():
+            if isinstance(value, dict) and "best_s" in value:
+                flat[(f"x{scale}", stage)] = value["best_s"]
+    for module, value in (results.get("cold_start") or {}).items():
+        flat[("cold_start", module)] = value["first_result_s"]
+    return flat
+
+
+def print_table(results, previous=None):
+    current = _flatten(results)
+    before = _flatten(previous) if previous else {}
+    header = f"{'section':<11} {'stage':<26} {'best ms':>10}"
+    print(header + (f" {'before ms':>10} {'ratio':>7}" if previous else ""))
+    for key, seconds in current.items():
+        line = f"{key[0]:<11} {key[1]:<26} {seconds * 1e3:>10.1f}"
+        if key in before:
+            line += f" {before[key] * 1e3:>10.1f} {seconds / before[key]:>7.2f}"
+        print(line)
+
+
+def run_scales(results, workdir, args):
+    trained_dir = None
+    for scale in sorted(args.scales):
+        model_dir = os.path.join(workdir, f"x{scale}")
+        train = trained_dir is None or scale <= args.max_train_scale
+        if not train:
+            shutil.copytree(trained_dir, model_dir)
+        print(f"[BENCH] scale x{scale} ({'training' if train else 'reusing models'})")
+        results["scales"][str(scale)] = bench_scale(scale, train, model_dir, args)
+        if train:
+            trained_dir = model_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--max-train-scale", type=int, default=1,
+                        help="largest scale fit_models/train_model run at")
+    parser.add_argument("--strategy-profile", choices=strategy.TRAINING_PROFILES, default="fast")
+    parser.add_argument("--repeat", type=int, default=5, help="repeats for the cheap stages")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-cold-start", action="store_true")
+    parser.add_argument("--output", help="write the JSON results here (default: stdout)")
+    parser.add_argument("--compare", help="earlier JSON results to compare against")
+    args = parser.parse_args()
+
+    results = {"environment": environment(), "scales": {}}
+    workdir = tempfile.mkdtemp(prefix="slipstream-bench-")
+    try:
+        # anything printed while training (e.g. by the libraries) goes to stderr so stdout stays valid JSON
+        with redirect_stdout(sys.stderr):
+            run_scales(results, workdir, args)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    if not args.no_cold_start:
+        results["cold_start"] = cold_start()
+
+    document = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as fh:
+            fh.write(document + "\n")
+    else:
+        print(document)
+
+    previous = None
+    if args.compare:
+        with open(args.compare) as fh:
+            previous = json.load(fh)
+    print_table(results, previous)
+
+
+if __name__ == "__main__":
+    main()
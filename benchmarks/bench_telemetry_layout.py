@@ -0,0 +1,118 @@
+"""
+Compare the per-column and grouped telemetry layouts of qualifying.py:
+training time, artifact size, load time, predict latency (single track and
+all tracks) and hold-out MAE per telemetry column.
+
+Accuracy is scored walk-forward: the most recent sessions are cut into
+--folds windows of --holdout-sessions each, both layouts are fitted on every
+session before a window and scored on it, and the absolute errors are pooled
+over the windows. Fewer windows are too noisy to gate on: over 3 windows one
+throttle column swung to +11% against +0% over the default 6.
+The script exits non-zero when the grouped layout's pooled MAE on any column
+is worse than per-column by more than --tolerance (relative). Size, load and
+latency are measured on the models of the last window.
+
+    python benchmarks/bench_telemetry_layout.py [--holdout-sessions 5] [--folds 6] [--tolerance 0.10]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import joblib
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app", "src", "main", "python")))
+import qualifying  # noqa: E402
+from sklearn.preprocessing import StandardScaler  # noqa: E402
+from telemetry_models import fit_telemetry_models, predict_telemetry  # noqa: E402
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--holdout-sessions", type=int, default=5, help="sessions per window")
+    parser.add_argument("--folds", type=int, default=6, help="hold-out windows")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    data = qualifying.all_data
+    session = (data['Year'].astype(str) + "_" + data['RaceNo'].astype(str)).values
+    order = list(dict.fromkeys(session))
+    windows = [order[len(order) - (k + 1) * args.holdout_sessions:len(order) - k * args.holdout_sessions]
+               for k in reversed(range(args.folds))]
+
+    errors = {layout: {} for layout in ("per_column", "grouped")}
+    report = {}
+    tmp = tempfile.mkdtemp()
+    for window in windows:
+        test = np.isin(session, window)
+        train_df = data[np.isin(session, order[:order.index(window[0])])]
+        test_df = data[test]
+        scaler = StandardScaler().fit(train_df[qualifying.FEATURES])
+        Xs_train = scaler.transform(train_df[qualifying.FEATURES])
+        Xs_test = scaler.transform(test_df[qualifying.FEATURES])
+
+        for layout in errors:
+            start = time.perf_counter()
+            models = fit_telemetry_models(Xs_train, train_df, qualifying.EXTRA_COLS, layout=layout)
+            fit_s = time.perf_counter() - start
+            preds = predict_telemetry(models, Xs_test)
+            for c in preds:
+                err = np.abs(preds[c] - test_df[c].to_numpy(dtype=float))
+                total, n = errors[layout].get(c, (0.0, 0))
+                errors[layout][c] = (total + np.nansum(err), n + int(np.sum(~np.isnan(err))))
+            report[layout] = {"models": models, "fit_s": fit_s, "Xs_test": Xs_test}
+
+    n_drivers = qualifying.curr['Driver'].nunique()
+    for layout, r in report.items():
+        models, Xs_test = r.pop("models"), r.pop("Xs_test")
+        X_one = np.resize(Xs_test, (n_drivers, Xs_test.shape[1]))
+        X_all = np.resize(Xs_test, (n_drivers * len(qualifying.track_mapping), Xs_test.shape[1]))
+        path = os.path.join(tmp, f"{layout}.joblib")
+        joblib.dump(models, path)
+        r.update(
+            models=len(models),
+            size_mb=os.path.getsize(path) / 2**20,
+            load_s=best_of(lambda: joblib.load(path), args.repeat),
+            predict_one_ms=best_of(lambda: predict_telemetry(models, X_one), args.repeat) * 1e3,
+            predict_all_ms=best_of(lambda: predict_telemetry(models, X_all), args.repeat) * 1e3,
+            mae={c: total / n for c, (total, n) in errors[layout].items() if n},
+            blocks=sorted(k for k, m in models.items() if hasattr(m, "columns")),
+        )
+
+    print(f"{'layout':<11} {'models':>6} {'fit s':>7} {'size MB':>8} {'load s':>7} "
+          f"{'1-track ms':>10} {'all ms':>8}")
+    for layout, r in report.items():
+        print(f"{layout:<11} {r['models']:>6} {r['fit_s']:>7.2f} {r['size_mb']:>8.1f} {r['load_s']:>7.3f} "
+              f"{r['predict_one_ms']:>10.1f} {r['predict_all_ms']:>8.1f}")
+    print(f"grouped blocks kept by the acceptance check: {', '.join(report['grouped']['blocks']) or 'none'}")
+
+    print(f"\n{'column':<20} {'per_column':>11} {'grouped':>9} {'rel diff':>9}")
+    failures = []
+    for col, base in report["per_column"]["mae"].items():
+        grouped = report["grouped"]["mae"].get(col, float("nan"))
+        rel = (grouped - base) / base if base else 0.0
+        flag = ""
+        if not rel <= args.tolerance:
+            failures.append(col)
+            flag = "  <-- over tolerance"
+        print(f"{col:<20} {base:>11.4f} {grouped:>9.4f} {rel:>+8.1%}{flag}")
+
+    if failures:
+        print(f"\ngrouped layout exceeds the {args.tolerance:.0%} MAE tolerance on: {', '.join(failures)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
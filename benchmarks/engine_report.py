@@ -0,0 +1,121 @@
+"""
+Compare the qualifying model engines (forest, hist_gb, xgboost) on the real data, as JSON.
+
+    python benchmarks/engine_report.py [--engines forest hist_gb xgboost] [--repeat 5]
+                                       [--output report.json]
+
+For every engine (see app/src/main/python/model_engines.py) this trains the
+sector model and the telemetry models with qualifying.fit_models in a
+temporary model directory, so the shipped saved_models/ are never touched, and
+reports:
+
+    train_s               fit_models: walk-forward folds plus the final fit
+    walk_forward_mae      mean walk-forward MAE per sector delta (seconds)
+    artifact_bytes        compiled base_rf / extra_models, and the joblib files
+    load_s                forest_engine.load of both compiled artifacts
+    predict_track_s       one track's grid from the compiled models
+    predict_all_tracks_s  every track's grid in one batched pass
+
+Engines whose library is missing are reported as skipped.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+SRC = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app", "src", "main", "python"))
+sys.path.insert(0, SRC)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import forest_engine  # noqa: E402
+import qualifying  # noqa: E402
+from bench_suite import reset_caches, sandbox  # noqa: E402
+from model_engines import MODEL_ENGINES  # noqa: E402
+
+TRACK = 2
+
+
+def best_of(fn, repeat):
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - start)
+    return {"best_s": min(runs), "median_s": statistics.median(runs)}
+
+
+def report_engine(engine, model_dir, args):
+    os.makedirs(model_dir, exist_ok=True)
+    with sandbox(model_dir, qualifying.get_frame("hist"), qualifying.get_frame("curr")):
+        start = time.perf_counter()
+        with redirect_stdout(sys.stderr):
+            qualifying.fit_models(engine=engine, n_jobs=args.n_jobs)
+        out = {"train_s": time.perf_counter() - start}
+        with open(qualifying.METRICS_FILE) as fh:
+            out["walk_forward_mae"] = json.load(fh)["mean_mae"]
+
+        compiled = (qualifying.COMPILED_BASE_RF_FILE, qualifying.COMPILED_EXTRA_FILE)
+        out["artifact_bytes"] = {
+            os.path.basename(p): os.path.getsize(p)
+            for p in compiled + (qualifying.BASE_RF_FILE, qualifying.EXTRA_FILE)}
+        out["load_s"] = best_of(lambda: [forest_engine.load(p) for p in compiled], args.repeat)
+
+        reset_caches()
+        with redirect_stdout(sys.stderr):
+            models = qualifying._load_or_train_models()
+        tracks = sorted(qualifying.track_mapping)
+        out["predict_track_s"] = best_of(lambda: qualifying._predict_tracks([TRACK], *models), args.repeat)
+        out["predict_all_tracks_s"] = best_of(lambda: qualifying._predict_tracks(tracks, *models), args.repeat)
+    return out
+
+
+def print_table(results):
+    print(f"{'engine':<9} {'train s':>8} {'MAE S1':>7} {'MAE S2':>7} {'MAE S3':>7} {'base MB':>8} "
+          f"{'extra MB':>9} {'load ms':>8} {'1 track ms':>11} {'all ms':>8}")
+    for engine, r in results["engines"].items():
+        if "skipped" in r:
+            print(f"{engine:<9} skipped: {r['skipped']}")
+            continue
+        mae = list(r["walk_forward_mae"].values())
+        size = r["artifact_bytes"]
+        print(f"{engine:<9} {r['train_s']:>8.1f} {mae[0]:>7.4f} {mae[1]:>7.4f} {mae[2]:>7.4f} "
+              f"{size['base_rf.bin'] / 1e6:>8.2f} {size['extra_models.bin'] / 1e6:>9.2f} "
+              f"{r['load_s']['best_s'] * 1e3:>8.2f} {r['predict_track_s']['best_s'] * 1e3:>11.1f} "
+              f"{r['predict_all_tracks_s']['best_s'] * 1e3:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--engines", nargs="*", choices=MODEL_ENGINES, default=list(MODEL_ENGINES))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--n-jobs", type=int, default=None, help="walk-forward worker processes")
+    parser.add_argument("--output", help="write the JSON report here (default: stdout)")
+    args = parser.parse_args()
+
+    results = {"libraries": forest_engine.library_versions(), "engines": {}}
+    workdir = tempfile.mkdtemp(prefix="slipstream-engines-")
+    try:
+        for engine in args.engines:
+            try:
+                results["engines"][engine] = report_engine(engine, os.path.join(workdir, engine), args)
+            except ImportError as e:
+                results["engines"][engine] = {"skipped": str(e)}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    results["libraries"] = forest_engine.library_versions()
+
+    document = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as fh:
+            fh.write(document + "\n")
+    else:
+        print(document)
+    print_table(results)
+
+
+if __name__ == "__main__":
+    main()
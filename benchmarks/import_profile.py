@@ -0,0 +1,96 @@
+"""
+Import-time profile of the inference entry modules, for CI.
+
+Runs ``python -X importtime`` on ``import qualifying, strategy`` in a fresh
+interpreter, prints the slowest top-level imports, and fails when a
+training-only dependency is pulled in or the total exceeds --budget-ms.
+With --predict it also runs one qualifying and one strategy prediction
+(needs the compiled models in saved_models/) and checks the same modules
+are still absent afterwards.
+
+    python benchmarks/import_profile.py [--budget-ms 1500] [--predict] [--json out.json]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+PY_SRC = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app", "src", "main", "python"))
+
+ENTRY_MODULES = ("qualifying", "strategy")
+# only retraining may load these
+TRAINING_ONLY = ("sklearn", "scipy", "joblib", "openpyxl", "walk_forward")
+
+PREDICT_SNIPPET = """
+import qualifying, strategy, sys
+qualifying.main(1)
+strategy.main(1, 1, False, 25, 35)
+print("LOADED:" + ",".join(sorted({m.split('.')[0] for m in sys.modules})))
+"""
+
+
+def run_importtime(code):
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          cwd=PY_SRC, capture_output=True, text=True)
+    if proc.returncode != 0:
+        sys.exit(proc.stderr)
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        # nesting is encoded as two extra spaces per level after the single separator
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return rows, proc.stdout
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="fail if total import time exceeds this")
+    parser.add_argument("--predict", action="store_true",
+                        help="also run a prediction and check the loaded modules")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--json", help="write the profile to this file")
+    args = parser.parse_args()
+
+    rows, _ = run_importtime("import " + ", ".join(ENTRY_MODULES))
+    total_ms = sum(self_us for _, _, self_us, _ in rows) / 1e3
+    imported = {name.split(".")[0] for name, _, _, _ in rows}
+    top_level = sorted((r for r in rows if r[1] == 0), key=lambda r: -r[3])
+
+    print(f"total import time: {total_ms:.1f} ms ({len(rows)} modules)")
+    print(f"{'cumulative ms':>14}  module")
+    for name, _, _, cumulative_us in top_level[:args.top]:
+        print(f"{cumulative_us / 1e3:>14.1f}  {name}")
+
+    failures = [f"imported at module load: {m}" for m in TRAINING_ONLY if m in imported]
+    if args.budget_ms is not None and total_ms > args.budget_ms:
+        failures.append(f"import time {total_ms:.1f} ms over budget {args.budget_ms:.1f} ms")
+
+    loaded_after_predict = None
+    if args.predict:
+        _, stdout = run_importtime(PREDICT_SNIPPET)
+        line = next(l for l in stdout.splitlines() if l.startswith("LOADED:"))
+        loaded_after_predict = sorted(line[len("LOADED:"):].split(","))
+        failures += [f"imported by prediction: {m}" for m in TRAINING_ONLY if m in loaded_after_predict]
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump({
+                "total_ms": total_ms,
+                "modules": [{"name": n, "depth": d, "self_us": s, "cumulative_us": c}
+                            for n, d, s, c in rows],
+                "loaded_after_predict": loaded_after_predict,
+                "failures": failures,
+            }, fh, indent=2)
+
+    for f in failures:
+        print("FAIL:", f)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
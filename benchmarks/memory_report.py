@@ -0,0 +1,149 @@
+"""
+RSS and DataFrame memory of qualifying.py with and without LOW_MEMORY, on the real and synthetic data, as JSON.
+
+    python benchmarks/memory_report.py [--scales 10] [--output report.json]
+
+Every (data, mode) pair runs in a fresh interpreter, so one run's allocations
+never show up in the next. Each child records, after every stage:
+
+    import      qualifying imported, nothing loaded
+    training    curr loaded and all_data held, as fit_models would hold it
+    released    the caller has dropped all_data (whatever qualifying still
+                caches stays: hist and all_data by default, nothing extra
+                with LOW_MEMORY)
+    serving     predict_all_tracks() has run, i.e. the steady state of the app
+
+"rss_mb" is the resident set size and "frames_mb" the deep memory_usage of the
+frames qualifying holds (plus all_data during "training"). RSS rarely shrinks
+once the allocator has the pages, so frames_mb is the cleaner comparison.
+
+"real" uses the shipped workbooks; "xN" writes synthetic workbooks N times
+their size (benchmarks/synthetic_data.py) to a temp dir, with snapshots built
+there by a priming run so Excel parsing never lands in the measured runs. The
+saved models are only read.
+"""
+import argparse
+import gc
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from contextlib import redirect_stdout
+
+SRC = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app", "src", "main", "python"))
+sys.path.insert(0, SRC)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+MODES = ("default", "low_memory")
+
+
+def _frames_mb(frames):
+    unique = {id(f): f for f in frames}.values()  # all_data is both cached and held by default
+    return sum(f.memory_usage(deep=True).sum() for f in unique) / 1e6
+
+
+def child(mode, hist_xlsx, curr_xlsx, snapshot_dir):
+    """Run the stages in this interpreter and print the measurements as JSON."""
+    import metrics
+
+    out = {"stages": {}}
+
+    def record(stage, held=()):
+        gc.collect()
+        frames = list(qualifying._frames.values()) + list(held)
+        out["stages"][stage] = {"rss_mb": (metrics.current_rss() or 0) / 1e6,
+                                "frames_mb": _frames_mb(frames),
+                                "cached": sorted(qualifying._frames)}
+
+    with redirect_stdout(sys.stderr):
+        import qualifying
+        import snapshot
+
+        qualifying.LOW_MEMORY = mode == "low_memory"
+        if hist_xlsx:
+            qualifying.HIST_XLSX, qualifying.CURR_XLSX = hist_xlsx, curr_xlsx
+            snapshot.SNAPSHOT_DIR = snapshot_dir
+        record("import")
+
+        qualifying.get_frame("curr")
+        all_data = qualifying.get_frame("all_data")
+        out["rows"] = len(all_data)
+        record("training", [all_data])
+        del all_data
+        record("released")
+
+        qualifying.predict_all_tracks()
+        record("serving")
+    out["peak_rss_mb"] = metrics._memory().get("peak_rss_bytes", 0) / 1e6
+    print(json.dumps(out))
+
+
+def run_child(mode, paths=None):
+    cmd = [sys.executable, os.path.abspath(__file__), "--child", mode]
+    if paths:
+        cmd += ["--paths", *paths]
+    proc = subprocess.run(cmd, cwd=SRC, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"child {mode} failed:\n{proc.stderr[-2000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def synthetic_workbooks(scale, workdir):
+    """Write scale-N workbooks plus a snapshot dir; returns the three paths."""
+    import synthetic_data
+
+    with redirect_stdout(sys.stderr):
+        hist, curr = synthetic_data.qualifying_frames(scale)
+    paths = (os.path.join(workdir, "HistoricalData.xlsx"), os.path.join(workdir, "CurrentData.xlsx"),
+             os.path.join(workdir, "snapshots"))
+    hist.to_excel(paths[0], index=False)
+    curr.to_excel(paths[1], index=False)
+    os.makedirs(paths[2], exist_ok=True)
+    run_child("default", paths)  # priming run: parses Excel once and writes the snapshots
+    return paths
+
+
+def print_table(results):
+    print(f"{'data':<6} {'mode':<11} {'rows':>7} {'stage':<9} {'rss MB':>8} {'frames MB':>10}")
+    for data, modes in results["data"].items():
+        for mode, run in modes.items():
+            for stage, row in run["stages"].items():
+                print(f"{data:<6} {mode:<11} {run['rows']:>7} {stage:<9} "
+                      f"{row['rss_mb']:>8.1f} {row['frames_mb']:>10.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scales", type=int, nargs="*", default=[10],
+                        help="synthetic data sizes, as multiples of the real workbooks")
+    parser.add_argument("--output", help="write the JSON report here (default: stdout)")
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--paths", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, *(args.paths or (None, None, None)))
+        return
+
+    results = {"data": {"real": {mode: run_child(mode) for mode in MODES}}}
+    for scale in args.scales:
+        workdir = tempfile.mkdtemp(prefix="slipstream-memory-")
+        try:
+            paths = synthetic_workbooks(scale, workdir)
+            results["data"][f"x{scale}"] = {mode: run_child(mode, paths) for mode in MODES}
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    document = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as fh:
+            fh.write(document + "\n")
+    else:
+        print(document)
+    print_table(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Fire many overlapping qualifying.main / strategy.main calls and check that loads and training happen once.
+
+    python benchmarks/stress_concurrency.py [--threads 32] [--rounds 3] [--skip-train]
+
+Two scenarios, each in a temporary model directory (the shipped saved_models/
+are only copied, never written):
+
+    load    a copy of saved_models/ and an empty model registry: every artifact
+            must be loaded exactly once (registry misses == entries)
+    train   an empty model directory: fit_models and the strategy fallback
+            training must each run exactly once, and every artifact written
+            must be complete (compiled artifacts match their manifest SHA-256,
+            joblib files unpickle) with no temp files left behind
+
+In both, all threads start together behind a barrier and the answers to
+identical requests must be identical. Exits non-zero if any check fails.
+"""
+import argparse
+import glob
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from contextlib import redirect_stdout
+
+SRC = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app", "src", "main", "python"))
+sys.path.insert(0, SRC)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import forest_engine  # noqa: E402
+import metrics  # noqa: E402
+import qualifying  # noqa: E402
+import strategy  # noqa: E402
+from bench_suite import reset_caches, sandbox  # noqa: E402
+from concurrency import SINGLE_FLIGHT  # noqa: E402
+from model_registry import REGISTRY  # noqa: E402
+
+TRACKS = (1, 2, 5, 14, 22)
+SCENARIOS = ((1, 1, False, 25, 35), (18, 10, True, 15, 20), (5, 20, False, 30, 45))
+
+
+def _requests(threads, seed):
+    rng = random.Random(seed)
+    out = []
+    for _ in range(threads):
+        if rng.random() < 0.5:
+            track = rng.choice(TRACKS)
+            out.append((("qualifying", track), lambda t=track: qualifying.main(t)))
+        else:
+            args = rng.choice(SCENARIOS)
+            out.append((("strategy",) + args, lambda a=args: strategy.main(*a)))
+    return out
+
+
+def fire(threads, seed):
+    """Run ``threads`` random requests at once; returns {request: [answers]} and errors."""
+    requests = _requests(threads, seed)
+    barrier = threading.Barrier(len(requests))
+    answers, errors, lock = {}, [], threading.Lock()
+
+    def worker(key, fn):
+        barrier.wait()
+        try:
+            result = fn()
+        except Exception as e:
+            with lock:
+                errors.append(f"{key}: {e!r}")
+            return
+        with lock:
+            answers.setdefault(key, []).append(result)
+
+    pool = [threading.Thread(target=worker, args=r) for r in requests]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return answers, errors
+
+
+def check_answers(answers, errors):
+    problems = list(errors)
+    for key, results in answers.items():
+        if len(set(results)) != 1:
+            problems.append(f"{key}: {len(set(results))} different answers")
+        if key[0] == "qualifying" and not results[0].startswith("Position,"):
+            problems.append(f"{key}: error answer {results[0][:80]!r}")
+    return problems
+
+
+def check_artifacts(model_dir):
+    import joblib
+
+    problems = [f"leftover temp file {os.path.relpath(p, model_dir)}"
+                for p in glob.glob(os.path.join(model_dir, "**", "*.tmp"), recursive=True)]
+    for path in glob.glob(os.path.join(model_dir, "compiled", "*.bin")):
+        if not forest_engine.verify(path):
+            problems.append(f"{os.path.basename(path)} does not match its manifest")
+    for path in glob.glob(os.path.join(model_dir, "*.joblib")):
+        try:
+            joblib.load(path)
+        except Exception as e:
+            problems.append(f"{os.path.basename(path)} does not load: {e!r}")
+    return problems
+
+
+def run_scenario(name, model_dir, args):
+    metrics.reset()
+    reset_caches()
+    flights = SINGLE_FLIGHT.stats()
+    start = time.perf_counter()
+    problems = []
+    with sandbox(model_dir, qualifying.get_frame("hist"), qualifying.get_frame("curr")):
+        for r in range(args.rounds):
+            with redirect_stdout(sys.stderr):
+                answers, errors = fire(args.threads, args.seed + r)
+            problems += check_answers(answers, errors)
+        counters = metrics.get_metrics()["counters"]
+        registry = REGISTRY.stats()
+
+    if name == "load":
+        if registry["misses"] != len(registry["entries"]):
+            problems.append(f"{registry['misses']} loads for {len(registry['entries'])} artifacts")
+    else:
+        for counter in ("qualifying.retrains", "strategy.retrains"):
+            if counters.get(counter, 0) != 1:
+                problems.append(f"{counter} = {counters.get(counter, 0)}, expected 1")
+        problems += check_artifacts(model_dir)
+
+    after = SINGLE_FLIGHT.stats()
+    print(f"{name:<5} {args.threads} threads x {args.rounds} rounds in {time.perf_counter() - start:.1f}s: "
+          f"{after['leaders'] - flights['leaders']} computations, "
+          f"{after['shared'] - flights['shared']} shared, {registry['misses']} loads, "
+          f"retrains q={counters.get('qualifying.retrains', 0)} s={counters.get('strategy.retrains', 0)}")
+    for p in problems:
+        print("   FAIL", p)
+    return not problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip-train", action="store_true", help="only run the load scenario")
+    args = parser.parse_args()
+
+    if not os.path.exists(qualifying.COMPILED_BASE_RF_FILE):
+        sys.exit("No saved models to copy; run qualifying.main once first.")
+    metrics.enable()
+    ok = True
+    workdir = tempfile.mkdtemp(prefix="slipstream-stress-")
+    try:
+        loaded = os.path.join(workdir, "load")
+        shutil.copytree(qualifying.MODEL_DIR, loaded)
+        ok &= run_scenario("load", loaded, args)
+        if not args.skip_train:
+            ok &= run_scenario("train", os.path.join(workdir, "train"), args)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Synthetic stand-ins for HistoricalData.xlsx, CurrentData.xlsx and
+StrategyData.xlsx, with the same columns and dtypes and scalable row counts.
+
+    python benchmarks/synthetic_data.py --scale 10 --out /tmp/synthetic
+
+Rows are generated, not resampled from the real workbooks. Sector times
+follow each track's baseline with team, driver and session effects, telemetry
+is drawn per track and sector around realistic values, and strategies depend
+on the track's pit-stop count, temperature and rain. That is enough structure
+for the models to train the way they do on real data, at any size.
+"""
+import argparse
+import math
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app", "src", "main", "python")))
+import qualifying  # noqa: E402
+import strategy  # noqa: E402
+
+# row counts of the shipped workbooks (scale 1)
+HIST_ROWS = 1330
+CURR_ROWS = 99
+STRATEGY_ROWS = 1265
+LAST_HIST_YEAR = 2024
+CURRENT_YEAR = 2025
+DRIVERS_PER_SESSION = 20
+CURRENT_DRIVERS = 20  # ids 1..20 are the 2025 grid in driver_mapping
+
+# (low, high) ranges the per-track telemetry centres are drawn from
+_SECTOR_TELEMETRY = {
+    'SpeedMin': (60, 180), 'SpeedMax': (280, 340), 'SpeedAvg': (180, 280),
+    'RPMAvg': (9500, 11300), 'ThrottleAvg': (55, 95), 'BrakeAvg': (0.05, 0.3),
+}
+_SPEED_TRAPS = {'SpeedI1': (240, 320), 'SpeedI2': (250, 335), 'SpeedFL': (260, 320), 'SpeedST': (290, 340)}
+_INT_TELEMETRY = {'SpeedMin', 'SpeedMax', 'SpeedI1', 'SpeedI2', 'SpeedFL', 'SpeedST'}
+TELEMETRY_NAN_FRACTION = 0.01
+
+_DRY_COMPOUNDS = ['S', 'M', 'H']
+_WET_STARTS = ['I', 'I', 'I', 'W']
+
+
+def _telemetry(rng: np.random.Generator, tracks: np.ndarray) -> dict:
+    """EXTRA_COLS for each row: a per-track centre plus row noise."""
+    columns = {}
+    specs = [(f'Sector{s}{name}', rng_range) for s in (1, 2, 3)
+             for name, rng_range in _SECTOR_TELEMETRY.items()] + list(_SPEED_TRAPS.items())
+    for col, (low, high) in specs:
+        centre = rng.uniform(low, high, size=25)          # indexed by track id
+        values = centre[tracks] + rng.normal(0, (high - low) * 0.05, size=len(tracks))
+        values = np.clip(values, low * 0.8, high * 1.05)
+        if any(col.endswith(k) for k in _INT_TELEMETRY):
+            values = np.rint(values).astype(np.int64)
+        columns[col] = values
+    return columns
+
+
+def _sessions(rng: np.random.Generator, years: np.ndarray, races: int, drivers: np.ndarray,
+              team_of: dict, n_rows: int) -> pd.DataFrame:
+    rows = []
+    for year in years:
+        for race_no in range(1, races + 1):
+            track = int(rng.integers(1, 25))
+            entrants = rng.choice(drivers, size=min(DRIVERS_PER_SESSION, len(drivers)), replace=False)
+            for d in entrants:
+                rows.append((int(year), track, int(d), team_of[int(d)], race_no))
+            if len(rows) >= n_rows:
+                break
+        if len(rows) >= n_rows:
+            break
+    df = pd.DataFrame(rows[:n_rows], columns=['Year', 'Track', 'Driver', 'Team', 'RaceNo'])
+
+    # sector time = baseline x (1 + team + driver + session effect) + noise
+    team_effect = rng.normal(0.01, 0.006, size=len(qualifying.team_mapping) + 1)
+    driver_effect = rng.normal(0, 0.003, size=len(qualifying.driver_mapping) + 1)
+    session_effect = rng.normal(0, 0.01, size=(df['Year'].max() + 1 - df['Year'].min(), 25))
+    baselines = qualifying._BASELINE_TABLE[df['Track'].to_numpy()]
+    factor = (1 + team_effect[df['Team']] + driver_effect[df['Driver']]
+              + session_effect[df['Year'] - df['Year'].min(), df['Track']])[:, None]
+    times = baselines * factor + rng.normal(0, 0.08, size=baselines.shape)
+    for i, col in enumerate(qualifying.SECTOR_TIME_COLS):
+        df[col] = np.round(times[:, i], 3)
+
+    for col, values in _telemetry(rng, df['Track'].to_numpy()).items():
+        df[col] = values
+    # a few gaps in the float columns (integer columns are complete in the workbooks too)
+    for col in qualifying.EXTRA_COLS:
+        if df[col].dtype.kind == 'f':
+            df[col] = df[col].mask(rng.random(len(df)) < TELEMETRY_NAN_FRACTION)
+
+    columns = (['Year', 'Track', 'Driver', 'Team'] + qualifying.SECTOR_TIME_COLS
+               + qualifying.EXTRA_COLS + ['RaceNo'])
+    return df[columns]
+
+
+def qualifying_frames(scale: int = 1, seed: int = 0):
+    """(historical, current) raw frames, i.e. what pd.read_excel returns for the two workbooks."""
+    rng = np.random.default_rng(seed)
+    teams = np.array(sorted(qualifying.team_mapping))
+    all_drivers = np.array(sorted(qualifying.driver_mapping))
+    team_of = {int(d): int(teams[i % len(teams)]) for i, d in enumerate(all_drivers)}
+
+    hist_rows = HIST_ROWS * scale
+    n_seasons = math.ceil(hist_rows / (24 * DRIVERS_PER_SESSION))
+    years = np.arange(LAST_HIST_YEAR - n_seasons + 1, LAST_HIST_YEAR + 1)
+    hist = _sessions(rng, years, 24, all_drivers, team_of, hist_rows)
+
+    curr_rows = min(CURR_ROWS * scale, 24 * CURRENT_DRIVERS)
+    current = all_drivers[:CURRENT_DRIVERS]
+    curr = _sessions(rng, np.array([CURRENT_YEAR]), 24, current, team_of, curr_rows)
+    return hist, curr
+
+
+def _strategy_label(rng: np.random.Generator, stops: int, track_temp: float, is_wet: bool) -> str:
+    stints = stops + 1
+    # hotter tracks push towards harder compounds
+    hard_bias = np.clip((track_temp - 20) / 30, 0, 1)
+    weights = np.array([1 - hard_bias, 1.0, 0.4 + hard_bias])
+    compounds = list(rng.choice(_DRY_COMPOUNDS, size=stints, p=weights / weights.sum()))
+    if is_wet:
+        compounds[0] = _WET_STARTS[rng.integers(len(_WET_STARTS))]
+    return '-'.join(compounds)
+
+
+def strategy_frame(scale: int = 1, seed: int = 0) -> pd.DataFrame:
+    """Raw frame with the columns of StrategyData.xlsx."""
+    rng = np.random.default_rng(seed + 1)
+    n = STRATEGY_ROWS * scale
+    tracks = rng.integers(1, 25, size=n)
+    info = [strategy.TRACK_INFO[t] for t in tracks.tolist()]
+    stint, speed, track_type, overtaking, _ = (np.asarray(c) for c in zip(*info))
+    is_wet = rng.random(n) < 0.08
+    air = rng.uniform(13, 37, size=n)
+    track_temp = air + rng.uniform(4, 14, size=n) - 4 * is_wet
+    max_stops = np.array([strategy.TRACK_MAX_PITSTOPS[t] for t in tracks.tolist()])
+    stops = np.clip(max_stops + rng.choice([-1, 0, 0, 0, 1], size=n), 1, 3)
+    start = rng.integers(1, 21, size=n)
+    finish = np.clip(start + rng.integers(-6, 7, size=n), 1, 20)
+    return pd.DataFrame({
+        'Year': LAST_HIST_YEAR - (np.arange(n) * 3 // n),
+        'Track': tracks,
+        'AvgStintLength': stint + rng.normal(0, 0.5, size=n),
+        'TempRange': rng.uniform(2, 21, size=n).round(1),
+        'StartPosition': start,
+        'FinishPosition': finish,
+        'PositionChange': start - finish,
+        'Strategy': [_strategy_label(rng, s, t, w) for s, t, w in zip(stops, track_temp, is_wet)],
+        'NumPitStops': stops,
+        'AirTemp': air,
+        'TrackTemp': track_temp,
+        'IsWet': is_wet,
+        'TrackSpeed': speed + rng.normal(0, 3, size=n),
+        'TrackType': track_type,
+        'OvertakingDifficulty': overtaking,
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scale", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", required=True, help="directory for the three .xlsx files")
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    hist, curr = qualifying_frames(args.scale, args.seed)
+    for name, df in (("HistoricalData", hist), ("CurrentData", curr),
+                     ("StrategyData", strategy_frame(args.scale, args.seed))):
+        path = os.path.join(args.out, name + ".xlsx")
+        df.to_excel(path, index=False)
+        print(f"{path}: {len(df)} rows")
+
+
+if __name__ == "__main__":
+    main()